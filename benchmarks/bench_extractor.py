@@ -0,0 +1,164 @@
+"""
+HTML特徴抽出のマイクロベンチマーク
+従来のBeautifulSoup（複数回走査）とシングルパス抽出器の処理時間を比較し、
+両者の抽出結果が一致することを確認する
+
+使い方:
+    python benchmarks/bench_extractor.py [HTMLファイル ...] [--repeat N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from urllib.parse import urlparse, urljoin
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from extractor import extract_page  # noqa: E402
+from frontier import clean_url, url_host  # noqa: E402
+
+BASE_URL = 'https://example.com/'
+
+
+def parse_page_bs4(html, page_url, base_domain):
+    """
+    従来のcrawl_websiteと同じBeautifulSoupによる抽出（比較用）
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+
+    title = soup.title.string.strip() if soup.title else "No Title"
+
+    h1_tag = soup.find('h1')
+    h1_text = h1_tag.get_text().strip() if h1_tag else "No H1"
+
+    meta_desc_tag = soup.find('meta', attrs={'name': 'description'})
+    meta_desc = meta_desc_tag['content'].strip() if meta_desc_tag and 'content' in meta_desc_tag.attrs else "No Meta Description"
+
+    meta_keywords_tag = soup.find('meta', attrs={'name': 'keywords'})
+    meta_keywords = meta_keywords_tag['content'].strip() if meta_keywords_tag and 'content' in meta_keywords_tag.attrs else ""
+
+    body_text = soup.body.get_text(" ", strip=True) if soup.body else ""
+    word_count = len(body_text.split())
+
+    images = soup.find_all('img')
+    img_count = len(images)
+    img_with_alt = sum(1 for img in images if img.get('alt'))
+
+    h2_count = len(soup.find_all('h2'))
+    h3_count = len(soup.find_all('h3'))
+
+    internal_links = []
+    for link in soup.find_all('a', href=True):
+        href = link['href']
+        if not href.startswith(('http://', 'https://')):
+            href = urljoin(page_url, href)
+        if not href.startswith(('http://', 'https://')):
+            continue
+        href = clean_url(href)
+        if url_host(href) == base_domain:
+            internal_links.append(href)
+
+    unique_links = list(dict.fromkeys(internal_links))
+
+    return {
+        'url': page_url,
+        'title': title,
+        'h1': h1_text,
+        'meta_description': meta_desc,
+        'meta_keywords': meta_keywords,
+        'word_count': word_count,
+        'image_count': img_count,
+        'images_with_alt': img_with_alt,
+        'h2_count': h2_count,
+        'h3_count': h3_count,
+        'internal_links_count': len(unique_links),
+        'internal_links': unique_links
+    }
+
+
+def generate_sample_html(seed, paragraphs=60, links=80, images=20):
+    """
+    日本語と英語を含むベンチマーク用のHTMLを生成する
+    """
+    rng = random.Random(seed)
+    words = ['SEO', 'content', 'marketing', 'サイト', '内部リンク', '最適化', 'search', 'engine', 'ページ', '改善']
+    parts = [
+        '<!DOCTYPE html><html><head>',
+        f'<title>Sample page {seed} | Example</title>',
+        f'<meta name="description" content="Sample description for page {seed} with enough text to be realistic.">',
+        '<meta name="keywords" content="seo, sample">',
+        '<style>body {font-family: sans-serif;}</style>',
+        '</head><body><header><nav>'
+    ]
+    for i in range(links):
+        href = f'/section{i % 7}/page{rng.randint(0, 500)}.html' if i % 5 else f'https://external{i}.example.org/'
+        parts.append(f'<a href="{href}">link {i}</a>')
+    parts.append(f'</nav></header><main><h1>Heading for page {seed}</h1>')
+    for i in range(paragraphs):
+        if i % 10 == 0:
+            parts.append(f'<h2>Section {i}</h2>')
+        if i % 5 == 0:
+            parts.append(f'<h3>Subsection {i}</h3>')
+        text = ' '.join(rng.choice(words) for _ in range(40))
+        parts.append(f'<p>{text} &amp; <strong>{rng.choice(words)}</strong></p>')
+        if i < images:
+            alt = f' alt="image {i}"' if i % 3 else ''
+            parts.append(f'<img src="/img/{i}.png"{alt}>')
+    parts.append('<script>window.dataLayer = [];</script></main><footer>footer text</footer></body></html>')
+    return ''.join(parts)
+
+
+def time_function(func, documents, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for html in documents:
+            func(html, BASE_URL, urlparse(BASE_URL).netloc)
+        best = min(best, time.perf_counter() - start)
+    return best / len(documents) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='HTML特徴抽出のマイクロベンチマーク')
+    parser.add_argument('files', nargs='*', help='ベンチマークに使うHTMLファイル（省略時は生成したHTML）')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--pages', type=int, default=50)
+    args = parser.parse_args()
+
+    if args.files:
+        documents = []
+        for path in args.files:
+            with open(path, encoding='utf-8', errors='replace') as f:
+                documents.append(f.read())
+    else:
+        documents = [generate_sample_html(seed) for seed in range(args.pages)]
+
+    # 抽出結果が一致することを確認
+    base_domain = urlparse(BASE_URL).netloc
+    mismatches = 0
+    for html in documents:
+        expected = parse_page_bs4(html, BASE_URL, base_domain)
+        actual = extract_page(html, BASE_URL, base_domain)
+        # 抽出器のみが出力する追加項目は比較対象外
+        actual = {key: actual[key] for key in expected}
+        if expected != actual:
+            mismatches += 1
+            diff = {key: (expected[key], actual[key]) for key in expected if expected[key] != actual[key]}
+            print(f"結果が一致しません: {diff}")
+
+    bs4_ms = time_function(parse_page_bs4, documents, args.repeat)
+    single_pass_ms = time_function(extract_page, documents, args.repeat)
+
+    print(f"ページ数: {len(documents)}  平均サイズ: {sum(len(d) for d in documents) // len(documents):,} 文字")
+    print(f"BeautifulSoup:     {bs4_ms:8.3f} ms/ページ")
+    print(f"シングルパス抽出: {single_pass_ms:8.3f} ms/ページ")
+    print(f"高速化率:          {bs4_ms / single_pass_ms:8.2f} 倍")
+    print(f"不一致:            {mismatches} ページ")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+起動時のインポート時間ベンチマーク
+`python -X importtime` で各エントリーポイントのインポート時間を計測し、予算（ms）を超えた場合と
+重いライブラリ（描画・自然言語処理）が起動時に読み込まれている場合に失敗する
+
+使い方:
+    python benchmarks/bench_imports.py [--repeat N] [--top N]
+"""
+import argparse
+import ast
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_SCRIPT = os.path.join(ROOT, 'seo-analysis-tool.py')
+
+# 起動時に読み込んではいけないモジュール（必要なタブ・処理の中で遅延インポートする）
+# streamlitはplotlyを自身で読み込むため、アプリではplotlyを対象外とする
+HEADLESS_LAZY = ('streamlit', 'plotly', 'matplotlib', 'seaborn', 'nltk', 'bs4', 'scipy')
+APP_LAZY = ('matplotlib', 'seaborn', 'nltk', 'bs4', 'scipy')
+
+
+def script_imports(path):
+    """
+    スクリプトのトップレベルでインポートしているモジュール（関数・タブの中の遅延インポートは含めない）
+    """
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+# 計測対象: (名前, インポートするモジュール, 予算ms, 読み込んではいけないモジュール)
+# 予算は従来のスクリプトのインポート（約3.2秒）に対する上限
+# アプリはスクリプトのインポート文から対象を作るため、モジュールを追加しても計測対象から漏れない
+TARGETS = [
+    ('headless core', ['seo_pipeline'], 900, HEADLESS_LAZY),
+    ('batch CLI', ['seo_cli'], 1000, HEADLESS_LAZY),
+    ('streamlit app', script_imports(APP_SCRIPT), 2000, APP_LAZY)
+]
+
+
+def measure(modules, lazy_modules):
+    """
+    新しいインタプリタでモジュールをインポートし、インポート時間と読み込まれたモジュールを返す
+    戻り値: (合計ms, [(累積ms, モジュール名), ...], 読み込まれた遅延対象モジュール)
+    """
+    code = (
+        f"import {', '.join(modules)}; import sys; "
+        f"print(','.join(name for name in {tuple(lazy_modules)!r} if name in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+
+    total_us = 0
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        entries.append((int(cumulative) / 1000, name.strip()))
+        # インデントのない行がトップレベルのインポート
+        if not name.startswith('  '):
+            total_us += int(cumulative)
+
+    loaded = [name for name in result.stdout.strip().split(',') if name]
+    return total_us / 1000, entries, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description='起動時のインポート時間ベンチマーク')
+    parser.add_argument('--repeat', type=int, default=3, help='計測回数（最小値を採用）')
+    parser.add_argument('--top', type=int, default=5, help='表示する重いモジュールの数')
+    args = parser.parse_args()
+
+    failures = 0
+    for label, modules, budget_ms, lazy_modules in TARGETS:
+        runs = [measure(modules, lazy_modules) for _ in range(args.repeat)]
+        total_ms, entries, loaded = min(runs, key=lambda run: run[0])
+
+        status = 'OK' if total_ms <= budget_ms else 'OVER'
+        print(f"{label:<14} {total_ms:8.1f} ms  (予算 {budget_ms} ms)  {status}")
+        for cumulative_ms, name in sorted(entries, reverse=True)[:args.top]:
+            print(f"    {cumulative_ms:8.1f} ms  {name}")
+        if loaded:
+            print(f"    起動時に読み込まれた重いモジュール: {', '.join(loaded)}")
+
+        if total_ms > budget_ms or loaded:
+            failures += 1
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,226 @@
+"""
+クロールと分析パイプラインのスループットベンチマーク（オフライン）
+合成サイトをローカルのHTTPサーバーで配信してクロールし、ページ数ごとに
+ページ/秒・解析ms/ページ・最大メモリ使用量（RSS）・各分析段階の処理時間を計測する
+（ページ数ごとに新しいプロセスで計測するため、RSSは規模ごとの値になる）
+
+使い方:
+    python benchmarks/bench_pipeline.py [--sizes 100,10000,100000] [--parse-processes N] [--output 結果.json]
+                                        [--baseline 基準.json --tolerance 0.3]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from fixture_server import add_site_arguments, site_argument_list, site_from_arguments  # noqa: E402
+
+# 解析時間の計測に使うページ数の上限
+PARSE_SAMPLE_PAGES = 200
+# 解析時間の計測回数（最小値を採用）
+PARSE_REPEAT = 3
+
+# 計測結果の項目: (キー, 表示名, 値が大きいほど良いか)
+METRICS = [
+    ('pages_per_sec', 'ページ/秒', True),
+    ('parse_ms', '解析ms/ページ', False),
+    ('peak_rss_mb', '最大RSS(MB)', False),
+    ('crawl', 'クロール(秒)', False),
+    ('scoring', 'スコア(秒)', False),
+    ('link_graph', 'リンク(秒)', False),
+    ('duplicates', '重複(秒)', False),
+    ('keywords', 'キーワード(秒)', False),
+    ('improvements', '改善提案(秒)', False)
+]
+
+# 基準との比較で、これより短い処理時間（秒）は誤差が大きいため対象外とする
+MIN_COMPARE_SECONDS = 0.05
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # LinuxはKB、macOSはバイト単位
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def start_server(args, page_count):
+    """
+    合成サイトのサーバーを別プロセスで起動する（計測対象のプロセスとGILを共有しないため）
+    """
+    command = [sys.executable, os.path.join(BENCH_DIR, 'fixture_server.py'), '--pages', str(page_count)]
+    command += site_argument_list(args)
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    url = process.stdout.readline().strip()
+    if not url:
+        process.kill()
+        raise RuntimeError('fixture server failed to start')
+    return process, url
+
+
+def timed(stages, name, func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    stages[name] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def measure_parse(args, page_count):
+    """
+    合成サイトのHTMLの解析時間（ms/ページ）をネットワークを介さずに計測する
+    """
+    from extractor import extract_page
+
+    site = site_from_arguments(args, page_count)
+    indexes = range(0, page_count, max(1, page_count // PARSE_SAMPLE_PAGES))
+    documents = [(site.page_path(index), site.render(index)) for index in indexes]
+    best = float('inf')
+    for _ in range(PARSE_REPEAT):
+        start = time.perf_counter()
+        for path, html in documents:
+            extract_page(html, f'http://bench.local{path}', 'bench.local')
+        best = min(best, time.perf_counter() - start)
+    return round(best / len(documents) * 1000, 3)
+
+
+def run_single(args, page_count):
+    """
+    1つの規模のクロールと分析を実行して計測結果を返す
+    """
+    import seo_pipeline
+    from duplicates import find_duplicates
+    from improvements import find_page_issues, generate_improvements
+    from link_graph import build_link_graph
+    from scoring import build_page_frame, calculate_seo_scores
+
+    keywords = [keyword.strip() for keyword in args.keywords.split(',') if keyword.strip()]
+    stages = {}
+    server, url = start_server(args, page_count)
+    try:
+        with tempfile.TemporaryDirectory() as work_dir:
+            pages_data = timed(
+                stages, 'crawl', seo_pipeline.crawl_website, url, max_pages=page_count,
+                max_workers=args.workers, requests_per_second=0, parse_workers=args.parse_processes,
+                store_path=os.path.join(work_dir, 'crawl.db'), cache_dir=os.path.join(work_dir, 'cache')
+            )
+            crawled = len(pages_data)
+
+            # analyze_pagesと同じ順序で各段階を計測する
+            page_frame = build_page_frame(pages_data)
+            link_graph = timed(stages, 'link_graph', build_link_graph, pages_data)
+            link_metrics = link_graph.page_metrics()
+            timed(stages, 'scoring', calculate_seo_scores, page_frame, link_metrics=link_metrics)
+            coverage = seo_pipeline.crawl_coverage(pages_data, link_graph, link_metrics)
+            duplicates, _ = timed(stages, 'duplicates', find_duplicates, pages_data)
+            keyword_analysis = timed(stages, 'keywords', seo_pipeline.analyze_keywords, pages_data, keywords)
+
+            start = time.perf_counter()
+            page_issues = find_page_issues(page_frame)
+            generate_improvements(page_frame, keyword_analysis, page_issues, coverage, duplicates)
+            stages['improvements'] = round(time.perf_counter() - start, 3)
+    finally:
+        server.terminate()
+        server.wait()
+
+    result = {
+        'pages': page_count,
+        'crawled': crawled,
+        'pages_per_sec': round(crawled / stages['crawl'], 1) if stages['crawl'] else 0.0,
+        'parse_ms': measure_parse(args, page_count),
+        'peak_rss_mb': peak_rss_mb()
+    }
+    result.update(stages)
+    return result
+
+
+def run_size(args, page_count):
+    """
+    新しいプロセスで1つの規模を計測する
+    """
+    command = [sys.executable, os.path.abspath(__file__), '--single', str(page_count),
+               '--workers', str(args.workers), '--parse-processes', str(args.parse_processes),
+               '--keywords', args.keywords]
+    command += site_argument_list(args)
+    output = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+    if output.returncode != 0:
+        print(output.stderr, file=sys.stderr)
+        raise RuntimeError(f'benchmark for {page_count} pages failed')
+    # クロール中のエラーメッセージの後の最後の行が計測結果
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def compare(results, baseline, tolerance):
+    """
+    基準の計測結果と比較し、許容範囲を超えて悪化した項目を返す
+    """
+    regressions = []
+    previous = {entry['pages']: entry for entry in baseline}
+    for result in results:
+        base = previous.get(result['pages'])
+        if base is None:
+            continue
+        for key, label, higher_is_better in METRICS:
+            new, old = result.get(key), base.get(key)
+            if new is None or old is None or old == 0:
+                continue
+            if not higher_is_better and key not in ('parse_ms', 'peak_rss_mb') and old < MIN_COMPARE_SECONDS:
+                continue
+            ratio = old / new if higher_is_better else new / old
+            if ratio > 1 + tolerance:
+                regressions.append(f"{result['pages']}ページ {label}: {old} → {new}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='クロールと分析パイプラインのスループットベンチマーク')
+    parser.add_argument('--sizes', default='100,10000,100000', help='計測するページ数（カンマ区切り）')
+    parser.add_argument('--workers', type=int, default=16, help='クロールの同時接続数')
+    parser.add_argument('--parse-processes', type=int, default=0,
+                        help='HTML解析のプロセス数（0は取得スレッドで解析する）')
+    parser.add_argument('--keywords', default='seo,コンテンツ,内部リンク,検索エンジン', help='分析するキーワード')
+    parser.add_argument('--output', help='計測結果を書き出すJSONファイル')
+    parser.add_argument('--baseline', help='比較する基準の計測結果（JSON）')
+    parser.add_argument('--tolerance', type=float, default=0.3, help='基準に対して許容する悪化の割合')
+    parser.add_argument('--single', type=int, help=argparse.SUPPRESS)
+    add_site_arguments(parser)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run_single(args, args.single)))
+        return 0
+
+    results = []
+    for page_count in [int(size) for size in args.sizes.split(',') if size.strip()]:
+        result = run_size(args, page_count)
+        results.append(result)
+        print(f"{page_count:>7}ページ（取得 {result['crawled']}）")
+        for key, label, _ in METRICS:
+            print(f"    {label:<14} {result[key]}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"悪化: {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""
+合成サイトを配信するローカルHTTPサーバー
+ベンチマークや動作確認で、実際のWebサイトにアクセスせずにクロールを実行するために使う
+（robots.txtとサイトマップは404を返すため、クロールはトップページのリンクだけをたどる）
+
+使い方:
+    python benchmarks/fixture_server.py [--pages N] [--port PORT] [--fan-out N] [--slow-ratio R] ...
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_site import SyntheticSite  # noqa: E402
+
+
+class FixtureRequestHandler(BaseHTTPRequestHandler):
+    # Keep-Aliveで接続を再利用する（Content-Lengthを必ず返す）
+    protocol_version = 'HTTP/1.1'
+    site = None
+
+    def do_GET(self):
+        status, html, delay = self.site.response(urlparse(self.path).path)
+        if delay:
+            time.sleep(delay)
+        body = html.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # アクセスログは出力しない
+        pass
+
+
+def start_fixture_server(site, host='127.0.0.1', port=0):
+    """
+    合成サイトを配信するサーバーをバックグラウンドのスレッドで起動する
+    戻り値: (サーバー, トップページのURL)。終了時は server.shutdown() を呼ぶ
+    """
+    handler = type('SiteRequestHandler', (FixtureRequestHandler,), {'site': site})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f'http://{host}:{server.server_address[1]}/'
+
+
+def add_site_arguments(parser):
+    """
+    合成サイトの設定をコマンドライン引数に追加する（ベンチマークと共通）
+    """
+    parser.add_argument('--fan-out', type=int, default=10, help='1ページあたりの内部リンク数')
+    parser.add_argument('--words', type=int, default=400, help='1ページあたりの本文の語数')
+    parser.add_argument('--images', type=int, default=5, help='1ページあたりの画像数')
+    parser.add_argument('--japanese-ratio', type=float, default=0.5, help='日本語の語の割合')
+    parser.add_argument('--slow-ratio', type=float, default=0.0, help='応答を遅らせるページの割合')
+    parser.add_argument('--slow-delay', type=float, default=0.5, help='遅いページの遅延秒数')
+    parser.add_argument('--error-ratio', type=float, default=0.0, help='エラーを返すページの割合')
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def site_argument_list(args):
+    """
+    合成サイトの設定を、別プロセスに渡すコマンドライン引数に戻す
+    """
+    return [
+        '--fan-out', str(args.fan_out), '--words', str(args.words), '--images', str(args.images),
+        '--japanese-ratio', str(args.japanese_ratio), '--slow-ratio', str(args.slow_ratio),
+        '--slow-delay', str(args.slow_delay), '--error-ratio', str(args.error_ratio), '--seed', str(args.seed)
+    ]
+
+
+def site_from_arguments(args, page_count):
+    return SyntheticSite(
+        page_count=page_count, fan_out=args.fan_out, words=args.words, images=args.images,
+        japanese_ratio=args.japanese_ratio, slow_ratio=args.slow_ratio, slow_delay=args.slow_delay,
+        error_ratio=args.error_ratio, seed=args.seed
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='合成サイトを配信するローカルHTTPサーバー')
+    parser.add_argument('--pages', type=int, default=100, help='ページ数')
+    parser.add_argument('--port', type=int, default=0, help='待ち受けポート（0は空いているポート）')
+    add_site_arguments(parser)
+    args = parser.parse_args()
+
+    server, url = start_fixture_server(site_from_arguments(args, args.pages), port=args.port)
+    # ベンチマークが読み取れるよう、最初の行にURLを出力する
+    print(url, flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
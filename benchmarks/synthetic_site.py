@@ -0,0 +1,142 @@
+"""
+ベンチマーク用の合成サイト
+ページ数・リンク数・本文の語数・画像数・日本語の割合・遅いページ・エラーページを指定して、
+ページ番号から決定的にHTMLを生成する（ファイルに書き出さず、リクエストのたびに生成する）
+
+ページのURLは /p/{番号}.html（0番はトップページ /）。各ページは子ページ（番号×リンク数+1以降）に
+リンクするため、トップページからすべてのページにたどり着ける
+"""
+import random
+
+ENGLISH_WORDS = [
+    'seo', 'content', 'marketing', 'search', 'engine', 'ranking', 'keyword', 'traffic', 'analysis', 'website',
+    'internal', 'link', 'page', 'speed', 'mobile', 'index', 'crawl', 'guide', 'strategy', 'conversion'
+]
+JAPANESE_WORDS = [
+    '検索', 'エンジン', '最適化', 'コンテンツ', 'マーケティング', '内部リンク', 'キーワード', '分析', 'サイト', '改善',
+    'ページ', '表示速度', 'モバイル', '集客', '順位', '構造化データ', '記事', '対策', '評価', '戦略'
+]
+
+
+class SyntheticSite:
+    """
+    合成サイトの設定とページの生成
+    page_count: ページ数
+    fan_out: 1ページあたりの内部リンク数（子ページへのリンクを含む）
+    words: 1ページあたりの本文の語数（±50%の範囲でばらつく）
+    images: 1ページあたりの画像数
+    japanese_ratio: 日本語の語の割合（0〜1）
+    slow_ratio, slow_delay: 応答を遅らせるページの割合と遅延秒数
+    error_ratio: エラー（500または404）を返すページの割合
+    """
+
+    def __init__(self, page_count=100, fan_out=10, words=400, images=5, japanese_ratio=0.5,
+                 slow_ratio=0.0, slow_delay=0.5, error_ratio=0.0, seed=0):
+        self.page_count = page_count
+        self.fan_out = max(1, fan_out)
+        self.words = words
+        self.images = images
+        self.japanese_ratio = japanese_ratio
+        self.slow_ratio = slow_ratio
+        self.slow_delay = slow_delay
+        self.error_ratio = error_ratio
+        self.seed = seed
+
+    def page_path(self, index):
+        return '/' if index == 0 else f'/p/{index}.html'
+
+    def page_index(self, path):
+        """
+        パスからページ番号を求める（存在しないページはNone）
+        """
+        if path in ('/', '/index.html'):
+            return 0
+        if path.startswith('/p/') and path.endswith('.html'):
+            try:
+                index = int(path[3:-5])
+            except ValueError:
+                return None
+            if 0 < index < self.page_count:
+                return index
+        return None
+
+    def _random(self, index):
+        return random.Random(self.seed * 1000003 + index)
+
+    def page_kind(self, index):
+        """
+        ページの種類（'ok' / 'slow' / 'error'）。トップページは常に'ok'
+        """
+        if index == 0:
+            return 'ok'
+        value = self._random(index).random()
+        if value < self.error_ratio:
+            return 'error'
+        if value < self.error_ratio + self.slow_ratio:
+            return 'slow'
+        return 'ok'
+
+    def links(self, index, rng):
+        first_child = index * self.fan_out + 1
+        targets = list(range(first_child, min(first_child + self.fan_out, self.page_count)))
+        # 子ページ以外のリンク（親ページと、ランダムに選んだページ）
+        if index:
+            targets.append((index - 1) // self.fan_out)
+        while len(targets) < self.fan_out and self.page_count > 1:
+            targets.append(rng.randrange(self.page_count))
+        return targets
+
+    def _words(self, rng, count):
+        words = []
+        for _ in range(count):
+            if rng.random() < self.japanese_ratio:
+                words.append(rng.choice(JAPANESE_WORDS))
+            else:
+                words.append(rng.choice(ENGLISH_WORDS))
+        return words
+
+    def render(self, index):
+        """
+        ページのHTMLを生成する
+        """
+        rng = self._random(index)
+        rng.random()  # page_kindで使う値を読み飛ばす
+        title_words = ' '.join(self._words(rng, 4))
+        word_count = max(1, int(self.words * rng.uniform(0.5, 1.5)))
+        body_words = self._words(rng, word_count)
+
+        parts = [
+            '<!DOCTYPE html><html lang="ja"><head><meta charset="utf-8">',
+            f'<title>{title_words} | ページ{index}</title>',
+            f'<meta name="description" content="{" ".join(self._words(rng, 20))}">',
+            '<meta name="keywords" content="seo, コンテンツ">',
+            '</head><body><header><nav>'
+        ]
+        for target in self.links(index, rng):
+            parts.append(f'<a href="{self.page_path(target)}">{rng.choice(ENGLISH_WORDS)} {target}</a>')
+        parts.append(f'</nav></header><main><h1>{title_words}</h1>')
+
+        paragraph = 40
+        for number, start in enumerate(range(0, word_count, paragraph)):
+            if number % 4 == 0:
+                parts.append(f'<h2>{" ".join(self._words(rng, 3))}</h2>')
+            if number < self.images:
+                alt = f' alt="{rng.choice(JAPANESE_WORDS)}"' if number % 3 else ''
+                parts.append(f'<img src="/img/{index}_{number}.png"{alt}>')
+            parts.append(f'<p>{" ".join(body_words[start:start + paragraph])}</p>')
+        parts.append('<script>window.dataLayer = [];</script></main><footer>footer</footer></body></html>')
+        return ''.join(parts)
+
+    def response(self, path):
+        """
+        パスに対する応答を生成する
+        戻り値: (ステータスコード, HTML, 遅延秒数)
+        """
+        index = self.page_index(path)
+        if index is None:
+            return 404, '<html><body>Not Found</body></html>', 0.0
+        kind = self.page_kind(index)
+        if kind == 'error':
+            status = 500 if index % 2 else 404
+            return status, '<html><body>Error</body></html>', 0.0
+        return 200, self.render(index), self.slow_delay if kind == 'slow' else 0.0
@@ -0,0 +1,586 @@
+"""
+クロール結果の永続ストア（SQLite）
+取得したページをクロールIDごとに逐次保存し、中断したクロールの再開と
+ページデータの遅延読み込み（全件をメモリに保持しない）を可能にする
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from frontier import normalize_url, url_partition
+from search_index import INDEX_SCHEMA, write_index_entry
+
+DEFAULT_STORE_PATH = os.path.join('.seo_cache', 'crawls.sqlite')
+
+# フロンティアのURL状態
+STATE_QUEUED = 'queued'
+STATE_VISITED = 'visited'
+STATE_FAILED = 'failed'
+STATE_BLOCKED = 'blocked'
+# 分散クロールでワーカーが取り出し、取得中のURL
+STATE_CLAIMED = 'claimed'
+
+# URL→IDの対応を接続ごとに保持する上限（超えた分はストアを引く）
+URL_ID_CACHE_SIZE = 100000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS crawls (
+    crawl_id TEXT PRIMARY KEY,
+    start_url TEXT,
+    max_pages INTEGER,
+    status TEXT,
+    created_at REAL,
+    updated_at REAL
+);
+CREATE TABLE IF NOT EXISTS frontier (
+    crawl_id TEXT,
+    url TEXT,
+    seq INTEGER,
+    depth INTEGER,
+    priority REAL,
+    state TEXT,
+    url_key TEXT,
+    PRIMARY KEY (crawl_id, url)
+);
+CREATE TABLE IF NOT EXISTS pages (
+    crawl_id TEXT,
+    seq INTEGER,
+    url TEXT,
+    data TEXT,
+    PRIMARY KEY (crawl_id, seq)
+);
+CREATE TABLE IF NOT EXISTS crawl_info (
+    crawl_id TEXT PRIMARY KEY,
+    data TEXT
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    crawl_id TEXT,
+    key TEXT,
+    data TEXT,
+    created_at REAL,
+    PRIMARY KEY (crawl_id, key)
+);
+CREATE TABLE IF NOT EXISTS seq_counters (
+    crawl_id TEXT PRIMARY KEY,
+    next_seq INTEGER
+);
+CREATE TABLE IF NOT EXISTS host_politeness (
+    host TEXT PRIMARY KEY,
+    next_allowed REAL
+);
+CREATE TABLE IF NOT EXISTS link_urls (
+    url_id INTEGER PRIMARY KEY,
+    crawl_id TEXT,
+    url TEXT,
+    url_key TEXT,
+    UNIQUE (crawl_id, url_key)
+);
+CREATE TABLE IF NOT EXISTS sitemap_urls (
+    crawl_id TEXT,
+    url TEXT,
+    priority REAL,
+    lastmod TEXT,
+    PRIMARY KEY (crawl_id, url)
+);
+"""
+
+
+class CrawlStore:
+    """
+    クロールID単位でフロンティアとページデータを保存するストア
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        # クロールIDごとのURL→link_urlsのID
+        self._url_ids = {}
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.create_function('url_partition', 3, url_partition, deterministic=True)
+        self._conn.executescript(SCHEMA)
+        self._conn.executescript(INDEX_SCHEMA)
+        self._migrate()
+        self._conn.commit()
+
+    def _migrate(self):
+        """
+        以前のバージョンで作成したストアに列を追加する
+        """
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(frontier)")}
+        if 'url_key' not in columns:
+            try:
+                self._conn.execute("ALTER TABLE frontier ADD COLUMN url_key TEXT")
+            except sqlite3.OperationalError:
+                # 同時に開いた別のプロセスが追加済み
+                return
+            # 以前のバージョンはURLを正規化して保存していたため、そのまま訪問済み判定のキーにする
+            self._conn.execute("UPDATE frontier SET url_key = url")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # クロール管理
+
+    def create_crawl(self, start_url, max_pages):
+        crawl_id = uuid.uuid4().hex[:16]
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO crawls VALUES (?, ?, ?, 'running', ?, ?)",
+                (crawl_id, start_url, max_pages, now, now)
+            )
+            self._conn.commit()
+        return crawl_id
+
+    def find_resumable(self, start_url, max_pages):
+        """
+        同じ開始URL・ページ数で中断されたクロールのIDを返す（なければNone）
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT crawl_id FROM crawls WHERE start_url = ? AND max_pages = ? AND status = 'running' "
+                "ORDER BY updated_at DESC LIMIT 1",
+                (start_url, max_pages)
+            ).fetchone()
+        return row[0] if row else None
+
+    def find_recent(self, start_url, max_pages, max_age):
+        """
+        同じ開始URL・ページ数でmax_age秒以内に完了したクロールのIDを返す（なければNone）
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT crawl_id FROM crawls WHERE start_url = ? AND max_pages = ? AND status = 'done' "
+                "AND updated_at >= ? ORDER BY updated_at DESC LIMIT 1",
+                (start_url, max_pages, time.time() - max_age)
+            ).fetchone()
+        return row[0] if row else None
+
+    def finish_crawl(self, crawl_id):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE crawls SET status = 'done', updated_at = ? WHERE crawl_id = ?",
+                (time.time(), crawl_id)
+            )
+            self._conn.commit()
+
+    def save_info(self, crawl_id, info):
+        """
+        クロールの付加情報（robots.txt・サイトマップの取得結果など）を保存する
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO crawl_info VALUES (?, ?)",
+                (crawl_id, json.dumps(info, ensure_ascii=False))
+            )
+            self._conn.commit()
+
+    def load_info(self, crawl_id):
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM crawl_info WHERE crawl_id = ?", (crawl_id,)).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def save_snapshot(self, crawl_id, key, data):
+        """
+        クロール結果の集計（競合サイトの比較用など）を保存する
+        key: 集計の条件（キーワードなど）を表す文字列
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?)",
+                (crawl_id, key, json.dumps(data, ensure_ascii=False), time.time())
+            )
+            self._conn.commit()
+
+    def load_snapshot(self, crawl_id, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM snapshots WHERE crawl_id = ? AND key = ?", (crawl_id, key)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    # フロンティア
+
+    def load_frontier(self, crawl_id):
+        """
+        保存済みのフロンティアを発見順に返す
+        戻り値: [(URL, 発見順, クリック深度, 優先度, 状態), ...]
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT url, seq, depth, priority, state FROM frontier WHERE crawl_id = ? ORDER BY seq",
+                (crawl_id,)
+            ).fetchall()
+
+    def enqueue(self, crawl_id, entries, state=STATE_QUEUED):
+        """
+        フロンティアにURLを追加する
+        entries: [(URL, 発見順, クリック深度, 優先度), ...]
+        state: 登録時の状態（robots.txtで禁止されたURLはSTATE_BLOCKEDで登録する）
+        """
+        with self._lock:
+            self._insert_frontier(crawl_id, entries, state)
+            self._conn.commit()
+
+    def _insert_frontier(self, crawl_id, entries, state=STATE_QUEUED):
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO frontier VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(crawl_id, url, seq, depth, priority, state, normalize_url(url)) for url, seq, depth, priority in entries]
+        )
+
+    def mark(self, crawl_id, url, state):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE frontier SET state = ? WHERE crawl_id = ? AND url = ?",
+                (state, crawl_id, url)
+            )
+            self._conn.commit()
+
+    def visited_count(self, crawl_id):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM frontier WHERE crawl_id = ? AND state = ?",
+                (crawl_id, STATE_VISITED)
+            ).fetchone()[0]
+
+    def frontier_counts(self, crawl_id):
+        """
+        フロンティアの状態ごとのURL数
+        戻り値: {状態: URL数}
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT state, COUNT(*) FROM frontier WHERE crawl_id = ? GROUP BY state", (crawl_id,)
+            ).fetchall()
+        return dict(rows)
+
+    # 分散クロール（複数のワーカープロセスが同じストアのフロンティアを共有する）
+
+    def create_claim_index(self):
+        """
+        状態ごとにフロンティアを引く索引と、正規化したURLの一意索引を作成する
+        （通常のクロールの書き込みを遅くしないよう、分散クロールの開始時だけ作る。通常のクロールの訪問済み判定はURLFrontierで行う）
+        """
+        with self._lock:
+            self._conn.execute("CREATE INDEX IF NOT EXISTS frontier_state ON frontier (crawl_id, state)")
+            # 別々のワーカーが表記の異なる同じURL（末尾スラッシュなど）を見つけても1件だけ登録する
+            self._conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS frontier_key ON frontier (crawl_id, url_key)")
+            self._conn.commit()
+
+    def _immediate(self):
+        """
+        書き込みロックを先に取得するトランザクションを開始する（ワーカー間で読み取りと更新を不可分にする）
+        """
+        self._conn.execute("BEGIN IMMEDIATE")
+
+    def reserve_seqs(self, crawl_id, count):
+        """
+        ワーカー間で重ならない発見順をcount個確保する
+        戻り値: 確保した範囲の先頭（先頭からcount個を使える）
+        """
+        with self._lock:
+            self._immediate()
+            try:
+                row = self._conn.execute("SELECT next_seq FROM seq_counters WHERE crawl_id = ?", (crawl_id,)).fetchone()
+                if row is None:
+                    row = self._conn.execute(
+                        "SELECT COALESCE(MAX(seq), -1) + 1 FROM frontier WHERE crawl_id = ?", (crawl_id,)
+                    ).fetchone()
+                start = row[0]
+                self._conn.execute("INSERT OR REPLACE INTO seq_counters VALUES (?, ?)", (crawl_id, start + count))
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        return start
+
+    def claim_urls(self, crawl_id, partition, partitions, limit, max_pages=None, partition_by='host'):
+        """
+        担当パーティションの未取得のURLをクリック深度・優先度・発見順に取り出し、取得中にする
+        max_pages: 取得済みと取得中のURLの合計がこの数を超えないように取り出す（全ワーカー共通）
+        戻り値: [(URL, 発見順, クリック深度, 優先度), ...]
+        """
+        with self._lock:
+            self._immediate()
+            try:
+                if max_pages is not None:
+                    taken = self._conn.execute(
+                        "SELECT COUNT(*) FROM frontier WHERE crawl_id = ? AND state IN (?, ?)",
+                        (crawl_id, STATE_VISITED, STATE_CLAIMED)
+                    ).fetchone()[0]
+                    limit = min(limit, max_pages - taken)
+                rows = []
+                if limit > 0:
+                    rows = self._conn.execute(
+                        "SELECT url, seq, depth, priority FROM frontier "
+                        "WHERE crawl_id = ? AND state = ? AND url_partition(url, ?, ?) = ? "
+                        "ORDER BY depth, priority DESC, seq LIMIT ?",
+                        (crawl_id, STATE_QUEUED, partitions, partition_by, partition, limit)
+                    ).fetchall()
+                    self._conn.executemany(
+                        "UPDATE frontier SET state = ? WHERE crawl_id = ? AND url = ?",
+                        [(STATE_CLAIMED, crawl_id, row[0]) for row in rows]
+                    )
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        return rows
+
+    def release_claims(self, crawl_id, urls=None):
+        """
+        取得中のURLを未取得に戻す（urlsを省略した場合はすべて。中断したワーカーの分を再開時に戻す）
+        """
+        with self._lock:
+            if urls is None:
+                self._conn.execute(
+                    "UPDATE frontier SET state = ? WHERE crawl_id = ? AND state = ?",
+                    (STATE_QUEUED, crawl_id, STATE_CLAIMED)
+                )
+            else:
+                self._conn.executemany(
+                    "UPDATE frontier SET state = ? WHERE crawl_id = ? AND url = ? AND state = ?",
+                    [(STATE_QUEUED, crawl_id, url, STATE_CLAIMED) for url in urls]
+                )
+            self._conn.commit()
+
+    def reserve_host_slot(self, host, min_interval):
+        """
+        全ワーカー共通のホストへの送信間隔を確保する（時刻はtime.time()のため、同じマシンのワーカー間で共有する）
+        min_interval: 次の送信までに空ける秒数
+        戻り値: 確保できた場合は0、送信できるようになるまでの秒数
+        """
+        with self._lock:
+            self._immediate()
+            try:
+                row = self._conn.execute("SELECT next_allowed FROM host_politeness WHERE host = ?", (host,)).fetchone()
+                now = time.time()
+                if row is not None and row[0] > now:
+                    self._conn.rollback()
+                    return row[0] - now
+                if min_interval > 0:
+                    self._conn.execute("INSERT OR REPLACE INTO host_politeness VALUES (?, ?)",
+                                       (host, now + min_interval))
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        return 0
+
+    def delay_host(self, host, seconds):
+        """
+        全ワーカーのホストへの送信を指定秒数だけ止める（Retry-Afterなど）
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO host_politeness VALUES (?, ?) "
+                "ON CONFLICT(host) DO UPDATE SET next_allowed = MAX(next_allowed, excluded.next_allowed)",
+                (host, time.time() + seconds)
+            )
+            self._conn.commit()
+
+    # サイトマップ
+
+    def add_sitemap_urls(self, crawl_id, entries):
+        """
+        サイトマップに記載されたURLを保存する
+        entries: [(URL, 優先度, 最終更新日), ...]
+        """
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO sitemap_urls VALUES (?, ?, ?, ?)",
+                [(crawl_id, url, priority, lastmod) for url, priority, lastmod in entries]
+            )
+            self._conn.commit()
+
+    def sitemap_entries(self, crawl_id):
+        """
+        サイトマップのURLとフロンティア上の状態
+        戻り値: [(URL, 優先度, 最終更新日, 状態), ...]
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT s.url, s.priority, s.lastmod, f.state FROM sitemap_urls s "
+                "LEFT JOIN frontier f ON f.crawl_id = s.crawl_id AND f.url = s.url "
+                "WHERE s.crawl_id = ? ORDER BY s.rowid",
+                (crawl_id,)
+            ).fetchall()
+
+    # ページデータ
+
+    def _intern_urls(self, crawl_id, urls):
+        """
+        URLをクロール内で共通の整数ID（link_urlsの行ID）に置き換える（呼び出し側のトランザクション内で実行する）
+        正規化したURLが同じものは同じIDになり、URL文字列はストアに1回だけ保存される
+        （分散クロールの各ワーカーが同じストアに書き込んでも、一意制約により同じURLは同じIDになる）
+        戻り値: (IDの一覧, {新たに引いたURL: ID})（新たに引いた分はコミット後に_remember_url_idsでキャッシュする）
+        """
+        cache = self._url_ids.get(crawl_id, {})
+        new_ids = {}
+        ids = []
+        for url in urls:
+            url_id = cache.get(url) or new_ids.get(url)
+            if url_id is None:
+                key = normalize_url(url)
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO link_urls (crawl_id, url, url_key) VALUES (?, ?, ?)", (crawl_id, url, key)
+                )
+                url_id = new_ids[url] = self._conn.execute(
+                    "SELECT url_id FROM link_urls WHERE crawl_id = ? AND url_key = ?", (crawl_id, key)
+                ).fetchone()[0]
+            ids.append(url_id)
+        return ids, new_ids
+
+    def _remember_url_ids(self, crawl_id, new_ids):
+        """
+        コミットしたURL→IDの対応をキャッシュする（ロールバックした分をキャッシュすると、存在しないIDを参照してしまう）
+        """
+        cache = self._url_ids.setdefault(crawl_id, {})
+        if len(cache) + len(new_ids) > URL_ID_CACHE_SIZE:
+            cache.clear()
+        cache.update(new_ids)
+
+    def record_page(self, crawl_id, seq, page_data, discovered=(), index_entry=None, blocked=()):
+        """
+        ページデータの保存、訪問済みへの更新、新規URLの追加を1トランザクションで行う
+        （途中で中断しても保存内容とフロンティアの整合性が保たれる）
+        内部リンクはURLの一覧ではなく、link_urlsのID（'url_id'・'link_ids'）で保存する
+        index_entry: search_index.build_index_entryの結果（転置インデックスにも登録する）
+        blocked: robots.txtで禁止された新規URL（discoveredと同じ形式）
+        """
+        record = {key: value for key, value in page_data.items() if key != 'internal_links'}
+        with self._lock:
+            try:
+                ids, new_ids = self._intern_urls(crawl_id, [page_data['url'], *page_data.get('internal_links', ())])
+                record['url_id'] = ids[0]
+                record['link_ids'] = ids[1:]
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)",
+                    (crawl_id, seq, page_data['url'], json.dumps(record, ensure_ascii=False))
+                )
+                self._conn.execute(
+                    "UPDATE frontier SET state = ? WHERE crawl_id = ? AND url = ?",
+                    (STATE_VISITED, crawl_id, page_data['url'])
+                )
+                self._insert_frontier(crawl_id, discovered)
+                self._insert_frontier(crawl_id, blocked, STATE_BLOCKED)
+                if index_entry is not None:
+                    write_index_entry(self._conn, crawl_id, seq, index_entry)
+                self._conn.execute("UPDATE crawls SET updated_at = ? WHERE crawl_id = ?", (time.time(), crawl_id))
+                self._conn.commit()
+                self._remember_url_ids(crawl_id, new_ids)
+            except Exception:
+                # 途中まで書いた行を残すと、次のコミットでページとフロンティアの片方だけが保存される
+                self._conn.rollback()
+                raise
+
+
+class StoredPages:
+    """
+    ストア上のページデータを遅延読み込みするシーケンス
+    pages_dataのリストの代わりに使え、反復時はbatch_size件ずつ発見順に読み込む
+    （内部リンクはURLの一覧の代わりにIDで返す。URLはlink_urls()で引く）
+    （読み込み専用の接続を1つだけ開いて使い回す。接続はpickleしないため、st.cache_dataやセッションステートに保存できる）
+    """
+
+    def __init__(self, path, crawl_id, batch_size=500):
+        self.path = path
+        self.crawl_id = crawl_id
+        self.batch_size = batch_size
+        self._length = None
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _query(self, sql, params):
+        """
+        読み込み専用の接続でクエリを実行する（スキーマの作成などは行わない）
+        """
+        with self._lock:
+            if self._conn is None:
+                self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+                self._conn.execute("PRAGMA query_only = ON")
+            return self._conn.execute(sql, params).fetchall()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def __del__(self):
+        if getattr(self, '_lock', None) is not None:
+            self.close()
+
+    def __len__(self):
+        if self._length is not None:
+            return self._length
+        rows = self._query(
+            "SELECT (SELECT COUNT(*) FROM pages WHERE crawl_id = ?), "
+            "(SELECT status FROM crawls WHERE crawl_id = ?)",
+            (self.crawl_id, self.crawl_id)
+        )
+        length, status = rows[0]
+        # 実行中のクロールはページが増えるため、完了したクロールの件数だけを保持する
+        if status == 'done':
+            self._length = length
+        return length
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __iter__(self):
+        # 前回の最後の発見順より後を読み込む（OFFSETと違い、後半のバッチも索引で直接引ける）
+        last_seq = -1
+        while True:
+            rows = self._query(
+                "SELECT seq, data FROM pages WHERE crawl_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+                (self.crawl_id, last_seq, self.batch_size)
+            )
+            if not rows:
+                break
+            for _, data in rows:
+                yield json.loads(data)
+            last_seq = rows[-1][0]
+
+    def link_urls(self):
+        """
+        内部リンクのID（ページデータの'url_id'・'link_ids'）からURLへの対応表
+        戻り値: {ID: URL}
+        """
+        return dict(self._query("SELECT url_id, url FROM link_urls WHERE crawl_id = ?", (self.crawl_id,)))
+
+    def _fetch(self, offset, limit):
+        rows = self._query(
+            "SELECT data FROM pages WHERE crawl_id = ? ORDER BY seq LIMIT ? OFFSET ?",
+            (self.crawl_id, limit, offset)
+        )
+        return [json.loads(row[0]) for row in rows]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return list(self)[index]
+            return self._fetch(start, max(0, stop - start))
+
+        if index < 0:
+            index += len(self)
+        pages = self._fetch(index, 1) if index >= 0 else []
+        if not pages:
+            raise IndexError(index)
+        return pages[0]
+
+    def __getstate__(self):
+        return {'path': self.path, 'crawl_id': self.crawl_id, 'batch_size': self.batch_size}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'], state['crawl_id'], state['batch_size'])
@@ -0,0 +1,619 @@
+"""
+並行クローリングエンジン
+スレッドプールで複数リクエストを同時に処理し、ホスト単位のレート制限で
+サーバーへの負荷を抑えながらページデータを収集する。
+複数サイト（競合サイトなど）は1つのスケジューラーでページ数・時間の予算を分け合って同時にクロールする
+"""
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from email.utils import parsedate_to_datetime
+
+from crawl_store import StoredPages, STATE_QUEUED, STATE_VISITED, STATE_FAILED, STATE_BLOCKED
+from extractor import extract_page
+from frontier import URLFrontier, clean_url, url_host
+from http_client import DEFAULT_CACHE_MAX_AGE, MAX_BODY_BYTES, HttpClient, is_html_url
+from instrumentation import (COUNTER_CACHE_HITS, COUNTER_NON_HTML, COUNTER_RETRIES, COUNTER_SKIPPED,
+                             COUNTER_TRUNCATED, measure_stage)
+from parse_pool import ParsePool, decode_body
+from rate_limit import HostRateLimiter
+from robots import RobotsRules, fetch_robots
+from search_index import build_index_entry
+from sitemaps import default_sitemap_url, iter_sitemap_urls
+
+# User-Agent設定
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# レート制限でリトライ対象とするステータスコード
+RETRY_STATUS_CODES = (429, 503)
+
+# サイトマップから登録したURLをストアに書き込む単位
+SEED_BATCH_SIZE = 1000
+
+
+def parse_retry_after(value, default=1.0):
+    """
+    Retry-Afterヘッダー（秒数またはHTTP日付）を待機秒数に変換する
+    """
+    if not value:
+        return default
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+def fetch_url(url, client, limiter, timeout=10, max_retries=3, instrumentation=None, acquired=False):
+    """
+    レート制限に従ってURLを取得する（429/503はRetry-Afterを尊重してリトライ）
+    instrumentation: Instrumentation（指定するとリトライ回数を記録する）
+    acquired: 呼び出し側がtry_acquireで接続枠を確保済み（最初のリクエストは待たずに送信する）
+    """
+    host = url_host(url)
+
+    for attempt in range(max_retries + 1):
+        if not (acquired and attempt == 0):
+            limiter.acquire(host)
+        try:
+            started = time.perf_counter()
+            response = client.get_page(url, timeout=timeout)
+            # レート制限の待ち時間を除いた、リクエストから本文の受信完了までの時間
+            response.fetch_seconds = time.perf_counter() - started
+        finally:
+            limiter.release(host)
+
+        if response.status_code in RETRY_STATUS_CODES and attempt < max_retries:
+            if instrumentation is not None:
+                instrumentation.increment(COUNTER_RETRIES)
+            wait_seconds = parse_retry_after(response.headers.get('Retry-After'), default=2 ** attempt)
+            limiter.backoff(host, wait_seconds)
+            continue
+
+        return response
+
+    return response
+
+
+def _fetch_one(url, client, limiter, timeout, instrumentation=None, acquired=False):
+    """
+    1ページ分の取得（ワーカースレッドで実行）。本文はデコードせずにバイト列のまま返す
+    instrumentation, acquired: fetch_urlと同じ
+    戻り値: {'status', 'body', 'encoding', 'latency', 'wait', 'parse'（HTMLとして解析するか）,
+            'skipped', 'truncated', 'from_cache'}
+    """
+    response = fetch_url(url, client, limiter, timeout=timeout, instrumentation=instrumentation, acquired=acquired)
+    latency = response.fetch_seconds
+    from_cache = getattr(response, 'from_cache', False)
+    return {
+        'status': response.status_code,
+        'body': response.content,
+        'encoding': response.encoding,
+        'latency': latency,
+        # 304でキャッシュから組み立てたレスポンスは本文を受信しないため、全体を応答待ちとする
+        'wait': latency if from_cache else min(response.elapsed.total_seconds(), latency),
+        # HTML以外（Content-Typeで判定）は本文を受信していないため解析しない
+        'parse': response.status_code == 200 and not response.skipped,
+        'skipped': response.skipped,
+        'truncated': response.truncated,
+        'from_cache': from_cache
+    }
+
+
+def _record_fetch(instrumentation, url, fetched, parse_time=0.0):
+    """
+    _fetch_oneの結果と解析時間を記録する（instrumentationがNoneの場合は何もしない）
+    """
+    if instrumentation is None:
+        return
+    if fetched['skipped']:
+        instrumentation.increment(COUNTER_NON_HTML)
+    if fetched['truncated']:
+        instrumentation.increment(COUNTER_TRUNCATED)
+    if fetched['from_cache']:
+        instrumentation.increment(COUNTER_CACHE_HITS)
+    instrumentation.record_fetch(url, fetched['status'], fetched['latency'], fetched['wait'], len(fetched['body']),
+                                 parse_time)
+
+
+def _crawl_one(url, base_domain, client, limiter, timeout, instrumentation=None, acquired=False):
+    """
+    1ページ分の取得と解析（ワーカースレッドで実行）
+    instrumentation: Instrumentation（指定すると取得時間・バイト数・ステータス・解析時間を記録する）
+    acquired: fetch_urlと同じ
+    戻り値: (レスポンスを受信したか, ページデータまたはNone)
+    """
+    fetched = _fetch_one(url, client, limiter, timeout, instrumentation=instrumentation, acquired=acquired)
+    page_data = None
+    parse_time = 0.0
+    if fetched['parse']:
+        started = time.perf_counter()
+        page_data = extract_page(decode_body(fetched['body'], fetched['encoding']), url, base_domain)
+        parse_time = time.perf_counter() - started
+    _record_fetch(instrumentation, url, fetched, parse_time)
+    return True, page_data
+
+
+def prepare_start_url(url):
+    """
+    開始URLにスキームを補い、フラグメントを除く（入力された末尾スラッシュ・クエリはそのまま取得する）
+    """
+    url = url.strip()
+    if not url.startswith(('http://', 'https://')):
+        url = 'https://' + url
+    return clean_url(url)
+
+
+def resolve_crawl_id(store, url, max_pages, crawl_id=None):
+    """
+    保存に使うクロールIDを決める（同じ条件で中断されたクロールがあればそのIDを再利用）
+    """
+    return crawl_id or store.find_resumable(url, max_pages) or store.create_crawl(url, max_pages)
+
+
+def seed_frontier(url, frontier, robots, client, limiter, timeout=10, use_sitemaps=True, max_sitemap_urls=50000,
+                  store=None, crawl_id=None, instrumentation=None):
+    """
+    新しいクロールのフロンティアに開始URLとサイトマップのURL（優先度付き）を登録する
+    サイトマップはrobots.txtのSitemap行（なければ/sitemap.xml）から読み込み、
+    robots.txtで禁止されたURLはキューに入れずに記録する（instrumentationを指定するとスキップした件数を記録する）
+    戻り値: robots.txt・サイトマップの取得結果（storeを指定した場合は保存もする）
+    """
+    sitemap_urls = (robots.sitemaps or [default_sitemap_url(url)]) if use_sitemaps else []
+    info = {
+        'robots_found': robots.found,
+        'crawl_delay': robots.crawl_delay,
+        'sitemaps': sitemap_urls,
+        'sitemap_urls': 0
+    }
+    queued, blocked, listed = [], [], []
+
+    def add(target, depth, priority):
+        if not is_html_url(target):
+            # 拡張子からHTMLでないとわかるURL（PDF・画像など）はリクエストしない
+            if frontier.skip(target) is not None and instrumentation is not None:
+                instrumentation.increment(COUNTER_NON_HTML)
+            return
+        if robots.allowed(target):
+            seq = frontier.push(target, depth=depth, priority=priority)
+            if seq is not None:
+                queued.append((target, seq, depth, priority))
+        else:
+            seq = frontier.skip(target)
+            if seq is not None:
+                blocked.append((target, seq, depth, priority))
+
+    def flush():
+        if instrumentation is not None and blocked:
+            instrumentation.increment(COUNTER_SKIPPED, len(blocked))
+        if store is not None:
+            store.enqueue(crawl_id, queued)
+            store.enqueue(crawl_id, blocked, STATE_BLOCKED)
+            store.add_sitemap_urls(crawl_id, listed)
+        queued.clear()
+        blocked.clear()
+        listed.clear()
+
+    add(url, 0, 1.0)
+    # サイトマップのURLは開始ページの次（深度1）に、サイトマップの優先度の高い順でクロールする
+    for entry in iter_sitemap_urls(client, sitemap_urls, url_host(url), limiter=limiter, timeout=timeout,
+                                   max_urls=max_sitemap_urls):
+        add(entry[0], 1, entry[1])
+        listed.append(entry)
+        info['sitemap_urls'] += 1
+        if len(listed) >= SEED_BATCH_SIZE:
+            flush()
+    flush()
+
+    if store is not None:
+        store.save_info(crawl_id, info)
+    return info
+
+
+class SiteCrawl:
+    """
+    1サイト分のクロールの状態（robots.txt・フロンティア・取得数）
+    リクエストの割り当てはCrawlSchedulerが行う。引数はiter_crawlと同じ
+    """
+
+    def __init__(self, url, max_pages=10, store=None, crawl_id=None, respect_robots=True, use_sitemaps=True,
+                 max_sitemap_urls=50000, bloom_threshold=100000, instrumentation=None):
+        self.url = prepare_start_url(url)
+        self.host = url_host(self.url)
+        self.max_pages = max_pages
+        self.store = store
+        self.crawl_id = crawl_id
+        self.respect_robots = respect_robots
+        self.use_sitemaps = use_sitemaps
+        self.max_sitemap_urls = max_sitemap_urls
+        self.instrumentation = instrumentation
+        # クリック深度・サイトマップの優先度・発見順に取り出す
+        self.frontier = URLFrontier(bloom_threshold=bloom_threshold,
+                                    bloom_capacity=max_pages * 50 + (max_sitemap_urls if use_sitemaps else 0))
+        self.robots = RobotsRules()
+        self.visited = 0
+        self.pending = 0
+        # robots.txtの取得とフロンティアの準備が済んだか
+        self.ready = False
+
+    def prepare(self, client, limiter, timeout):
+        """
+        robots.txtを取得し、中断したクロールのフロンティアを復元するか、開始URLとサイトマップを登録する
+        （ワーカースレッドで実行）
+        """
+        self.load_robots(client, limiter, timeout)
+
+        saved_frontier = []
+        if self.store is not None:
+            self.crawl_id = resolve_crawl_id(self.store, self.url, self.max_pages, self.crawl_id)
+            saved_frontier = self.store.load_frontier(self.crawl_id)
+            for saved_url, seq, depth, priority, state in saved_frontier:
+                self.frontier.restore(saved_url, seq, depth, priority, queued=(state == STATE_QUEUED))
+            self.visited = self.store.visited_count(self.crawl_id)
+
+        if not saved_frontier:
+            with measure_stage(self.instrumentation, 'sitemaps'):
+                seed_frontier(self.url, self.frontier, self.robots, client, limiter, timeout=timeout,
+                              use_sitemaps=self.use_sitemaps, max_sitemap_urls=self.max_sitemap_urls,
+                              store=self.store, crawl_id=self.crawl_id, instrumentation=self.instrumentation)
+
+    def load_robots(self, client, limiter, timeout):
+        """
+        robots.txtを取得し、Crawl-delayをレート制限に反映する
+        """
+        # robots.txtは開始時に1回だけ取得する（内部リンクは同じホストのため）
+        with measure_stage(self.instrumentation, 'robots'):
+            if self.respect_robots:
+                self.robots = fetch_robots(client, self.url, timeout=timeout)
+        if self.robots.crawl_delay:
+            limiter.set_min_interval(self.host, self.robots.crawl_delay)
+
+    def wants_request(self):
+        return self.ready and bool(self.frontier) and self.visited + self.pending < self.max_pages
+
+    def idle_delay(self):
+        """
+        割り当てるURLがないときに、待てば次のURLが届く場合の待ち秒数（届かない場合はNone）
+        """
+        return None
+
+    def next_request(self):
+        self.pending += 1
+        return self.frontier.pop()
+
+    def complete(self, future, current_url, depth, seq):
+        """
+        _crawl_oneの結果をフロンティアとストアに反映する
+        戻り値: iter_crawlが返す辞書（取得に失敗した場合はNone）
+        """
+        try:
+            responded, page_data = future.result()
+        except Exception as e:
+            self.fail(current_url, e)
+            return None
+        return self.record(current_url, depth, seq, page_data, responded=responded)
+
+    def fail(self, current_url, error):
+        """
+        取得・解析に失敗したページを記録する
+        """
+        self.pending -= 1
+        print(f"Error crawling {current_url}: {error}")
+        if self.instrumentation is not None:
+            self.instrumentation.record_error(current_url, error)
+        if self.store is not None:
+            self.store.mark(self.crawl_id, current_url, STATE_FAILED)
+
+    def record(self, current_url, depth, seq, page_data, index_entry=None, responded=True):
+        """
+        1ページ分の結果をフロンティアとストアに反映する
+        index_entry: build_index_entryの結果（解析プロセスで作成済みの場合）
+        戻り値: iter_crawlが返す辞書
+        """
+        self.pending -= 1
+        if responded:
+            self.visited += 1
+        if page_data is None:
+            if self.store is not None:
+                self.store.mark(self.crawl_id, current_url, STATE_VISITED)
+        else:
+            discovered = []
+            blocked = []
+            non_html = 0
+            for href in page_data['internal_links']:
+                if not is_html_url(href):
+                    # 拡張子からHTMLでないとわかるURL（PDF・画像など）はリクエストしない
+                    if self.frontier.skip(href) is not None:
+                        non_html += 1
+                elif self.robots.allowed(href):
+                    new_seq = self.frontier.push(href, depth=depth + 1)
+                    if new_seq is not None:
+                        discovered.append((href, new_seq, depth + 1, 0.5))
+                else:
+                    new_seq = self.frontier.skip(href)
+                    if new_seq is not None:
+                        blocked.append((href, new_seq, depth + 1, 0.5))
+
+            if self.instrumentation is not None:
+                if blocked:
+                    self.instrumentation.increment(COUNTER_SKIPPED, len(blocked))
+                if non_html:
+                    self.instrumentation.increment(COUNTER_NON_HTML, non_html)
+            if self.store is not None:
+                if index_entry is None:
+                    index_entry = build_index_entry(page_data)
+                self.store.record_page(self.crawl_id, seq, page_data, discovered, index_entry, blocked=blocked)
+
+        return {
+            'site': self.url,
+            'url': current_url,
+            'seq': seq,
+            'page_data': page_data,
+            'visited': self.visited,
+            'queued': len(self.frontier),
+            'max_pages': self.max_pages
+        }
+
+    def finish(self):
+        """
+        フロンティアを使い切るか最大ページ数に達していれば、ストアのクロールを完了にする
+        （予算・キャンセルで途中終了した場合は、次回のクロールで再開できるよう未完了のままにする）
+        """
+        if self.store is not None and self.ready and (not self.frontier or self.visited >= self.max_pages):
+            self.store.finish_crawl(self.crawl_id)
+
+
+class CrawlScheduler:
+    """
+    複数サイトのクロールを1つのスレッドプールとHTTPクライアントで同時に実行するスケジューラー
+    空いたワーカーには、送信できるホストのうち取得数（取得中を含む）が最も少ないサイトのURLを割り当て、
+    全体のページ数・時間の予算をサイト間で均等に分け合う（早く終わったサイトの残りは他のサイトが使う）。
+    ホストごとのリクエスト間隔・同時接続数・Crawl-delayは共通のHostRateLimiterで守る
+    max_workers: 全サイト合計の同時リクエスト数
+    requests_per_second: ホストごとの最大リクエスト数/秒
+    max_host_workers: ホストごとの最大同時接続数（省略時はmax_workers）
+    total_pages: 全サイト合計の最大ページ数（省略時は各サイトのmax_pagesだけで制限する）
+    time_budget: クロール全体の制限時間（秒）。超えると新しいリクエストを止めて終了する
+    cancel: threading.Event（セットされると新しいリクエストを止めて終了する）
+    max_body_bytes: ページの本文の最大サイズ（超えた分は受信せず、先頭だけを解析する）
+    cache_max_age: 条件付きGETキャッシュを残す期間（秒）。この期間に取得されなかったURLは開始時に削除する
+    parse_workers: HTML解析に使うプロセス数（0の場合は取得したワーカースレッドで解析する）。
+                   取得スレッドは本文をバイト列のまま解析プロセスに渡し、解析待ちが上限に達すると
+                   新しいリクエストを止める（解析待ちのページもmax_workersの枠を使う）
+    limiter: 使用するHostRateLimiter（省略時はrequests_per_secondとmax_host_workersから作成する）
+    """
+
+    def __init__(self, max_workers=8, requests_per_second=10.0, timeout=10, cache_dir=None, max_host_workers=None,
+                 total_pages=None, time_budget=None, cancel=None, max_body_bytes=MAX_BODY_BYTES,
+                 cache_max_age=DEFAULT_CACHE_MAX_AGE, parse_workers=0, limiter=None):
+        self.max_workers = max(1, int(max_workers))
+        self.timeout = timeout
+        self.total_pages = total_pages
+        self.time_budget = time_budget
+        self.cancel = cancel
+        self.cache_dir = cache_dir
+        self.max_body_bytes = max_body_bytes
+        self.cache_max_age = cache_max_age
+        self.parse_workers = max(0, int(parse_workers or 0))
+        self.limiter = limiter or HostRateLimiter(requests_per_second=requests_per_second,
+                                                  max_concurrency=max_host_workers or self.max_workers)
+        self.client = None
+        self.parse_pool = None
+        self.sites = []
+        # 取得中・解析待ちのページ数（max_workersの枠を使う）
+        self._busy = 0
+        # 解析プロセスに渡せずに待っているページ: (site, request, _fetch_oneの結果)
+        self._unparsed = deque()
+
+    def add_site(self, url, max_pages=10, **options):
+        """
+        クロールするサイトを登録する（optionsはSiteCrawlの引数）
+        戻り値: SiteCrawl
+        """
+        site = SiteCrawl(url, max_pages=max_pages, **options)
+        self.sites.append(site)
+        return site
+
+    def _dispatch(self, executor, pending, deadline):
+        """
+        空きワーカーにURLを割り当てる
+        戻り値: 次に送信できるようになるまでの秒数（レート制限で待っているサイトがなければNone）
+        """
+        if (self.cancel and self.cancel.is_set()) or (deadline is not None and time.monotonic() >= deadline):
+            return None
+        # 解析プロセスに渡せないページが残っている間は取得を止める
+        while self._busy < self.max_workers and not self._unparsed:
+            if self.total_pages is not None and sum(site.visited + site.pending for site in self.sites) >= self.total_pages:
+                return None
+            delay = None
+            candidates = sorted((site for site in self.sites if site.wants_request()),
+                                key=lambda site: site.visited + site.pending)
+            for site in candidates:
+                wait_seconds = self.limiter.try_acquire(site.host)
+                if wait_seconds == 0:
+                    break
+                if wait_seconds is not None:
+                    delay = wait_seconds if delay is None else min(delay, wait_seconds)
+            else:
+                for site in self.sites:
+                    wait_seconds = site.idle_delay()
+                    if wait_seconds is not None:
+                        delay = wait_seconds if delay is None else min(delay, wait_seconds)
+                return delay
+            request = site.next_request()
+            if self.parse_pool is None:
+                future = executor.submit(_crawl_one, request[0], site.host, self.client, self.limiter, self.timeout,
+                                         site.instrumentation, True)
+                pending[future] = (site, request, 'crawl')
+            else:
+                future = executor.submit(_fetch_one, request[0], self.client, self.limiter, self.timeout,
+                                         site.instrumentation, True)
+                pending[future] = (site, request, 'fetch')
+            self._busy += 1
+        return None
+
+    def _submit_parses(self, pending):
+        """
+        解析待ちのページを、解析プロセスの上限まで渡す
+        """
+        while self._unparsed and not self.parse_pool.full():
+            site, request, fetched = self._unparsed.popleft()
+            future = self.parse_pool.submit(fetched['body'], fetched['encoding'], request[0], site.host)
+            pending[future] = (site, (request, fetched), 'parse')
+
+    def _complete(self, future, site, request, stage, pending):
+        """
+        完了したタスクの結果を反映する
+        戻り値: iter_crawlが返す辞書（まだ解析が残っている場合・失敗した場合はNone）
+        """
+        if stage == 'prepare':
+            try:
+                future.result()
+                site.ready = True
+            except Exception as e:
+                print(f"Error preparing crawl for {site.url}: {e}")
+                if site.instrumentation is not None:
+                    site.instrumentation.record_error(site.url, e)
+            return None
+
+        if stage == 'crawl':
+            self._busy -= 1
+            return site.complete(future, *request)
+
+        if stage == 'fetch':
+            try:
+                fetched = future.result()
+            except Exception as e:
+                self._busy -= 1
+                site.fail(request[0], e)
+                return None
+            if fetched['parse']:
+                # 解析プロセスの結果が届くまでmax_workersの枠を使い続ける
+                self._unparsed.append((site, request, fetched))
+                return None
+            self._busy -= 1
+            _record_fetch(site.instrumentation, request[0], fetched)
+            return site.record(*request, None)
+
+        # 解析プロセスの結果（requestは(リクエスト, _fetch_oneの結果)）
+        self._busy -= 1
+        request, fetched = request
+        try:
+            page_data, index_entry, parse_time = future.result()
+        except Exception as e:
+            site.fail(request[0], e)
+            return None
+        _record_fetch(site.instrumentation, request[0], fetched, parse_time)
+        return site.record(*request, page_data, index_entry=index_entry)
+
+    def run(self):
+        """
+        登録したサイトをクロールし、ページを取得するたびに結果を返すジェネレータ
+        戻り値: iter_crawlと同じ辞書（'site'は取得したページのサイトの開始URL）を順に返す
+        （解析プロセスを使う場合、結果は解析が終わった順になる。ストアにはseqごとに保存するため順序に依存しない）
+        """
+        self.client = HttpClient(pool_size=self.max_workers, headers=DEFAULT_HEADERS, cache_dir=self.cache_dir,
+                                 max_body_bytes=self.max_body_bytes, cache_max_age=self.cache_max_age)
+        if self.parse_workers:
+            self.parse_pool = ParsePool(workers=self.parse_workers)
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        pending = {}
+        deadline = time.monotonic() + self.time_budget if self.time_budget else None
+        try:
+            # 各サイトのrobots.txtとサイトマップも並行して取得する
+            for site in self.sites:
+                pending[executor.submit(site.prepare, self.client, self.limiter, self.timeout)] = (site, None, 'prepare')
+
+            while True:
+                delay = self._dispatch(executor, pending, deadline)
+                if not pending:
+                    if delay is None:
+                        break
+                    time.sleep(delay)
+                    continue
+
+                done, _ = wait(pending, timeout=delay, return_when=FIRST_COMPLETED)
+                for future in done:
+                    site, request, stage = pending.pop(future)
+                    event = self._complete(future, site, request, stage, pending)
+                    if event is not None:
+                        yield event
+                if self.parse_pool is not None:
+                    self._submit_parses(pending)
+
+            for site in self.sites:
+                site.finish()
+        finally:
+            # 中断時は未開始のリクエストを取り消し、実行中のリクエストの終了を待つ
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+            if self.parse_pool is not None:
+                self.parse_pool.shutdown(cancel_futures=True)
+                self.parse_pool = None
+            self._unparsed.clear()
+            self._busy = 0
+            self.client.close()
+
+
+def iter_crawl(url, max_pages=10, max_workers=8, requests_per_second=10.0, timeout=10, cache_dir=None,
+               bloom_threshold=100000, store=None, crawl_id=None, cancel=None, respect_robots=True,
+               use_sitemaps=True, max_sitemap_urls=50000, instrumentation=None, parse_workers=0):
+    """
+    指定されたURLから並行してページをクロールし、ページを取得するたびに結果を返すジェネレータ
+    max_pages: クロールする最大ページ数
+    max_workers: 同時に処理するリクエスト数
+    requests_per_second: ホストごとの最大リクエスト数/秒
+    cache_dir: 条件付きGETキャッシュの保存先（再クロール時は変更分のみダウンロード）
+    bloom_threshold: 訪問済みURLがこの数を超えたらBloomフィルタに切り替える
+    store: CrawlStoreを指定すると結果と転置インデックスを逐次保存する
+           （同じ条件で中断されたクロールがあれば続きから再開する）
+    crawl_id: 再開・保存に使うクロールID（省略時は自動で決定）
+    cancel: threading.Event（セットされると新しいリクエストを止めて終了する）
+    respect_robots: robots.txtのDisallowとCrawl-delayに従う
+    use_sitemaps: 新しいクロールの開始時にサイトマップのURLをフロンティアに登録する
+    max_sitemap_urls: サイトマップから登録するURL数の上限
+    instrumentation: Instrumentation（URLごとの取得結果と、リトライ・スキップ・エラーの件数を記録する）
+    parse_workers: HTML解析に使うプロセス数（0の場合は取得したワーカースレッドで解析する）
+    戻り値: {'site', 'url', 'seq', 'page_data'（取得できなかった場合はNone）, 'visited', 'queued', 'max_pages'}を順に返す
+    途中でclose()された場合も、それまでに保存したページはストアに残り、次回のクロールで再開できる
+    """
+    scheduler = CrawlScheduler(max_workers=max_workers, requests_per_second=requests_per_second, timeout=timeout,
+                               cache_dir=cache_dir, cancel=cancel, parse_workers=parse_workers)
+    scheduler.add_site(url, max_pages=max_pages, store=store, crawl_id=crawl_id, respect_robots=respect_robots,
+                       use_sitemaps=use_sitemaps, max_sitemap_urls=max_sitemap_urls,
+                       bloom_threshold=bloom_threshold, instrumentation=instrumentation)
+    return scheduler.run()
+
+
+def crawl_site(url, max_pages=10, max_workers=8, requests_per_second=10.0, timeout=10, cache_dir=None,
+               bloom_threshold=100000, store=None, crawl_id=None, respect_robots=True, use_sitemaps=True,
+               max_sitemap_urls=50000, instrumentation=None, parse_workers=0):
+    """
+    指定されたURLから並行してページをクロールし、メタデータを収集する関数
+    引数はiter_crawlと同じ
+    戻り値: storeを指定した場合はStoredPages、それ以外はページデータのリスト（クリック深度・発見順）
+    """
+    if store is not None:
+        crawl_id = resolve_crawl_id(store, prepare_start_url(url), max_pages, crawl_id)
+
+    results = []
+    for event in iter_crawl(url, max_pages=max_pages, max_workers=max_workers,
+                            requests_per_second=requests_per_second, timeout=timeout, cache_dir=cache_dir,
+                            bloom_threshold=bloom_threshold, store=store, crawl_id=crawl_id,
+                            respect_robots=respect_robots, use_sitemaps=use_sitemaps,
+                            max_sitemap_urls=max_sitemap_urls, instrumentation=instrumentation,
+                            parse_workers=parse_workers):
+        if store is None and event['page_data'] is not None:
+            results.append((event['seq'], event['page_data']))
+
+    if store is not None:
+        return StoredPages(store.path, crawl_id)
+
+    results.sort(key=lambda item: item[0])
+    return [page_data for _, page_data in results]
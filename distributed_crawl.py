@@ -0,0 +1,325 @@
+"""
+分散クロール（コーディネーターと複数のワーカープロセス）
+コーディネーターが各サイトのクロールを作成してrobots.txt・サイトマップからフロンティアを準備し、
+ワーカーはストア（SQLite WAL）上の共有フロンティアから担当パーティション（ホストまたはURLのハッシュ）の
+URLだけを取り出して取得する。訪問済み判定はフロンティアの正規化したURLの一意索引で全ワーカー共通に行うため同じURLを二重に取得せず、
+ホストへの送信間隔もストアで共有する。結果はクロールIDごとに同じストアに保存され、1つのクロールとして読み込める
+（共有フロンティアはローカルのSQLiteのため、ワーカーはストアのファイルを開ける同じマシンのプロセスで実行する）
+"""
+import heapq
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from crawl_store import DEFAULT_STORE_PATH, STATE_CLAIMED, STATE_QUEUED, STATE_VISITED, CrawlStore, StoredPages
+from crawler import DEFAULT_HEADERS, CrawlScheduler, SiteCrawl, prepare_start_url, resolve_crawl_id, seed_frontier
+from frontier import SeenSet, URLFrontier, normalize_url, url_host, url_partition
+from http_client import DEFAULT_CACHE_DIR, HttpClient
+from instrumentation import Instrumentation
+from rate_limit import HostRateLimiter
+from robots import RobotsRules, fetch_robots
+
+# 1回にストアから取り出すURL数
+CLAIM_SIZE = 50
+# 1回に確保する発見順の数
+SEQ_BLOCK = 1000
+# 担当のURLがないときにストアへ問い合わせる間隔（秒）
+POLL_INTERVAL = 0.2
+
+
+class SharedHostRateLimiter(HostRateLimiter):
+    """
+    ワーカープロセス間でホストへの送信間隔を共有するHostRateLimiter
+    同時接続数はワーカーごとに制限し、送信間隔（Crawl-delay・Retry-Afterを含む）はストアで全ワーカー共通にする
+    """
+
+    def __init__(self, store, requests_per_second=10.0, max_concurrency=8):
+        super().__init__(requests_per_second=requests_per_second, max_concurrency=max_concurrency)
+        self.store = store
+
+    def try_acquire(self, host):
+        wait_seconds = super().try_acquire(host)
+        if wait_seconds != 0:
+            return wait_seconds
+        with self._cond:
+            min_interval = self._state(host)['min_interval']
+        shared_wait = self.store.reserve_host_slot(host, min_interval)
+        if shared_wait:
+            # 他のワーカーが送信したばかりのため、接続枠を戻してその時刻まで待つ
+            with self._cond:
+                state = self._state(host)
+                state['active'] = max(0, state['active'] - 1)
+                state['next_allowed'] = time.monotonic() + shared_wait
+                self._cond.notify_all()
+            return shared_wait
+        return 0
+
+    def acquire(self, host):
+        while True:
+            wait_seconds = self.try_acquire(host)
+            if wait_seconds == 0:
+                return
+            with self._cond:
+                self._cond.wait(wait_seconds)
+
+    def backoff(self, host, seconds):
+        super().backoff(host, seconds)
+        self.store.delay_host(host, seconds)
+
+
+class SharedFrontier:
+    """
+    ストアのフロンティアを全ワーカーで共有するURLFrontierの代わり
+    発見したURLにはワーカー間で重ならない発見順を割り当て（ストアへの登録はrecord_pageで行う）、
+    取得するURLは担当パーティションからストアで取り出す
+    """
+
+    def __init__(self, store, crawl_id, partition, partitions, partition_by='host', max_pages=None,
+                 bloom_threshold=100000):
+        self.store = store
+        self.crawl_id = crawl_id
+        self.partition = partition
+        self.partitions = partitions
+        self.partition_by = partition_by
+        self.max_pages = max_pages
+        # このワーカーが登録済みのURL（他のワーカーとの重複はストアの正規化したURLの一意索引で除く）
+        self.seen = SeenSet(bloom_threshold=bloom_threshold, bloom_capacity=(max_pages or 0) * 50)
+        self._heap = []
+        self._seq = 0
+        self._seq_end = 0
+        self._next_claim = 0.0
+        # 全ワーカーの取得が終わり、これ以上URLが届かない
+        self.exhausted = False
+
+    def _next_seq(self):
+        if self._seq >= self._seq_end:
+            self._seq = self.store.reserve_seqs(self.crawl_id, SEQ_BLOCK)
+            self._seq_end = self._seq + SEQ_BLOCK
+        seq = self._seq
+        self._seq += 1
+        return seq
+
+    def push(self, url, depth=0, priority=0.5):
+        """
+        未登録のURLに発見順を割り当てる（取得はストアから取り出したパーティションのワーカーが行う）
+        戻り値: 割り当てた発見順（登録済みの場合はNone）
+        """
+        key = normalize_url(url)
+        if key in self.seen:
+            return None
+        self.seen.add(key)
+        return self._next_seq()
+
+    def skip(self, url):
+        return self.push(url)
+
+    def refill(self):
+        """
+        手元のURLがなければ、担当パーティションのURLをストアから取り出す（POLL_INTERVALごとに問い合わせる）
+        戻り値: 取得するURLがあるか
+        """
+        if self._heap or self.exhausted:
+            return bool(self._heap)
+        now = time.monotonic()
+        if now < self._next_claim:
+            return False
+        self._next_claim = now + POLL_INTERVAL
+        for url, seq, depth, priority in self.store.claim_urls(self.crawl_id, self.partition, self.partitions,
+                                                               CLAIM_SIZE, max_pages=self.max_pages,
+                                                               partition_by=self.partition_by):
+            heapq.heappush(self._heap, (depth, -priority, seq, url))
+        if not self._heap:
+            counts = self.store.frontier_counts(self.crawl_id)
+            # 未取得・取得中のURLが残っていなければ（または最大ページ数に達すれば）新しいURLは届かない
+            self.exhausted = (counts.get(STATE_VISITED, 0) >= (self.max_pages or float('inf'))
+                              or not (counts.get(STATE_QUEUED) or counts.get(STATE_CLAIMED)))
+        return bool(self._heap)
+
+    def next_claim_in(self):
+        return max(0.0, self._next_claim - time.monotonic())
+
+    def unclaimed(self):
+        """
+        取り出したがまだ取得していないURL
+        """
+        return [url for _, _, _, url in self._heap]
+
+    def pop(self):
+        depth, _, seq, url = heapq.heappop(self._heap)
+        return url, depth, seq
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __bool__(self):
+        return bool(self._heap)
+
+
+class DistributedSite(SiteCrawl):
+    """
+    分散クロールの1ワーカーが担当する1サイト分のクロール
+    フロンティアの準備はコーディネーターが行い、ワーカーはrobots.txtの取得だけを行う
+    partition, partitions, partition_by: 担当パーティション・パーティション数・分け方（url_partitionと同じ）
+    """
+
+    def __init__(self, url, max_pages, store, crawl_id, partition, partitions, partition_by='host',
+                 respect_robots=True, instrumentation=None):
+        super().__init__(url, max_pages=max_pages, store=store, crawl_id=crawl_id, respect_robots=respect_robots,
+                         use_sitemaps=False, instrumentation=instrumentation)
+        self.frontier = SharedFrontier(store, crawl_id, partition, partitions, partition_by=partition_by,
+                                       max_pages=max_pages)
+
+    def prepare(self, client, limiter, timeout):
+        self.load_robots(client, limiter, timeout)
+
+    def wants_request(self):
+        # 最大ページ数は取り出し時にストアで全ワーカー共通に制限する
+        return self.ready and self.frontier.refill()
+
+    def idle_delay(self):
+        if not self.ready or self.frontier or self.frontier.exhausted:
+            return None
+        return self.frontier.next_claim_in()
+
+    def finish(self):
+        """
+        取り出したまま取得しなかったURLを未取得に戻す（クロールの完了はコーディネーターが判定する）
+        """
+        unclaimed = self.frontier.unclaimed()
+        if unclaimed:
+            self.store.release_claims(self.crawl_id, unclaimed)
+
+
+def run_worker(store_path, sites, partition, partitions, options):
+    """
+    1つのパーティションを担当するワーカー（ワーカープロセスで実行）
+    sites: [(開始URL, クロールID, 最大ページ数), ...]
+    options: crawl_distributedの設定（max_workers, max_host_workers, requests_per_second, cache_dir,
+             respect_robots, partition_by, time_budget, parse_workers）
+    戻り値: {'partition', 'visited', 'summary'（Instrumentation.summary()）}
+    """
+    instrumentation = Instrumentation()
+    store = CrawlStore(store_path)
+    try:
+        limiter = SharedHostRateLimiter(store, requests_per_second=options['requests_per_second'],
+                                        max_concurrency=options['max_host_workers'])
+        scheduler = CrawlScheduler(max_workers=options['max_workers'] * len(sites), cache_dir=options['cache_dir'],
+                                   time_budget=options['time_budget'], parse_workers=options['parse_workers'],
+                                   limiter=limiter)
+        for start_url, crawl_id, max_pages in sites:
+            scheduler.sites.append(DistributedSite(
+                start_url, max_pages, store, crawl_id, partition, partitions,
+                partition_by=options['partition_by'], respect_robots=options['respect_robots'],
+                instrumentation=instrumentation
+            ))
+        with instrumentation.stage('crawl'):
+            for _ in scheduler.run():
+                pass
+    finally:
+        store.close()
+    return {
+        'partition': partition,
+        'visited': sum(site.visited for site in scheduler.sites),
+        'summary': instrumentation.summary()
+    }
+
+
+def _seed(store, client, limiter, start_url, crawl_id, respect_robots, use_sitemaps):
+    """
+    新しいクロールのフロンティアに開始URLとサイトマップのURLを登録する（コーディネーターで実行）
+    """
+    robots = fetch_robots(client, start_url) if respect_robots else RobotsRules()
+    if robots.crawl_delay:
+        limiter.set_min_interval(url_host(start_url), robots.crawl_delay)
+    seed_frontier(start_url, URLFrontier(), robots, client, limiter, use_sitemaps=use_sitemaps,
+                  store=store, crawl_id=crawl_id)
+
+
+def crawl_distributed(urls, max_pages=10, workers=2, max_workers=8, requests_per_second=10.0,
+                      store_path=DEFAULT_STORE_PATH, cache_dir=DEFAULT_CACHE_DIR, respect_robots=True,
+                      use_sitemaps=True, partition_by='host', time_budget=None, parse_workers=0,
+                      site_max_pages=None):
+    """
+    複数サイトをワーカープロセスに分けてクロールする（コーディネーター）
+    workers: パーティション数（ワーカープロセス数）
+    max_workers: サイトごとの同時接続数（全ワーカーの合計）
+    partition_by: 'host'はホストのハッシュで分ける（1つのホストは1つのワーカーだけが取得する）。
+                  'url'はURLのハッシュで分ける（1つの大規模サイトを全ワーカーで取得する）
+    time_budget: ワーカーごとの制限時間（秒）。取り出して取得しなかったURLは未取得に戻す
+    parse_workers: ワーカーごとのHTML解析プロセス数
+    site_max_pages: {URL: 最大ページ数}（競合サイトなど、サイトごとに最大ページ数を変える場合）
+    同じ条件で中断されたクロールは続きから再開する（前回のワーカーが取得中だったURLは未取得に戻す）
+    戻り値: ({URL: StoredPages}, [ワーカーごとのrun_workerの結果])
+    """
+    site_max_pages = site_max_pages or {}
+    store = CrawlStore(store_path)
+    try:
+        store.create_claim_index()
+        crawls = {}
+        new_crawls = []
+        for url in urls:
+            start_url = prepare_start_url(url)
+            pages = site_max_pages.get(url, max_pages)
+            crawl_id = resolve_crawl_id(store, start_url, pages)
+            store.release_claims(crawl_id)
+            crawls[url] = (start_url, crawl_id, pages)
+            if not store.frontier_counts(crawl_id):
+                new_crawls.append((start_url, crawl_id))
+
+        # 新しいクロールのrobots.txtとサイトマップをサイトごとに並行して取得する
+        client = HttpClient(pool_size=max_workers, headers=DEFAULT_HEADERS, cache_dir=cache_dir)
+        limiter = HostRateLimiter(requests_per_second=requests_per_second, max_concurrency=max_workers)
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(new_crawls)))) as executor:
+                futures = {executor.submit(_seed, store, client, limiter, start_url, crawl_id, respect_robots,
+                                           use_sitemaps): start_url
+                           for start_url, crawl_id in new_crawls}
+                for future, start_url in futures.items():
+                    try:
+                        future.result()
+                    except Exception as e:
+                        print(f"Error preparing crawl for {start_url}: {e}")
+        finally:
+            client.close()
+
+        # ホスト単位の場合は、担当するサイトがあるパーティションだけワーカーを起動する
+        assignments = {}
+        for site in crawls.values():
+            if partition_by == 'host':
+                assignments.setdefault(url_partition(site[0], workers, 'host'), []).append(site)
+            else:
+                for partition in range(workers):
+                    assignments.setdefault(partition, []).append(site)
+        options = {
+            'max_workers': max_workers,
+            # URL単位では1つのホストを全ワーカーで取得するため、ホストごとの同時接続数を分け合う
+            'max_host_workers': max_workers if partition_by == 'host' else max(1, -(-max_workers // workers)),
+            'requests_per_second': requests_per_second,
+            'cache_dir': cache_dir,
+            'respect_robots': respect_robots,
+            'partition_by': partition_by,
+            'time_budget': time_budget,
+            'parse_workers': parse_workers
+        }
+
+        results = []
+        if assignments:
+            with ProcessPoolExecutor(max_workers=len(assignments),
+                                     mp_context=multiprocessing.get_context('spawn')) as executor:
+                futures = [executor.submit(run_worker, store_path, sites, partition, workers, options)
+                           for partition, sites in sorted(assignments.items())]
+                for future in futures:
+                    try:
+                        results.append(future.result())
+                    except Exception as e:
+                        print(f"Error in crawl worker: {e}")
+
+        # 全ワーカーの終了後、フロンティアを使い切るか最大ページ数に達したクロールを完了にする
+        for start_url, crawl_id, pages in crawls.values():
+            counts = store.frontier_counts(crawl_id)
+            store.release_claims(crawl_id)
+            if counts.get(STATE_VISITED, 0) >= pages or not (counts.get(STATE_QUEUED) or counts.get(STATE_CLAIMED)):
+                store.finish_crawl(crawl_id)
+    finally:
+        store.close()
+    return {url: StoredPages(store_path, crawl_id) for url, (_, crawl_id, _) in crawls.items()}, results
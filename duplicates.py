@@ -0,0 +1,174 @@
+"""
+重複・類似コンテンツの検出（SimHash + LSH）
+各ページの本文から語のシングルのSimHash（64ビット）を計算し、ビットを帯に分けた
+局所性鋭敏ハッシュで候補ペアだけを比較して、ほぼ同じ内容のページのクラスタを求める
+（全ページの総当たり比較を行わないため、ページ数にほぼ比例する時間で処理できる）
+"""
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from frontier import normalize_url
+from hashing import mix64
+from search_index import tokenize
+
+# シングル（連続する語の組）の語数
+SHINGLE_SIZE = 3
+
+# 類似とみなすSimHashのハミング距離の上限
+HAMMING_THRESHOLD = 3
+
+# LSHの帯の数（64ビットを16ビットずつに分ける。距離3以下なら少なくとも1つの帯が一致する）
+BANDS = 4
+BAND_BITS = 64 // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+# ページテーブルに加える判定結果の列
+DUPLICATE_COLUMNS = ('duplicate_cluster', 'canonical_missing', 'canonical_inconsistent')
+
+
+def _rotate(values, bits):
+    return (values << np.uint64(bits)) | (values >> np.uint64(64 - bits))
+
+
+def shingle_hashes(text):
+    """
+    本文の語のシングル（連続するSHINGLE_SIZE語の組）のハッシュ値を計算する
+    語ごとにハッシュ値を1回だけ求め、位置ごとにビットを回転させて組み合わせる（語順も区別される）
+    """
+    terms = tokenize(text)
+    term_hashes = mix64(np.fromiter((zlib.crc32(term.encode('utf-8')) for term in terms),
+                                     dtype=np.uint64, count=len(terms)))
+    count = max(len(terms) - SHINGLE_SIZE + 1, 1) if len(terms) else 0
+    combined = np.zeros(count, dtype=np.uint64)
+    for offset in range(min(SHINGLE_SIZE, len(terms))):
+        combined ^= _rotate(term_hashes[offset:offset + count], offset * 21 + 1)
+    return mix64(combined)
+
+
+def simhash(text):
+    """
+    本文の64ビットSimHashを計算する（本文が空の場合はNone）
+    """
+    hashes = shingle_hashes(text)
+    if len(hashes) == 0:
+        return None
+    # ビットごとに1のシングルと0のシングルの多数決をとる
+    ones = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=0, dtype=np.int64)
+    bits = np.packbits(ones * 2 > len(hashes))
+    return int(bits.view(np.uint64)[0])
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+
+class _DisjointSet:
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, item):
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+def cluster_fingerprints(fingerprints, threshold=HAMMING_THRESHOLD):
+    """
+    SimHashが近いページをクラスタにまとめる
+    fingerprints: ページごとのSimHash（Noneのページは対象外）
+    戻り値: ページ番号のリストのリスト（2ページ以上のクラスタのみ、大きい順）
+    """
+    # 同じ指紋のページは比較せずにまとめ、異なる指紋だけをLSHで比較する
+    groups = {}
+    for index, fingerprint in enumerate(fingerprints):
+        if fingerprint is not None:
+            groups.setdefault(fingerprint, []).append(index)
+    unique = list(groups)
+    sets = _DisjointSet(len(unique))
+
+    for band in range(BANDS):
+        shift = band * BAND_BITS
+        buckets = {}
+        for position, fingerprint in enumerate(unique):
+            buckets.setdefault((fingerprint >> shift) & BAND_MASK, []).append(position)
+        for members in buckets.values():
+            for i, a in enumerate(members):
+                for b in members[i + 1:]:
+                    if hamming_distance(unique[a], unique[b]) <= threshold:
+                        sets.union(a, b)
+
+    clusters = {}
+    for position, fingerprint in enumerate(unique):
+        clusters.setdefault(sets.find(position), []).extend(groups[fingerprint])
+    result = [sorted(members) for members in clusters.values() if len(members) > 1]
+    return sorted(result, key=lambda members: (-len(members), members[0]))
+
+
+def find_duplicates(pages_data, threshold=HAMMING_THRESHOLD):
+    """
+    重複・類似コンテンツのクラスタを検出し、canonicalの設定状況を確認する関数
+    クラスタ内のページが同じ正規URL（canonicalがないページは自分自身）を指していなければ問題とする
+    戻り値: (クラスタの一覧, ページごとの判定のDataFrame)
+            クラスタ: {'urls', 'canonicals', 'canonical'（最も多く指定された正規URL）,
+                       'canonical_missing', 'canonical_inconsistent', 'consistent'}
+            DataFrame: url / canonical / duplicate_cluster（重複なしは-1） /
+                       canonical_missing / canonical_inconsistent列（ページデータと同じ順序）
+    """
+    urls = []
+    canonicals = []
+    fingerprints = []
+    for page in pages_data:
+        urls.append(page['url'])
+        canonicals.append(page.get('canonical') or '')
+        fingerprints.append(simhash(page.get('body_text') or ''))
+
+    cluster_ids = np.full(len(urls), -1, dtype=np.int64)
+    canonical_missing = np.zeros(len(urls), dtype=bool)
+    canonical_inconsistent = np.zeros(len(urls), dtype=bool)
+
+    clusters = []
+    for cluster_id, members in enumerate(cluster_fingerprints(fingerprints, threshold)):
+        # URLは正規化して比較する（末尾スラッシュの有無などの表記ゆれは同じURLとみなす）
+        url_keys = {index: normalize_url(urls[index]) for index in members}
+        canonical_keys = {index: normalize_url(canonicals[index]) if canonicals[index] else '' for index in members}
+        # canonicalがないページは自分自身を正規URLとみなす
+        targets = {canonical_keys[index] or url_keys[index] for index in members}
+        consistent = len(targets) == 1
+        # 最も多く指定されている正規URLをクラスタの正規URLとする
+        explicit = [canonical_keys[index] for index in members if canonicals[index]]
+        target_key = max(explicit, key=explicit.count) if explicit else None
+        target = next((canonicals[index] for index in members if canonicals[index] and canonical_keys[index] == target_key),
+                      None)
+        cluster_ids[members] = cluster_id
+        if not consistent:
+            # canonicalがないページ（正規URLのページ自身を除く）と、別のURLを指定しているページを問題とする
+            for index in members:
+                canonical_missing[index] = not canonicals[index] and url_keys[index] != target_key
+                canonical_inconsistent[index] = bool(canonicals[index]) and canonical_keys[index] != target_key
+        clusters.append({
+            'urls': [urls[index] for index in members],
+            'canonicals': [canonicals[index] for index in members],
+            'canonical': target,
+            'canonical_missing': [urls[index] for index in members if canonical_missing[index]],
+            'canonical_inconsistent': [urls[index] for index in members if canonical_inconsistent[index]],
+            'consistent': consistent
+        })
+
+    frame = pd.DataFrame({
+        'url': urls,
+        'canonical': canonicals,
+        'duplicate_cluster': cluster_ids,
+        'canonical_missing': canonical_missing,
+        'canonical_inconsistent': canonical_inconsistent
+    })
+    return clusters, frame
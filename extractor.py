@@ -0,0 +1,226 @@
+"""
+シングルパスHTML特徴抽出
+イベント駆動のHTMLParserでHTMLを一度だけ走査し、タイトル・メタタグ・見出し数・
+画像/alt数・リンク・本文テキストを同時に収集する（BeautifulSoupの木構築と再走査を行わない）
+"""
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+from frontier import clean_url, url_host
+
+# 本文テキストに含めない要素（BeautifulSoupのget_textと同じ扱い）
+SKIP_TEXT_TAGS = {'script', 'style', 'template'}
+
+# テキストを収集する見出し要素
+HEADING_TAGS = ('h1', 'h2', 'h3')
+
+
+class PageFeatureParser(HTMLParser):
+    """
+    ページの特徴量を1回の走査で収集するパーサー
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = None
+        self.meta_description = None
+        self.meta_keywords = None
+        self.h1 = None
+        self.h2_count = 0
+        self.h3_count = 0
+        self.image_count = 0
+        self.images_with_alt = 0
+        self.hrefs = []
+        self.canonical = None
+        self.headings = []
+        self.has_body = False
+        self.body_chunks = []
+        self.word_count = 0
+
+        self._title_state = 0  # 0: 未出現, 1: 収集中, 2: 完了
+        self._title_chunks = []
+        self._h1_state = 0
+        self._h1_depth = 0
+        self._h1_chunks = []
+        self._heading_depth = 0
+        self._heading_chunks = []
+        self._seen_description = False
+        self._seen_keywords = False
+        self._in_body = False
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in HEADING_TAGS:
+            self._heading_depth += 1
+
+        if tag in SKIP_TEXT_TAGS:
+            self._skip_depth += 1
+        elif tag == 'a':
+            attr_map = dict(attrs)
+            if 'href' in attr_map:
+                self.hrefs.append(attr_map['href'] or '')
+        elif tag == 'img':
+            self.image_count += 1
+            if dict(attrs).get('alt'):
+                self.images_with_alt += 1
+        elif tag == 'h2':
+            self.h2_count += 1
+        elif tag == 'h3':
+            self.h3_count += 1
+        elif tag == 'h1':
+            if self._h1_state == 0:
+                self._h1_state = 1
+            if self._h1_state == 1:
+                self._h1_depth += 1
+        elif tag == 'meta':
+            self._handle_meta(dict(attrs))
+        elif tag == 'link':
+            if self.canonical is None:
+                attr_map = dict(attrs)
+                if 'canonical' in (attr_map.get('rel') or '').lower().split() and attr_map.get('href'):
+                    self.canonical = attr_map['href'].strip()
+        elif tag == 'title':
+            if self._title_state == 0:
+                self._title_state = 1
+        elif tag == 'body':
+            if not self.has_body:
+                self.has_body = True
+                self._in_body = True
+
+    def _handle_meta(self, attrs):
+        name = attrs.get('name')
+        if name == 'description' and not self._seen_description:
+            self._seen_description = True
+            if attrs.get('content') is not None:
+                self.meta_description = attrs['content'].strip()
+        elif name == 'keywords' and not self._seen_keywords:
+            self._seen_keywords = True
+            if attrs.get('content') is not None:
+                self.meta_keywords = attrs['content'].strip()
+
+    def handle_endtag(self, tag):
+        if tag in HEADING_TAGS or tag in ('body', 'html'):
+            self._close_heading(tag)
+
+        if tag in SKIP_TEXT_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag == 'h1':
+            if self._h1_state == 1:
+                self._h1_depth -= 1
+                if self._h1_depth <= 0:
+                    self._h1_state = 2
+        elif tag == 'title':
+            if self._title_state == 1:
+                self._title_state = 2
+        elif tag in ('body', 'html'):
+            self._in_body = False
+            if self._h1_state == 1:
+                self._h1_state = 2
+
+    def _close_heading(self, tag):
+        if not self._heading_depth:
+            return
+        self._heading_depth = self._heading_depth - 1 if tag in HEADING_TAGS else 0
+        if self._heading_depth == 0:
+            text = ''.join(self._heading_chunks).strip()
+            if text:
+                self.headings.append(text)
+            self._heading_chunks = []
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        if self._heading_depth:
+            self._heading_chunks.append(data)
+        if self._title_state == 1:
+            self._title_chunks.append(data)
+        if self._h1_state == 1:
+            self._h1_chunks.append(data)
+        if self._in_body:
+            words = data.split()
+            if words:
+                self.word_count += len(words)
+                self.body_chunks.append(data.strip())
+
+    def close(self):
+        super().close()
+        self._close_heading('html')
+        if self._title_state:
+            self.title = ''.join(self._title_chunks)
+        if self._h1_state:
+            self.h1 = ''.join(self._h1_chunks)
+
+    @property
+    def body_text(self):
+        return " ".join(self.body_chunks)
+
+
+def extract_internal_links(hrefs, page_url, base_domain):
+    """
+    href一覧から同一ドメインのリンクを取得用のURL（clean_url）にして重複なく返す
+    （末尾スラッシュなどの表記ゆれは、フロンティアとリンクグラフが正規化したURLで同じページとして扱う）
+    """
+    internal_links = []
+    for href in dict.fromkeys(hrefs):
+        # 相対URLを絶対URLに変換
+        if not href.startswith(('http://', 'https://')):
+            href = urljoin(page_url, href)
+        # mailto:やjavascript:のリンクは対象外
+        if not href.startswith(('http://', 'https://')):
+            continue
+
+        # 同じドメイン内のリンクのみ追加
+        href = clean_url(href)
+        if url_host(href) == base_domain:
+            internal_links.append(href)
+
+    return list(dict.fromkeys(internal_links))
+
+
+def resolve_canonical(href, page_url):
+    """
+    rel=canonicalのURLを絶対URLにする（http(s)以外・未指定は空文字。比較は正規化したURLで行う）
+    """
+    if not href:
+        return ""
+    href = urljoin(page_url, href)
+    if not href.startswith(('http://', 'https://')):
+        return ""
+    return clean_url(href)
+
+
+def extract_features(html):
+    """
+    HTMLを1回走査して特徴量を収集したパーサーを返す
+    """
+    parser = PageFeatureParser()
+    parser.feed(html)
+    parser.close()
+    return parser
+
+
+def extract_page(html, page_url, base_domain):
+    """
+    HTMLからページデータを抽出する関数（crawl_websiteのpage_dataと同じ項目）
+    """
+    features = extract_features(html)
+    internal_links = extract_internal_links(features.hrefs, page_url, base_domain)
+
+    return {
+        'url': page_url,
+        'title': features.title.strip() if features.title is not None else "No Title",
+        'h1': features.h1.strip() if features.h1 is not None else "No H1",
+        'meta_description': features.meta_description if features.meta_description is not None else "No Meta Description",
+        'meta_keywords': features.meta_keywords if features.meta_keywords is not None else "",
+        'word_count': features.word_count,
+        'image_count': features.image_count,
+        'images_with_alt': features.images_with_alt,
+        'h2_count': features.h2_count,
+        'h3_count': features.h3_count,
+        'internal_links_count': len(internal_links),
+        'internal_links': internal_links,
+        'canonical': resolve_canonical(features.canonical, page_url),
+        # キーワード分析用のテキスト（見出しはH1〜H3、本文はscript/styleを除く表示テキスト）
+        'headings': "\n".join(features.headings),
+        'body_text': features.body_text
+    }
@@ -0,0 +1,231 @@
+"""
+URLフロンティア
+URLの正規化（訪問済み判定のキー）、優先度付きキュー（クリック深度・サイトマップ優先度）、
+訪問済み判定（通常のset、大規模サイトではBloomフィルタ）を提供する
+"""
+import hashlib
+import heapq
+import math
+import zlib
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# 正規化時に除去するトラッキング用クエリパラメータ
+TRACKING_PARAMS = {
+    'gclid', 'dclid', 'fbclid', 'yclid', 'msclkid', 'mc_cid', 'mc_eid', '_ga', '_gl', 'igshid'
+}
+TRACKING_PREFIXES = ('utm_',)
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def _is_tracking_param(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def _host_port(parts):
+    """
+    urlsplitの結果から、小文字のホスト（IPv6は角括弧付き）とデフォルト以外のポートを返す
+    """
+    host = (parts.hostname or '').rstrip('.')
+    if ':' in host:
+        host = f"[{host}]"
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port and port != DEFAULT_PORTS.get(parts.scheme.lower()):
+        host = f"{host}:{port}"
+    return host
+
+
+def clean_url(url):
+    """
+    取得に使うURL（発見したURLからフラグメントだけを除き、パス・末尾スラッシュ・クエリはそのまま残す）
+    正規化したURLを取得するとリダイレクト（末尾スラッシュの付け直しなど）が増えるため、取得には発見したURLを使う
+    """
+    parts = urlsplit(url.strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc, parts.path or '/', parts.query, ''))
+
+
+def normalize_url(url):
+    """
+    URLを正規化する関数（訪問済み判定・リンクの照合に使うキー。取得にはclean_urlのURLを使う）
+    スキーム・ホストの小文字化、デフォルトポートとフラグメントの除去、
+    トラッキングパラメータの除去とクエリのソート、末尾スラッシュの統一を行う
+    （ユーザー情報とIPv6の角括弧は残す）
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+
+    host = _host_port(parts)
+    if parts.username is not None:
+        userinfo = parts.username if parts.password is None else f"{parts.username}:{parts.password}"
+        host = f"{userinfo}@{host}"
+
+    path = parts.path or '/'
+    if len(path) > 1 and path.endswith('/'):
+        path = path.rstrip('/') or '/'
+
+    query = ''
+    if parts.query:
+        params = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _is_tracking_param(k)]
+        query = urlencode(sorted(params))
+
+    return urlunsplit((scheme, host, path, query, ''))
+
+
+def url_host(url):
+    """
+    URLのホスト部分（小文字、デフォルト以外のポートを含み、ユーザー情報は含まない）を返す
+    """
+    return _host_port(urlsplit(url))
+
+
+def url_partition(url, partitions, partition_by='host'):
+    """
+    URLを担当するパーティション（0〜partitions-1）を返す（分散クロール用）
+    partition_by: 'host'はホスト単位（同じホストのURLはすべて同じパーティション）、'url'はURL単位
+    """
+    key = url_host(url) if partition_by == 'host' else url
+    return zlib.crc32(key.encode('utf-8')) % partitions
+
+
+class BloomFilter:
+    """
+    メモリ使用量が一定の訪問済み判定用Bloomフィルタ
+    capacity: 想定要素数
+    error_rate: 偽陽性率（偽陽性のURLはクロールされない）
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        capacity = max(1, int(capacity))
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def __len__(self):
+        return self.count
+
+
+class SeenSet:
+    """
+    訪問済みURL（正規化したURL）の集合
+    要素数がbloom_thresholdを超えるとBloomフィルタに切り替えてメモリ使用量を抑える
+    """
+
+    def __init__(self, bloom_threshold=None, bloom_capacity=None, error_rate=0.001):
+        self.bloom_threshold = bloom_threshold
+        self.bloom_capacity = bloom_capacity
+        self.error_rate = error_rate
+        self._items = set()
+        self._bloom = None
+
+    @property
+    def is_bloom(self):
+        return self._bloom is not None
+
+    def add(self, url):
+        if self._bloom is not None:
+            self._bloom.add(url)
+            return
+        self._items.add(url)
+        if self.bloom_threshold and len(self._items) > self.bloom_threshold:
+            self._switch_to_bloom()
+
+    def _switch_to_bloom(self):
+        capacity = max(self.bloom_capacity or 0, len(self._items) * 10)
+        bloom = BloomFilter(capacity, self.error_rate)
+        for url in self._items:
+            bloom.add(url)
+        self._bloom = bloom
+        self._items = set()
+
+    def __contains__(self, url):
+        if self._bloom is not None:
+            return url in self._bloom
+        return url in self._items
+
+    def __len__(self):
+        if self._bloom is not None:
+            return len(self._bloom)
+        return len(self._items)
+
+
+class URLFrontier:
+    """
+    クロール対象URLの優先度付きキュー
+    クリック深度の浅い順、同じ深度ではサイトマップ優先度の高い順、発見順で取り出す
+    """
+
+    def __init__(self, bloom_threshold=None, bloom_capacity=None):
+        self._heap = []
+        self._seq = 0
+        self.seen = SeenSet(bloom_threshold=bloom_threshold, bloom_capacity=bloom_capacity)
+
+    def push(self, url, depth=0, priority=0.5):
+        """
+        未登録のURLを追加する（正規化したURLが同じものは登録済みとする）
+        url: 取得に使うURL（clean_url）
+        戻り値: 割り当てた発見順（登録済みの場合はNone）
+        """
+        key = normalize_url(url)
+        if key in self.seen:
+            return None
+        self.seen.add(key)
+        seq = self._seq
+        heapq.heappush(self._heap, (depth, -priority, seq, url))
+        self._seq += 1
+        return seq
+
+    def skip(self, url):
+        """
+        キューに入れずに既出のURLとして登録する（robots.txtで禁止されたURLなど）
+        戻り値: 割り当てた発見順（登録済みの場合はNone）
+        """
+        key = normalize_url(url)
+        if key in self.seen:
+            return None
+        self.seen.add(key)
+        seq = self._seq
+        self._seq += 1
+        return seq
+
+    def restore(self, url, seq, depth=0, priority=0.5, queued=True):
+        """
+        保存済みのフロンティアからURLを復元する（クロール再開用）
+        queued: Falseの場合は訪問済みとして登録のみ行う
+        """
+        self.seen.add(normalize_url(url))
+        if queued:
+            heapq.heappush(self._heap, (depth, -priority, seq, url))
+        self._seq = max(self._seq, seq + 1)
+
+    def pop(self):
+        """
+        次にクロールするURLを取り出す
+        戻り値: (URL, クリック深度, 発見順)
+        """
+        depth, _, seq, url = heapq.heappop(self._heap)
+        return url, depth, seq
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __bool__(self):
+        return bool(self._heap)
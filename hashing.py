@@ -0,0 +1,15 @@
+"""
+決定的なハッシュ値の補助関数（重複検出のSimHashとスタブの指標生成で共通に使う）
+"""
+import numpy as np
+
+
+def mix64(values):
+    """
+    32ビットのハッシュ値を64ビット全体に拡散する（splitmix64）
+    """
+    with np.errstate(over='ignore'):
+        z = values + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return z ^ (z >> np.uint64(31))
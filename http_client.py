@@ -0,0 +1,377 @@
+"""
+共有HTTPクライアント
+コネクションプール（keep-alive）と圧縮転送を有効にしたセッションを使い回し、
+ETag/Last-Modifiedを保存するディスクキャッシュで再クロール時に条件付きGETを行う。
+ページは本文を逐次受信し、Content-Typeと本文サイズを受信前に確認する
+"""
+import codecs
+import json
+import os
+import posixpath
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.compat import chardet
+from requests.structures import CaseInsensitiveDict
+
+# brotliがインストールされている場合のみbr圧縮を要求する（urllib3が展開できないため）
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    ACCEPT_ENCODING = 'gzip, deflate'
+
+# キャッシュに保存するレスポンスヘッダー
+CACHED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+DEFAULT_CACHE_DIR = '.seo_cache'
+
+# キャッシュを残す期間（秒）。この期間に取得も304の確認もされなかったURLは、キャッシュを開くときに削除する
+DEFAULT_CACHE_MAX_AGE = 30 * 24 * 60 * 60
+
+# ページとして解析するContent-Type
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+
+# ページの本文の最大サイズ（超えた分は受信せず、先頭だけを解析する）
+MAX_BODY_BYTES = 5 * 1024 * 1024
+
+# 本文を受信する単位
+STREAM_CHUNK_BYTES = 64 * 1024
+
+# HTMLでないことが拡張子でわかるURL（リクエストせずにスキップする）
+NON_HTML_EXTENSIONS = frozenset((
+    '.pdf', '.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.ico', '.bmp', '.tif', '.tiff', '.avif',
+    '.mp4', '.mov', '.avi', '.wmv', '.webm', '.mp3', '.wav', '.ogg', '.m4a',
+    '.zip', '.gz', '.tgz', '.rar', '.7z', '.tar', '.dmg', '.exe', '.msi', '.apk',
+    '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.csv', '.txt', '.xml', '.json', '.rss',
+    '.css', '.js', '.woff', '.woff2', '.ttf', '.otf', '.eot'
+))
+
+# <meta charset>を探す先頭のバイト数と、文字コードを推定する場合に使う先頭のバイト数
+META_SCAN_BYTES = 4096
+DETECT_BYTES = 32 * 1024
+
+META_CHARSET_PATTERN = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([a-zA-Z0-9_.:-]+)', re.IGNORECASE)
+HEADER_CHARSET_PATTERN = re.compile(r'charset\s*=\s*["\']?\s*([a-zA-Z0-9_.:-]+)', re.IGNORECASE)
+
+# ブラウザと同じく、ラベルより広い上位互換の文字コードで読む（WHATWG Encoding Standard）
+# キーはPythonのコーデック名と、Pythonが知らないラベル
+ENCODING_ALIASES = {
+    'shift_jis': 'cp932',
+    'windows-31j': 'cp932',
+    'x-sjis': 'cp932',
+    'iso8859-1': 'cp1252',
+    'ascii': 'cp1252',
+    'euc_jp': 'euc_jis_2004',
+    'gb2312': 'gb18030',
+    'gbk': 'gb18030'
+}
+
+# 宣言のない日本語のページで先に試す文字コード（EUC-JPの本文はShift_JISとしても読めてしまうため、EUC-JPを先に試す）
+JAPANESE_ENCODINGS = ('euc_jis_2004', 'cp932')
+KANA_PATTERN = re.compile('[\u3041-\u30ff]')
+
+BOMS = ((codecs.BOM_UTF8, 'utf-8-sig'), (codecs.BOM_UTF16_LE, 'utf-16'), (codecs.BOM_UTF16_BE, 'utf-16'))
+
+
+def create_session(pool_size=8, headers=None):
+    """
+    コネクションプールを設定したrequests.Sessionを作成する関数
+    pool_size: ホストごとに保持するコネクション数（同時接続数以上にする）
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+    if headers:
+        session.headers.update(headers)
+    return session
+
+
+class HttpCache:
+    """
+    条件付きGET用のディスクキャッシュ（SQLite）
+    URLごとにETag/Last-Modifiedと本文（zlib圧縮）を保存する
+    max_age: この秒数より前に取得・確認したURLを開くときに削除する（Noneの場合は削除しない）
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_age=DEFAULT_CACHE_MAX_AGE):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, 'http_cache.sqlite')
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "url TEXT PRIMARY KEY, headers TEXT, body BLOB, fetched_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_fetched_at ON responses (fetched_at)")
+        self._conn.commit()
+        if max_age:
+            self.prune(max_age)
+
+    def prune(self, max_age):
+        """
+        max_age秒より前に取得・確認したURLを削除する（再クロールで使われなくなったURLの本文を残さない）
+        戻り値: 削除した件数
+        """
+        with self._lock:
+            deleted = self._conn.execute(
+                "DELETE FROM responses WHERE fetched_at < ?", (time.time() - max_age,)
+            ).rowcount
+            self._conn.commit()
+        return deleted
+
+    def get(self, url):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT headers, body, fetched_at FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'headers': json.loads(row[0]),
+            'body': zlib.decompress(row[1]),
+            'fetched_at': row[2]
+        }
+
+    def put(self, url, headers, body):
+        stored_headers = {name: headers[name] for name in CACHED_HEADERS if name in headers}
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (url, headers, body, fetched_at) VALUES (?, ?, ?, ?)",
+                (url, json.dumps(stored_headers), zlib.compress(body), time.time())
+            )
+            self._conn.commit()
+
+    def touch(self, url):
+        with self._lock:
+            self._conn.execute("UPDATE responses SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def conditional_headers(entry):
+    """
+    キャッシュエントリから条件付きGET用のヘッダーを作成する
+    """
+    headers = {}
+    if entry is None:
+        return headers
+    if 'ETag' in entry['headers']:
+        headers['If-None-Match'] = entry['headers']['ETag']
+    if 'Last-Modified' in entry['headers']:
+        headers['If-Modified-Since'] = entry['headers']['Last-Modified']
+    return headers
+
+
+def _codec_name(label):
+    """
+    文字コードのラベルをPythonのコーデック名に変換する（不明なラベルはNone）
+    """
+    label = label.strip().lower()
+    if label in ENCODING_ALIASES:
+        return ENCODING_ALIASES[label]
+    try:
+        name = codecs.lookup(label).name
+    except (LookupError, UnicodeError):
+        return None
+    return ENCODING_ALIASES.get(name, name)
+
+
+def resolve_encoding(headers, body):
+    """
+    本文の文字コードを決める（Content-Typeのcharset、BOM、<meta charset>の順で探し、
+    どれもなければUTF-8として読めるか確認し、最後に本文の先頭DETECT_BYTESだけで推定する）
+    """
+    match = HEADER_CHARSET_PATTERN.search(headers.get('Content-Type', ''))
+    if match:
+        name = _codec_name(match.group(1))
+        if name:
+            return name
+
+    for bom, name in BOMS:
+        if body.startswith(bom):
+            return name
+
+    match = META_CHARSET_PATTERN.search(body, 0, META_SCAN_BYTES)
+    if match:
+        name = _codec_name(match.group(1).decode('ascii'))
+        # <meta>で宣言されたUTF-16はASCII互換の本文では誤りのため無視する
+        if name and not name.startswith('utf-16'):
+            return name
+
+    sample = body[:DETECT_BYTES]
+    try:
+        # 途中で切れたマルチバイト文字は無視して判定する
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+
+    # マルチバイト文字の途中で切れると判定に失敗するため、最後のタグの終わりまでで判定する
+    end = sample.rfind(b'>')
+    if end > 0:
+        sample = sample[:end + 1]
+
+    # 汎用の推定はShift_JISを韓国語・中国語と誤りやすいため、かなを含む日本語として読めるかを先に確かめる
+    for name in JAPANESE_ENCODINGS:
+        try:
+            if KANA_PATTERN.search(sample.decode(name)):
+                return name
+        except UnicodeDecodeError:
+            continue
+
+    detected = chardet.detect(sample).get('encoding') if chardet is not None else None
+    return (_codec_name(detected) if detected else None) or 'cp1252'
+
+
+def is_html_content_type(content_type):
+    """
+    Content-TypeがHTMLか（Content-Typeがない場合はHTMLとみなす）
+    """
+    if not content_type:
+        return True
+    return content_type.split(';', 1)[0].strip().lower() in HTML_CONTENT_TYPES
+
+
+def url_extension(url):
+    return posixpath.splitext(urlsplit(url).path)[1].lower()
+
+
+def is_html_url(url):
+    """
+    拡張子からHTMLでないことがわかるURLはFalse
+    """
+    return url_extension(url) not in NON_HTML_EXTENSIONS
+
+
+def response_from_cache(url, entry):
+    """
+    304応答時にキャッシュ済みの本文から200のレスポンスを組み立てる
+    """
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response.headers = CaseInsensitiveDict(entry['headers'])
+    response._content = entry['body']
+    response.encoding = resolve_encoding(response.headers, response._content)
+    response.from_cache = True
+    response.skipped = None
+    response.truncated = False
+    return response
+
+
+class HttpClient:
+    """
+    クロール全体で共有するHTTPクライアント
+    cache_dir: 条件付きGETキャッシュの保存先（Noneの場合はキャッシュしない）
+    cache_max_age: キャッシュを残す期間（秒、HttpCacheのmax_age）
+    """
+
+    def __init__(self, pool_size=8, headers=None, cache_dir=None, max_body_bytes=MAX_BODY_BYTES,
+                 cache_max_age=DEFAULT_CACHE_MAX_AGE):
+        self.session = create_session(pool_size=pool_size, headers=headers)
+        self.cache = HttpCache(cache_dir, max_age=cache_max_age) if cache_dir else None
+        self.max_body_bytes = max_body_bytes
+
+    def get(self, url, timeout=10):
+        entry = self.cache.get(url) if self.cache else None
+        response = self.session.get(url, headers=conditional_headers(entry), timeout=timeout)
+        response.from_cache = False
+
+        if self.cache is None:
+            return response
+
+        # 変更なし（304）の場合はキャッシュ済みの本文を返す
+        if response.status_code == 304 and entry is not None:
+            self.cache.touch(url)
+            return response_from_cache(url, entry)
+
+        if response.status_code == 200 and ('ETag' in response.headers or 'Last-Modified' in response.headers):
+            self.cache.put(url, response.headers, response.content)
+
+        return response
+
+    def get_page(self, url, timeout=10):
+        """
+        ページを取得する（本文を逐次受信し、HTML以外と大きすぎる本文は受信しない）
+        HTMLかどうかは応答ヘッダーのContent-Typeで判定する（HTML以外は本文を受信する前に閉じる）
+        戻り値のresponseには以下を設定する
+            skipped: 本文を受信しなかった理由（HTML以外の場合は'content_type'、受信した場合はNone）
+            truncated: 本文がmax_body_bytesを超えたため先頭だけを受信したか
+            encoding: resolve_encodingで決めた文字コード（response.textでの全文の推定を行わない）
+        """
+        entry = self.cache.get(url) if self.cache else None
+        response = self.session.get(url, headers=conditional_headers(entry), timeout=timeout, stream=True)
+        response.from_cache = False
+        response.skipped = None
+        response.truncated = False
+
+        # 変更なし（304）の場合はキャッシュ済みの本文を返す
+        if response.status_code == 304 and entry is not None:
+            response.close()
+            self.cache.touch(url)
+            return response_from_cache(url, entry)
+
+        if response.status_code == 200 and not is_html_content_type(response.headers.get('Content-Type')):
+            return self._skipped_response(response, 'content_type')
+
+        # 大きすぎる本文は先頭max_body_bytesだけを受信する（タイトル・メタタグ・前半の本文は解析できる）
+        try:
+            chunks = []
+            size = 0
+            for chunk in response.iter_content(STREAM_CHUNK_BYTES):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > self.max_body_bytes:
+                    response.truncated = True
+                    break
+            body = b''.join(chunks)[:self.max_body_bytes]
+        finally:
+            response.close()
+
+        response._content = body
+        response._content_consumed = True
+        response.encoding = resolve_encoding(response.headers, body)
+
+        if (self.cache is not None and response.status_code == 200 and not response.truncated
+                and ('ETag' in response.headers or 'Last-Modified' in response.headers)):
+            self.cache.put(url, response.headers, body)
+
+        return response
+
+    @staticmethod
+    def _skipped_response(response, reason):
+        """
+        本文を受信せずにレスポンスを閉じる（本文は空）
+        """
+        response.close()
+        response._content = b''
+        response._content_consumed = True
+        response.from_cache = False
+        response.skipped = reason
+        response.truncated = False
+        return response
+
+    def stream(self, url, timeout=10):
+        """
+        本文を逐次読み込むレスポンスを返す（サイトマップなど大きなファイル用、キャッシュしない）
+        呼び出し側でresponse.close()すること
+        """
+        return self.session.get(url, timeout=timeout, stream=True)
+
+    def close(self):
+        self.session.close()
+        if self.cache:
+            self.cache.close()
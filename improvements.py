@@ -0,0 +1,252 @@
+"""
+改善提案ルールエンジン
+ページ単位のチェックをルールとして宣言し、ページテーブル上のブール値マスクとして
+まとめて評価する。ルールごとの件数・該当URLと、URLごとの問題一覧を生成する
+"""
+import pandas as pd
+
+from scoring import build_page_frame, simple_url_mask
+
+
+class Rule:
+    """
+    ページ単位の改善ルール
+    condition: ページテーブルを受け取り、問題のあるページをTrueとするマスクを返す関数
+    message: 複数ページが該当する場合の提案（{count}に件数が入る）
+    single_message: 1ページのみ該当する場合の提案（{title}にページタイトルが入る、省略時はmessage）
+    """
+
+    def __init__(self, rule_id, category, label, condition, message, single_message=None):
+        self.rule_id = rule_id
+        self.category = category
+        self.label = label
+        self.condition = condition
+        self.message = message
+        self.single_message = single_message
+
+    def format_message(self, count, first_title):
+        if count == 1 and self.single_message:
+            return self.single_message.format(title=first_title, count=count)
+        return self.message.format(count=count)
+
+
+def _text_len(frame, column):
+    return frame[column].str.len()
+
+
+def _flag(frame, column):
+    """
+    ブール値の列を返す（重複検出などを行っていないテーブルでは、すべてFalse）
+    """
+    if column not in frame:
+        return pd.Series(False, index=frame.index)
+    return frame[column].fillna(False).astype(bool)
+
+
+# ページ単位のルール（宣言順に改善提案として出力される）
+PAGE_RULES = [
+    # コンテンツ改善
+    Rule(
+        'meta_description', 'content', 'メタディスクリプション',
+        lambda f: (_text_len(f, 'meta_description') == 0) | (f['meta_description'] == "No Meta Description")
+        | (_text_len(f, 'meta_description') < 70) | (_text_len(f, 'meta_description') > 160),
+        "{count}ページでメタディスクリプションに問題があります。適切な長さ（70〜160文字）に調整してください。",
+        "「{title}」ページのメタディスクリプションに問題があります。適切な長さ（70〜160文字）に調整してください。"
+    ),
+    Rule(
+        'missing_h1', 'content', 'H1タグ',
+        lambda f: (_text_len(f, 'h1') == 0) | (f['h1'] == "No H1"),
+        "{count}ページでH1タグが適切に設定されていません。各ページに固有のH1タグを設定してください。",
+        "「{title}」ページにH1タグが設定されていません。適切なH1タグを設定してください。"
+    ),
+    Rule(
+        'low_content', 'content', 'コンテンツ量',
+        lambda f: f['word_count'] < 600,
+        "{count}ページでコンテンツ量が不足しています。主要ページでは最低1,000文字以上を目指しましょう。",
+        "「{title}」ページのコンテンツ量が不足しています。もっと詳細なコンテンツを追加してください。"
+    ),
+    Rule(
+        'missing_h2', 'content', '見出し構造',
+        lambda f: f['h2_count'] == 0,
+        "{count}ページで見出し構造（H2タグ）が使用されていません。コンテンツを整理し、適切な見出し構造を作成してください。",
+        "「{title}」ページで見出し構造（H2タグ）が使用されていません。コンテンツを整理し、適切な見出し構造を作成してください。"
+    ),
+    Rule(
+        'image_alt', 'content', '画像のalt属性',
+        lambda f: (f['image_count'] > 0) & (f['images_with_alt'] / f['image_count'].where(f['image_count'] > 0) < 0.8),
+        "複数の画像にalt属性が設定されていません。すべての画像に適切な代替テキストを設定してください。"
+    ),
+    # 内部SEO改善
+    Rule(
+        'low_internal_links', 'internal', '内部リンク',
+        lambda f: f['internal_links_count'] < 5,
+        "{count}ページで内部リンクが不足しています。関連コンテンツへのリンクを増やしてください。",
+        "「{title}」ページの内部リンクが不足しています。関連コンテンツへのリンクを増やしてください。"
+    ),
+    Rule(
+        'complex_url', 'internal', 'URL構造',
+        lambda f: ~simple_url_mask(f['url']),
+        "複雑なURL構造が検出されました。URLはシンプルで、キーワードを含む構造にしてください。"
+    ),
+    Rule(
+        'non_https', 'internal', 'HTTPS',
+        lambda f: ~f['url'].str.startswith('https://'),
+        "HTTPSが導入されていないページが検出されました。セキュリティとSEOのためにすべてのページをHTTPSに移行してください。"
+    ),
+    # 技術的SEO改善（重複・類似コンテンツの検出結果の列を使う）
+    Rule(
+        'duplicate_without_canonical', 'technical', 'canonical未設定の重複',
+        lambda f: _flag(f, 'canonical_missing'),
+        "{count}ページで、内容が重複・類似するページがあるのにcanonicalが設定されていません。rel=canonicalで正規URLを指定してください。",
+        "「{title}」ページと内容が重複・類似するページがありますが、canonicalが設定されていません。rel=canonicalで正規URLを指定してください。"
+    ),
+    Rule(
+        'inconsistent_canonical', 'technical', 'canonicalの不一致',
+        lambda f: _flag(f, 'canonical_inconsistent'),
+        "{count}ページで、内容が重複・類似するページとcanonicalの指定先が一致していません。同じ内容のページは同一の正規URLを指定してください。",
+        "「{title}」ページのcanonicalの指定先が、内容が重複・類似するページと一致していません。同じ内容のページは同一の正規URLを指定してください。"
+    ),
+]
+
+# データに依存しない一般的な提案（カテゴリごと、ルールの提案の後に出力）
+GENERAL_ADVICE = {
+    "internal": [
+        # モバイル対応の提案（実際には詳細な分析が必要）
+        "モバイルフレンドリーなデザインを確認してください。Googleのモバイルファーストインデックスに最適化することが重要です。",
+        # ページ速度の最適化提案
+        "ページ読み込み速度の最適化を行ってください。画像の圧縮、JavaScriptの遅延読み込み、不要なプラグインの削除などが効果的です。",
+    ],
+    # 外部SEO改善提案（実際にはより詳細な分析が必要）
+    "external": [
+        "高品質なドメインからのバックリンクを獲得するために、業界関連の信頼性の高いサイトとの関係構築を行ってください。",
+        "バックリンクのアンカーテキストの多様性を確保してください。同じアンカーテキストの過剰な使用は避けるべきです。",
+        "ソーシャルメディアでの存在感を高め、コンテンツのシェアを促進してください。インフォグラフィックなど共有されやすいコンテンツの作成が効果的です。",
+    ],
+    # 技術的SEO改善提案
+    "technical": [
+        "構造化データ（Schema.org）を実装して、検索結果での表示を改善してください。",
+        "404エラーページを確認し、リダイレクトまたはコンテンツの復元を検討してください。",
+    ],
+}
+
+
+# サイトマップ・robots.txtの一般的な提案（クロール時の取得結果がない場合に出力）
+SITEMAP_ROBOTS_ADVICE = [
+    "XMLサイトマップを最新の状態に保ち、Google Search Consoleに定期的に送信してください。",
+    "robots.txtファイルを最適化し、クローラーが適切にサイトをインデックスできるようにしてください。",
+]
+
+
+# 重複コンテンツの一般的な提案（重複・類似コンテンツの検出結果がない場合に出力）
+DUPLICATE_ADVICE = [
+    "重複コンテンツの問題を確認し、canonical URLを適切に設定してください。",
+]
+
+
+def sitemap_robots_advice(coverage):
+    """
+    クロール時に取得したサイトマップ・robots.txtとクロール結果の差分から提案を生成する
+    coverage: sitemaps.coverage_reportの結果
+    """
+    advice = []
+    if coverage['sitemap_urls'] == 0:
+        advice.append("XMLサイトマップが見つかりませんでした。サイトマップを作成し、robots.txtのSitemap行とGoogle Search Consoleで送信してください。")
+    else:
+        if coverage['pages_not_in_sitemap']:
+            advice.append(f"{len(coverage['pages_not_in_sitemap'])}ページがXMLサイトマップに含まれていません。インデックスさせたいページをサイトマップに追加してください。")
+        if coverage['sitemap_blocked']:
+            advice.append(f"サイトマップの{len(coverage['sitemap_blocked'])}件のURLがrobots.txtでクロールを禁止されています。サイトマップとrobots.txtの設定を揃えてください。")
+        if coverage['sitemap_not_linked']:
+            advice.append(f"サイトマップの{len(coverage['sitemap_not_linked'])}件のURLが、クロールしたページから内部リンクされていません。重要なページにはナビゲーションや関連ページからリンクしてください。")
+    if not coverage['robots_found']:
+        advice.append("robots.txtが見つかりませんでした。クローラーの制御とサイトマップの通知のためにrobots.txtを設置してください。")
+    return advice
+
+
+def evaluate_rules(frame, rules=PAGE_RULES):
+    """
+    すべてのルールをページテーブル上のマスクとして評価する
+    戻り値: 行がページ、列がルールIDのブール値DataFrame
+    """
+    return pd.DataFrame(
+        {rule.rule_id: rule.condition(frame).to_numpy(dtype=bool) for rule in rules},
+        index=frame.index
+    )
+
+
+def find_page_issues(pages_data, rules=PAGE_RULES):
+    """
+    ルールごとの検出結果を生成する関数
+    戻り値: [{'rule_id', 'category', 'label', 'count', 'urls', 'message'}, ...]（該当ページのあるルールのみ）
+    """
+    frame = build_page_frame(pages_data)
+    masks = evaluate_rules(frame, rules)
+
+    findings = []
+    for rule in rules:
+        mask = masks[rule.rule_id]
+        count = int(mask.sum())
+        if count == 0:
+            continue
+        affected = frame.loc[mask.to_numpy()]
+        findings.append({
+            'rule_id': rule.rule_id,
+            'category': rule.category,
+            'label': rule.label,
+            'count': count,
+            'urls': affected['url'].tolist(),
+            'message': rule.format_message(count, affected['title'].iloc[0])
+        })
+    return findings
+
+
+def issues_by_url(findings):
+    """
+    検出結果をURLごとの問題一覧（URL・カテゴリ・項目）のDataFrameに変換する
+    """
+    rows = [
+        {'url': url, 'category': finding['category'], 'issue': finding['label']}
+        for finding in findings
+        for url in finding['urls']
+    ]
+    return pd.DataFrame(rows, columns=['url', 'category', 'issue'])
+
+
+def generate_improvements(pages_data, keyword_analysis, findings=None, coverage=None, duplicates=None):
+    """
+    分析結果に基づいて改善提案を生成する関数
+    findings: find_page_issuesの結果（省略時はここで評価する）
+    coverage: sitemaps.coverage_reportの結果（省略時はサイトマップ・robots.txtの一般的な提案を出力する）
+    duplicates: duplicates.find_duplicatesのクラスタ一覧（省略時は重複コンテンツの一般的な提案を出力する。
+                指定時の問題はページ単位のルールとして出力される）
+    """
+    if findings is None:
+        findings = find_page_issues(pages_data)
+
+    improvements = {
+        "content": [],
+        "internal": [],
+        "external": [],
+        "technical": []
+    }
+
+    for finding in findings:
+        improvements[finding['category']].append(finding['message'])
+
+    # キーワード活用の提案
+    if keyword_analysis:
+        keyword_pages = sum(len(data['matches']) for data in keyword_analysis.values())
+        if keyword_pages < len(pages_data) * len(keyword_analysis) * 0.5:
+            # コンテンツ系ルールの提案の後に追加する
+            improvements["content"].append("ターゲットキーワードの活用が不十分です。より多くのページでキーワードを自然に取り入れてください。")
+
+    improvements["technical"].extend(
+        SITEMAP_ROBOTS_ADVICE if coverage is None else sitemap_robots_advice(coverage)
+    )
+    if duplicates is None:
+        improvements["technical"].extend(DUPLICATE_ADVICE)
+
+    for category, advice in GENERAL_ADVICE.items():
+        improvements[category].extend(advice)
+
+    return improvements
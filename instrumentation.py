@@ -0,0 +1,221 @@
+"""
+クロールと分析の計測
+URLごとの取得時間（応答ヘッダーまでの待ち時間とダウンロード時間）・バイト数・ステータス・解析時間、
+処理段階ごとの所要時間、リトライ・スキップ・エラーの件数を記録し、JSONとPrometheusのテキスト形式で出力する
+"""
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+# 取得時間・解析時間のヒストグラムの区切り（秒）
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PARSE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+
+# 記録するエラーメッセージの上限（件数はすべて数える）
+MAX_ERRORS = 1000
+
+# カウンターの名前
+COUNTER_RETRIES = 'retries'
+COUNTER_SKIPPED = 'skipped'
+COUNTER_ERRORS = 'errors'
+COUNTER_CACHE_HITS = 'cache_hits'
+COUNTER_NON_HTML = 'non_html'
+COUNTER_TRUNCATED = 'truncated'
+
+METRIC_PREFIX = 'seo_analysis'
+
+
+class Instrumentation:
+    """
+    1回の分析の計測結果（ワーカースレッドから同時に記録できる）
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.urls = []
+        self.statuses = array('i')
+        self.latencies = array('d')
+        self.waits = array('d')
+        self.sizes = array('q')
+        self.parse_times = array('d')
+        self.counters = dict.fromkeys((COUNTER_RETRIES, COUNTER_SKIPPED, COUNTER_ERRORS, COUNTER_CACHE_HITS,
+                                       COUNTER_NON_HTML, COUNTER_TRUNCATED), 0)
+        self.stages = {}
+        self.errors = []
+
+    def record_fetch(self, url, status, latency, wait, size, parse_time=0.0):
+        """
+        1URL分の取得結果を記録する
+        latency: リクエストの開始から本文の受信完了までの秒数
+        wait: 応答ヘッダーを受信するまでの秒数（名前解決・接続・TLS・サーバーの処理を含む）
+        parse_time: HTML解析の秒数（解析しなかった場合は0）
+        """
+        with self._lock:
+            self.urls.append(url)
+            self.statuses.append(status)
+            self.latencies.append(latency)
+            self.waits.append(wait)
+            self.sizes.append(size)
+            self.parse_times.append(parse_time)
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record_error(self, url, message):
+        with self._lock:
+            self.counters[COUNTER_ERRORS] += 1
+            if len(self.errors) < MAX_ERRORS:
+                self.errors.append({'url': url, 'message': str(message)})
+
+    def add_stage_time(self, name, seconds):
+        """
+        処理段階の所要時間を加算する（同じ名前の段階は合計する）
+        """
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name):
+        """
+        処理段階の所要時間を計測する
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage_time(name, time.perf_counter() - start)
+
+    def fetch_frame(self):
+        """
+        URLごとの取得結果のDataFrame（url / status / latency / wait / download / bytes / parse_time列）
+        """
+        with self._lock:
+            latencies = np.frombuffer(self.latencies, dtype=np.float64).copy()
+            waits = np.frombuffer(self.waits, dtype=np.float64).copy()
+            frame = pd.DataFrame({
+                'url': list(self.urls),
+                'status': np.frombuffer(self.statuses, dtype=np.int32).copy(),
+                'latency': latencies,
+                'wait': waits,
+                'download': np.maximum(latencies - waits, 0.0),
+                'bytes': np.frombuffer(self.sizes, dtype=np.int64).copy(),
+                'parse_time': np.frombuffer(self.parse_times, dtype=np.float64).copy()
+            })
+        return frame
+
+    def _snapshot(self):
+        with self._lock:
+            return (
+                np.frombuffer(self.latencies, dtype=np.float64).copy(),
+                np.frombuffer(self.parse_times, dtype=np.float64).copy(),
+                np.frombuffer(self.statuses, dtype=np.int32).copy(),
+                int(np.frombuffer(self.sizes, dtype=np.int64).sum()),
+                dict(self.counters),
+                dict(self.stages),
+                list(self.errors)
+            )
+
+    def summary(self):
+        """
+        計測結果の概要（JSONに変換できる辞書）
+        """
+        latencies, parse_times, statuses, total_bytes, counters, stages, errors = self._snapshot()
+        stages = {name: round(seconds, 4) for name, seconds in stages.items()}
+        codes, counts = np.unique(statuses, return_counts=True)
+        parsed = parse_times[parse_times > 0]
+        return {
+            'fetches': int(len(latencies)),
+            'bytes': total_bytes,
+            'status_counts': {str(int(code)): int(count) for code, count in zip(codes, counts)},
+            'latency': _distribution(latencies),
+            'parse': _distribution(parsed),
+            'counters': counters,
+            'stages': stages,
+            'errors': errors
+        }
+
+    def to_json(self):
+        """
+        概要とURLごとの取得結果（JSONに変換できる辞書）
+        """
+        result = self.summary()
+        result['fetch_log'] = self.fetch_frame().to_dict(orient='records')
+        return result
+
+    def to_prometheus(self):
+        """
+        計測結果をPrometheusのテキスト形式（exposition format）に変換する
+        """
+        latencies, parse_times, statuses, total_bytes, counters, stages, _ = self._snapshot()
+
+        lines = []
+        lines += _histogram_lines(f'{METRIC_PREFIX}_fetch_duration_seconds', 'Page fetch latency',
+                                  latencies, LATENCY_BUCKETS)
+        lines += _histogram_lines(f'{METRIC_PREFIX}_parse_duration_seconds', 'HTML parse time',
+                                  parse_times[parse_times > 0], PARSE_BUCKETS)
+
+        lines.append(f'# HELP {METRIC_PREFIX}_fetch_bytes_total Downloaded response bytes')
+        lines.append(f'# TYPE {METRIC_PREFIX}_fetch_bytes_total counter')
+        lines.append(f'{METRIC_PREFIX}_fetch_bytes_total {total_bytes}')
+
+        lines.append(f'# HELP {METRIC_PREFIX}_responses_total Responses by HTTP status')
+        lines.append(f'# TYPE {METRIC_PREFIX}_responses_total counter')
+        codes, counts = np.unique(statuses, return_counts=True)
+        for code, count in zip(codes, counts):
+            lines.append(f'{METRIC_PREFIX}_responses_total{{status="{int(code)}"}} {int(count)}')
+
+        lines.append(f'# HELP {METRIC_PREFIX}_events_total Crawl events (retries, skips, errors, cache hits, non-HTML, truncated)')
+        lines.append(f'# TYPE {METRIC_PREFIX}_events_total counter')
+        for name, value in sorted(counters.items()):
+            lines.append(f'{METRIC_PREFIX}_events_total{{event="{name}"}} {value}')
+
+        lines.append(f'# HELP {METRIC_PREFIX}_stage_duration_seconds Time spent in each pipeline stage')
+        lines.append(f'# TYPE {METRIC_PREFIX}_stage_duration_seconds gauge')
+        for name, seconds in stages.items():
+            lines.append(f'{METRIC_PREFIX}_stage_duration_seconds{{stage="{name}"}} {seconds:.6f}')
+        return '\n'.join(lines) + '\n'
+
+
+def _distribution(values):
+    if len(values) == 0:
+        return {'count': 0, 'mean': 0.0, 'p50': 0.0, 'p90': 0.0, 'p99': 0.0, 'max': 0.0}
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {
+        'count': int(len(values)),
+        'mean': round(float(values.mean()), 6),
+        'p50': round(float(p50), 6),
+        'p90': round(float(p90), 6),
+        'p99': round(float(p99), 6),
+        'max': round(float(values.max()), 6)
+    }
+
+
+def _histogram_lines(name, help_text, values, buckets):
+    """
+    Prometheusのヒストグラム（累積のバケット・合計・件数）の行を作成する
+    """
+    cumulative = np.searchsorted(np.sort(values), buckets, side='right')
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+    for bound, count in zip(buckets, cumulative):
+        lines.append(f'{name}_bucket{{le="{bound}"}} {int(count)}')
+    lines.append(f'{name}_bucket{{le="+Inf"}} {len(values)}')
+    lines.append(f'{name}_sum {float(values.sum()):.6f}')
+    lines.append(f'{name}_count {len(values)}')
+    return lines
+
+
+@contextmanager
+def measure_stage(instrumentation, name):
+    """
+    処理段階の所要時間を計測する（instrumentationがNoneの場合は何もしない）
+    """
+    if instrumentation is None:
+        yield
+    else:
+        with instrumentation.stage(name):
+            yield
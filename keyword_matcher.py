@@ -0,0 +1,153 @@
+"""
+複数キーワードの一括マッチング（Aho-Corasick法）
+キーワード集合からオートマトンを一度だけ構築し、ページのタイトル・見出し・本文を
+1回ずつ走査してすべてのキーワードの出現回数を同時に数える
+"""
+import re
+import unicodedata
+from collections import deque
+
+# 日本語（ひらがな・カタカナ・漢字・半角カナ）の文字範囲
+CJK_CHARS = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff66-\uff9f'
+
+# トークン分割: 日本語は1文字を1トークン、それ以外は単語（英数字の連続）を1トークンとする
+TOKEN_PATTERN = re.compile(f'[{CJK_CHARS}]|[^\\W{CJK_CHARS}]+')
+
+# マッチング対象のフィールド（bodyには見出しのテキストも含まれる）
+MATCH_FIELDS = ('title', 'meta_description', 'headings', 'body_text')
+# 出現回数の合計に含めるフィールド（見出しは本文と重複するため内訳としてのみ数える）
+TOTAL_FIELDS = ('title', 'meta_description', 'body_text')
+
+
+def normalize_text(text):
+    """
+    全角・半角の揺れと大文字・小文字を統一する
+    """
+    return unicodedata.normalize('NFKC', text).lower()
+
+
+def count_tokens(text):
+    """
+    日本語を考慮したトークン数（日本語は文字数、英語は単語数）
+    """
+    return len(TOKEN_PATTERN.findall(text))
+
+
+class KeywordMatcher:
+    """
+    キーワード集合から構築したAho-Corasickオートマトン
+    キーワード数に関係なく、テキスト長に比例する時間で全キーワードを数える
+    """
+
+    def __init__(self, keywords):
+        self.keywords = list(keywords)
+        self.token_lengths = [max(1, count_tokens(normalize_text(keyword))) for keyword in self.keywords]
+
+        # 遷移表・失敗遷移・各状態で一致するキーワード番号
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+        for index, keyword in enumerate(self.keywords):
+            pattern = normalize_text(keyword)
+            if not pattern:
+                continue
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append(index)
+
+        self._build_failure_links()
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                if self._fail[next_state] == next_state:
+                    self._fail[next_state] = 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def count(self, text):
+        """
+        テキスト中の各キーワードの出現回数を返す（キーワードと同じ順序のリスト）
+        text: normalize_text済みのテキスト
+        """
+        counts = [0] * len(self.keywords)
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        root = goto[0]
+        state = 0
+
+        for char in text:
+            # ルート状態で遷移のない文字は読み飛ばす（大半の文字はここで処理される）
+            if state == 0:
+                state = root.get(char, 0)
+            else:
+                while state and char not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(char, 0)
+            for index in output[state]:
+                counts[index] += 1
+
+        return counts
+
+    def match_page(self, page):
+        """
+        ページの各フィールドを走査し、キーワードごとのフィールド別出現回数を返す
+        戻り値: (キーワードごとの{フィールド: 回数}のリスト, ページのトークン数)
+        """
+        field_counts = [{} for _ in self.keywords]
+        token_count = 0
+        for field in MATCH_FIELDS:
+            text = page.get(field) or ""
+            if field in ('title', 'meta_description') and text in ("No Title", "No Meta Description"):
+                text = ""
+            text = normalize_text(text)
+            if field in TOTAL_FIELDS:
+                token_count += count_tokens(text)
+            for index, hits in enumerate(self.count(text) if text else [0] * len(self.keywords)):
+                field_counts[index][field] = hits
+        return field_counts, token_count
+
+
+def match_keywords(pages_data, keywords):
+    """
+    全ページでキーワードの出現回数と密度を計算する関数
+    戻り値: キーワードごとの一致ページ一覧
+            [{'url', 'title', 'count', 'density', 'fields'}, ...]
+    """
+    matcher = KeywordMatcher(keywords)
+    matches = {keyword: [] for keyword in keywords}
+
+    for page in pages_data:
+        field_counts, token_count = matcher.match_page(page)
+        for index, keyword in enumerate(matcher.keywords):
+            fields = field_counts[index]
+            count = sum(fields[field] for field in TOTAL_FIELDS)
+            if count == 0:
+                continue
+            # キーワード密度: キーワードが占めるトークンの割合（日本語は文字数ベース）
+            density = count * matcher.token_lengths[index] / max(1, token_count) * 100
+            matches[keyword].append({
+                'url': page['url'],
+                'title': page['title'],
+                'count': count,
+                'density': round(density, 2),
+                'fields': fields
+            })
+
+    return matches
@@ -0,0 +1,188 @@
+"""
+内部リンクグラフ
+URLを整数IDに置き換えてリンクをCSR形式の疎行列として保持し、
+PageRank・クリック深度・孤立ページ・行き止まりページ・被リンク数を疎行列演算で計算する
+"""
+from array import array
+
+import numpy as np
+import pandas as pd
+
+from frontier import normalize_url
+
+# PageRankのダンピング係数
+DAMPING = 0.85
+
+
+class LinkGraph:
+    """
+    クロールしたページ間の内部リンクグラフ
+    urls: ID→URLの表（クロールしたページとリンク先としてのみ発見したURL）
+    page_ids: クロールしたページのID（ページデータと同じ順序）
+    sources, targets: リンク元・リンク先のID配列
+    root: クリック深度の起点とするページのID（省略時は最初のページ）
+    """
+
+    def __init__(self, urls, page_ids, sources, targets, root=None):
+        # scipyは起動を速くするため使用時に読み込む
+        from scipy import sparse
+
+        self.urls = urls
+        self.page_ids = np.asarray(page_ids, dtype=np.int64)
+        self.root = root if root is not None else (int(self.page_ids[0]) if len(self.page_ids) else None)
+
+        node_count = len(urls)
+        data = np.ones(len(sources), dtype=np.float32)
+        self.matrix = sparse.csr_matrix((data, (sources, targets)), shape=(node_count, node_count))
+        self.matrix.sum_duplicates()
+
+    @property
+    def node_count(self):
+        return self.matrix.shape[0]
+
+    @property
+    def link_count(self):
+        return self.matrix.nnz
+
+    def out_degree(self):
+        return np.diff(self.matrix.indptr)
+
+    def in_degree(self):
+        """
+        被リンク数（クロールしたページからのリンクのみを数える）
+        """
+        return np.bincount(self.matrix.indices, minlength=self.node_count)
+
+    def linked_urls(self):
+        """
+        クロールしたページから内部リンクされているURL
+        """
+        return [self.urls[node] for node in np.flatnonzero(self.in_degree())]
+
+    def pagerank(self, damping=DAMPING, tol=1.0e-8, max_iter=100):
+        """
+        内部リンクのみで計算したPageRank（べき乗法、合計は1）
+        リンクのないページ（行き止まり・未取得のURL）の値は全ページに均等に配分する
+        """
+        from scipy import sparse
+
+        node_count = self.node_count
+        if node_count == 0:
+            return np.zeros(0)
+
+        out_degree = self.out_degree()
+        inverse = np.divide(1.0, out_degree, out=np.zeros(node_count), where=out_degree > 0)
+        # 転置した遷移行列（列ごとに発リンク数で正規化）
+        transition = (sparse.diags(inverse) @ self.matrix).T.tocsr()
+        dangling = out_degree == 0
+
+        rank = np.full(node_count, 1.0 / node_count)
+        for _ in range(max_iter):
+            new_rank = damping * (transition @ rank + rank[dangling].sum() / node_count) + (1 - damping) / node_count
+            converged = np.abs(new_rank - rank).sum() < tol
+            rank = new_rank
+            if converged:
+                break
+        return rank
+
+    def click_depth(self):
+        """
+        起点ページからの最短クリック数（到達できないページは-1）
+        """
+        from scipy.sparse import csgraph
+
+        if self.root is None:
+            return np.full(self.node_count, -1, dtype=np.int64)
+        distances = csgraph.shortest_path(self.matrix, method='D', unweighted=True, indices=self.root)
+        return np.where(np.isinf(distances), -1, distances).astype(np.int64)
+
+    def page_metrics(self):
+        """
+        クロールしたページごとのリンク指標（ページデータと同じ順序）
+        戻り値: url / inlinks / outlinks / pagerank / click_depth / orphan / dead_end列を持つDataFrame
+        """
+        ids = self.page_ids
+        inlinks = self.in_degree()[ids]
+        outlinks = self.out_degree()[ids]
+        return pd.DataFrame({
+            'url': [self.urls[node] for node in ids],
+            'inlinks': inlinks,
+            'outlinks': outlinks,
+            'pagerank': self.pagerank()[ids],
+            'click_depth': self.click_depth()[ids],
+            # 孤立ページ: 起点以外で、どのページからもリンクされていない
+            'orphan': (inlinks == 0) & (ids != self.root),
+            # 行き止まりページ: 他のページへの内部リンクがない
+            'dead_end': outlinks == 0
+        })
+
+    def summary(self, metrics=None):
+        """
+        サイト全体のリンク構造の概要
+        """
+        if metrics is None:
+            metrics = self.page_metrics()
+        reachable = metrics['click_depth'] >= 0
+        return {
+            'pages': len(metrics),
+            'urls': self.node_count,
+            'links': self.link_count,
+            'orphans': int(metrics['orphan'].sum()),
+            'dead_ends': int(metrics['dead_end'].sum()),
+            'unreachable': int((~reachable).sum()),
+            'max_depth': int(metrics.loc[reachable, 'click_depth'].max()) if reachable.any() else 0,
+            'avg_depth': float(metrics.loc[reachable, 'click_depth'].mean()) if reachable.any() else 0.0
+        }
+
+
+def build_link_graph(pages_data):
+    """
+    ページデータ（リストまたはStoredPages）から内部リンクグラフを作成する関数
+    ページを1件ずつ読み込んでリンク先URLを整数IDに置き換えるため、URL文字列は1回だけ保持される
+    （正規化したURLが同じもの（末尾スラッシュの有無など）は同じノードにし、表示にはクロールしたページのURLを使う）
+    StoredPagesのページはリンクをストアのID（'url_id'・'link_ids'）で持つため、URLは対応表から1回だけ読み込む
+    """
+    link_urls = pages_data.link_urls() if hasattr(pages_data, 'link_urls') else {}
+    ids = {}
+    stored_ids = {}
+    urls = []
+    page_ids = array('q')
+    sources = array('q')
+    targets = array('q')
+
+    def intern(url):
+        key = normalize_url(url)
+        node = ids.get(key)
+        if node is None:
+            node = ids[key] = len(urls)
+            urls.append(url)
+        return node
+
+    def intern_stored(url_id):
+        node = stored_ids.get(url_id)
+        if node is None:
+            node = stored_ids[url_id] = intern(link_urls[url_id])
+        return node
+
+    for page in pages_data:
+        if 'link_ids' in page:
+            source = intern_stored(page['url_id'])
+            links = map(intern_stored, page['link_ids'])
+        else:
+            # 以前のバージョンで保存したページ・リストのページデータはURLの一覧を持つ
+            source = intern(page['url'])
+            links = map(intern, page.get('internal_links') or ())
+        urls[source] = page['url']
+        page_ids.append(source)
+        for target in links:
+            # 自分自身へのリンクは被リンクとして数えない
+            if target != source:
+                sources.append(source)
+                targets.append(target)
+
+    return LinkGraph(
+        urls,
+        np.frombuffer(page_ids, dtype=np.int64),
+        np.frombuffer(sources, dtype=np.int64),
+        np.frombuffer(targets, dtype=np.int64)
+    )
@@ -0,0 +1,520 @@
+"""
+検索ボリューム・検索順位・被リンクなどの外部指標のプロバイダー
+キーワード・ドメインをまとめて問い合わせ（バッチ）、結果をディスクにTTL付きでキャッシュし、
+プロバイダーへの問い合わせはレート制限に従う。標準では指標を決定的に生成するスタブを使い、
+GSC・Ahrefs・SEMrushなどのエクスポート（CSV/JSON）を読み込むファイルプロバイダーに差し替えられる
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from hashing import mix64
+from http_client import DEFAULT_CACHE_DIR
+from keyword_matcher import normalize_text
+from rate_limit import HostRateLimiter
+
+# 検索順位の推移の日数
+RANK_HISTORY_DAYS = 30
+
+# キャッシュの有効期間（秒）
+DEFAULT_CACHE_TTL = 24 * 60 * 60
+
+# キャッシュを1回のSQLで参照するキーの数
+CACHE_LOOKUP_CHUNK = 500
+
+KEYWORD_COLUMNS = ('search_volume', 'current_rank', 'difficulty', 'rankings')
+DOMAIN_COLUMNS = ('seo_score', 'backlinks', 'keywords_ranking', 'content_score', 'technical_score',
+                  'page_speed', 'domain_authority')
+
+
+def normalize_keyword(keyword):
+    return normalize_text(keyword).strip()
+
+
+class MetricsCache:
+    """
+    指標のディスクキャッシュ（SQLite）
+    プロバイダー名・種類・キーごとに指標（JSON）と取得時刻を保存する
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, ttl=DEFAULT_CACHE_TTL):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, 'metrics_cache.sqlite')
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS metrics ("
+            "provider TEXT, kind TEXT, key TEXT, value TEXT, fetched_at REAL, "
+            "PRIMARY KEY (provider, kind, key))"
+        )
+        self._conn.commit()
+
+    def get_many(self, provider, kind, keys):
+        """
+        有効期間内の指標をまとめて取得する
+        戻り値: {キー: 指標の辞書}（見つからないキー・期限切れのキーは含まない）
+        """
+        found = {}
+        oldest = time.time() - self.ttl
+        keys = list(keys)
+        with self._lock:
+            for start in range(0, len(keys), CACHE_LOOKUP_CHUNK):
+                chunk = keys[start:start + CACHE_LOOKUP_CHUNK]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM metrics WHERE provider = ? AND kind = ? AND fetched_at >= ? "
+                    f"AND key IN ({placeholders})",
+                    [provider, kind, oldest, *chunk]
+                ).fetchall()
+                found.update((key, json.loads(value)) for key, value in rows)
+        return found
+
+    def put_many(self, provider, kind, values):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO metrics (provider, kind, key, value, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                [(provider, kind, key, json.dumps(value, ensure_ascii=False), now) for key, value in values.items()]
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class MetricsProvider:
+    """
+    外部指標のプロバイダーの基底クラス
+    サブクラスはfetch_keywords・fetch_domains・fetch_keyword_ranksを実装する（1回の呼び出しで最大batch_size件）
+    cache: MetricsCache（指定すると有効期間内の指標は問い合わせない）
+    requests_per_second: プロバイダーへの最大問い合わせ数/秒（0は制限なし）
+    """
+    name = 'base'
+    batch_size = 100
+
+    def __init__(self, cache=None, requests_per_second=0):
+        self.cache = cache
+        self.limiter = HostRateLimiter(requests_per_second=requests_per_second, max_concurrency=1)
+
+    def close(self):
+        """
+        キャッシュの接続を閉じる（with文で使うと分析の終了時に閉じる）
+        """
+        if self.cache is not None:
+            self.cache.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def fetch_keywords(self, keywords):
+        """
+        戻り値: {キーワード: {'search_volume', 'current_rank', 'difficulty', 'rankings'}}（不明なキーワードは省略）
+        """
+        raise NotImplementedError
+
+    def fetch_domains(self, domains):
+        """
+        戻り値: {ドメイン: {DOMAIN_COLUMNSの指標}}（不明なドメインは省略）
+        """
+        raise NotImplementedError
+
+    def fetch_keyword_ranks(self, domain, keywords):
+        """
+        戻り値: {キーワード: 順位}（ドメインが順位を持たないキーワードは省略）
+        """
+        raise NotImplementedError
+
+    def _lookup(self, kind, keys, fetch):
+        """
+        キャッシュを参照し、見つからないキーだけをバッチに分けてレート制限に従って問い合わせる
+        """
+        keys = list(dict.fromkeys(keys))
+        found = self.cache.get_many(self.name, kind, keys) if self.cache else {}
+        missing = [key for key in keys if key not in found]
+
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            self.limiter.acquire(self.name)
+            try:
+                fetched = fetch(batch)
+            finally:
+                self.limiter.release(self.name)
+            if self.cache:
+                self.cache.put_many(self.name, kind, fetched)
+            found.update(fetched)
+        return found
+
+    def keyword_metrics(self, keywords):
+        """
+        キーワードの検索ボリューム・現在の順位・難易度・順位の推移（RANK_HISTORY_DAYS日分）
+        戻り値: キーワード（入力どおり）をインデックスとし、指標とデータ元（source列）を持つDataFrame
+                （不明な指標はNaN）
+        """
+        keys = {keyword: normalize_keyword(keyword) for keyword in keywords}
+        found = self._lookup('keyword', keys.values(), self.fetch_keywords)
+        return _metrics_frame(found, list(keys), list(keys.values()), 'keyword', KEYWORD_COLUMNS, self.name)
+
+    def domain_metrics(self, domains):
+        """
+        ドメインのSEOスコア・被リンク数・ドメインオーソリティなど
+        戻り値: ドメインをインデックスとし、指標とデータ元（source列）を持つDataFrame（不明な指標はNaN）
+        """
+        domains = list(dict.fromkeys(domains))
+        keys = [normalize_domain(domain) for domain in domains]
+        found = self._lookup('domain', keys, self.fetch_domains)
+        return _metrics_frame(found, domains, keys, 'domain', DOMAIN_COLUMNS, self.name)
+
+    def keyword_ranks(self, domains, keywords):
+        """
+        ドメインごとのキーワードの検索順位
+        戻り値: 行がドメイン、列がキーワードのDataFrame（順位がない場合はNaN）
+        """
+        keys = {keyword: normalize_keyword(keyword) for keyword in keywords}
+        domains = list(dict.fromkeys(domains))
+        rows = []
+        for domain in domains:
+            host = normalize_domain(domain)
+            found = self._lookup(f'rank:{host}', keys.values(),
+                                 lambda batch, host=host: self.fetch_keyword_ranks(host, batch))
+            rows.append([found.get(key, np.nan) for key in keys.values()])
+        return pd.DataFrame(rows, index=pd.Index(domains, name='domain'), columns=list(keys), dtype=float)
+
+
+def _metrics_frame(found, labels, keys, index_name, columns, default_source):
+    """
+    キーごとの指標の辞書をDataFrameにまとめる（sourceがない指標はプロバイダー名をデータ元とする）
+    """
+    rows = []
+    for key in keys:
+        values = found.get(key)
+        rows.append(dict(values, source=values.get('source', default_source)) if values else {})
+    return pd.DataFrame(rows, index=pd.Index(labels, name=index_name), columns=[*columns, 'source'])
+
+
+def _hash_strings(values, salt):
+    """
+    文字列ごとの32ビットハッシュ値（zlib.crc32。プロセスやPYTHONHASHSEEDに依存しない）
+    uint64の配列で返し、値を求めるときに_randintでmix64により64ビット全体に拡散する
+    """
+    return np.fromiter((zlib.crc32(f'{salt}:{value}'.encode('utf-8')) for value in values),
+                       dtype=np.uint64, count=len(values))
+
+
+def _randint(hashes, stream, low, high):
+    """
+    ハッシュ値から[low, high)の整数を決定的に求める（streamごとに独立した値になる）
+    """
+    with np.errstate(over='ignore'):
+        mixed = mix64(hashes + np.uint64(stream) * np.uint64(0xD1B54A32D192ED03))
+    return low + ((mixed >> np.uint64(11)) % np.uint64(high - low)).astype(np.int64)
+
+
+class StubProvider(MetricsProvider):
+    """
+    キーワード・ドメインから指標を決定的に生成するスタブ（実データがない場合の既定、外部への問い合わせなし）
+    値の範囲と順位の推移の傾向は従来のランダムなモックデータと同じで、同じ入力には常に同じ値を返す
+    """
+    name = 'stub'
+    batch_size = 100000
+
+    def __init__(self, seed=0, cache=None, requests_per_second=0):
+        super().__init__(cache=cache, requests_per_second=requests_per_second)
+        self.seed = seed
+
+    def fetch_keywords(self, keywords):
+        hashes = _hash_strings(keywords, self.seed)
+        search_volume = _randint(hashes, 1, 100, 10000)
+        current_rank = _randint(hashes, 2, 1, 100)
+        difficulty = _randint(hashes, 3, 20, 80)
+
+        # 最初の順位は現在より少し悪く、日ごとに徐々に改善する（±3のばらつき）
+        base_rank = current_rank + _randint(hashes, 4, 0, 20)
+        trend = _randint(hashes, 5, 5, 20)
+        days = np.arange(RANK_HISTORY_DAYS, dtype=np.uint64)
+        noise = _randint((hashes[:, None] << np.uint64(8)) ^ days[None, :], 6, -3, 4)
+        progress = np.arange(RANK_HISTORY_DAYS) / RANK_HISTORY_DAYS
+        rankings = np.maximum(1, (base_rank[:, None] - progress[None, :] * trend[:, None] + noise).astype(np.int64))
+        # 最新の順位は現在の順位と一致させる
+        rankings[:, -1] = current_rank
+
+        return {
+            keyword: {
+                'search_volume': int(search_volume[i]),
+                'current_rank': int(current_rank[i]),
+                'difficulty': int(difficulty[i]),
+                'rankings': rankings[i].tolist()
+            }
+            for i, keyword in enumerate(keywords)
+        }
+
+    def fetch_domains(self, domains):
+        hashes = _hash_strings(domains, self.seed)
+        ranges = {
+            'seo_score': (40, 95),
+            'backlinks': (30, 1000),
+            'keywords_ranking': (10, 500),
+            'content_score': (50, 95),
+            'technical_score': (40, 95),
+            'page_speed': (50, 95),
+            'domain_authority': (20, 80)
+        }
+        values = {column: _randint(hashes, stream, low, high)
+                  for stream, (column, (low, high)) in enumerate(ranges.items(), 10)}
+        return {domain: {column: int(values[column][i]) for column in ranges} for i, domain in enumerate(domains)}
+
+    def fetch_keyword_ranks(self, domain, keywords):
+        hashes = _hash_strings(keywords, f'{self.seed}:{domain}')
+        ranks = _randint(hashes, 20, 1, 100)
+        return {keyword: int(rank) for keyword, rank in zip(keywords, ranks)}
+
+
+# エクスポートファイルの列名（小文字）と指標の対応（GSC・Ahrefs・SEMrushの主な列名）
+KEYWORD_ALIASES = {
+    'keyword': ('keyword', 'query', 'top queries', 'search query', 'キーワード', '検索キーワード', '上位のクエリ', 'クエリ'),
+    'search_volume': ('volume', 'search volume', 'impressions', '検索ボリューム', '表示回数'),
+    'current_rank': ('position', 'current position', 'pos.', 'average position', '掲載順位', '平均掲載順位', '順位'),
+    'difficulty': ('kd', 'keyword difficulty', 'difficulty', 'keyword difficulty index', '難易度'),
+    'date': ('date', '日付'),
+    'url': ('url', 'current url', 'landing page', 'ページ')
+}
+DOMAIN_ALIASES = {
+    'domain': ('domain', 'target', 'site', 'ドメイン'),
+    'domain_authority': ('domain rating', 'dr', 'authority score', 'domain authority', 'da'),
+    'backlinks': ('backlinks', 'total backlinks', 'external backlinks', '被リンク'),
+    'keywords_ranking': ('organic keywords', 'keywords', 'organic keywords (top 100)'),
+    'seo_score': ('seo score',),
+    'content_score': ('content score',),
+    'technical_score': ('technical score',),
+    'page_speed': ('page speed', 'performance')
+}
+
+
+def _rename_columns(frame, aliases):
+    columns = {}
+    for column in frame.columns:
+        name = str(column).strip().lower()
+        for target, names in aliases.items():
+            if name in names and target not in columns.values():
+                columns[column] = target
+                break
+    return frame.rename(columns=columns)[list(columns.values())]
+
+
+def _numeric(series):
+    return pd.to_numeric(series.astype(str).str.replace(',', '').str.rstrip('%'), errors='coerce')
+
+
+def read_export(source):
+    """
+    CSV/JSONのエクスポートを読み込む（sourceはファイルパスまたはURL）
+    """
+    name = str(source).lower()
+    if name.endswith('.json'):
+        return pd.read_json(source)
+    # GSC・Ahrefsのエクスポートは区切り文字・文字コードが異なるため自動判定する
+    for encoding in ('utf-8-sig', 'utf-16'):
+        try:
+            return pd.read_csv(source, sep=None, engine='python', encoding=encoding)
+        except (UnicodeError, pd.errors.ParserError):
+            continue
+    raise ValueError(f'unsupported export file: {name}')
+
+
+class FileProvider(MetricsProvider):
+    """
+    GSC・Ahrefs・SEMrushなどのエクスポート（CSV/JSON）から指標を読み込むプロバイダー
+    キーワードの列（Keyword / Query など）を持つファイルはキーワードの指標、
+    ドメインの列（Domain / Target など）を持つファイルはドメインの指標として読み込み、
+    URL列があればドメインごとの順位としても使う。ファイルにない指標はfallbackから補う
+    ファイルは最初の問い合わせで読み込むため、キャッシュで足りる場合は読み込まない
+    sources: ファイルパス・URLのリスト
+    fallback: ファイルにないキーワード・ドメインの指標を返すプロバイダー（Noneの場合はNaN）
+    """
+    batch_size = 100000
+
+    def __init__(self, sources, fallback=None, cache=None, requests_per_second=0):
+        super().__init__(cache=cache, requests_per_second=requests_per_second)
+        self.sources = list(sources)
+        self.fallback = fallback
+        # キャッシュはファイルの組み合わせ（ローカルファイルは更新時刻とサイズも含む）ごとに分ける
+        self.name = f'file:{zlib.crc32(json.dumps([_source_signature(source) for source in self.sources]).encode()):08x}'
+        self._loaded = False
+
+    def close(self):
+        super().close()
+        if self.fallback is not None:
+            self.fallback.close()
+
+    def _load(self):
+        if self._loaded:
+            return
+        keyword_frames, domain_frames = [], []
+        for source in self.sources:
+            try:
+                frame = read_export(source)
+            except (OSError, ValueError) as e:
+                # 読み込めないファイルは使わず、その指標はfallbackで補う
+                print(f"Error reading metrics export {source}: {str(e)}")
+                continue
+            keywords = _rename_columns(frame, KEYWORD_ALIASES)
+            if 'keyword' in keywords:
+                keywords['keyword'] = keywords['keyword'].astype(str).map(normalize_keyword)
+                for column in ('search_volume', 'current_rank', 'difficulty'):
+                    if column in keywords:
+                        keywords[column] = _numeric(keywords[column])
+                if 'date' in keywords:
+                    keywords['date'] = pd.to_datetime(keywords['date'], errors='coerce').dt.normalize()
+                keyword_frames.append(keywords)
+                continue
+            domains = _rename_columns(frame, DOMAIN_ALIASES)
+            if 'domain' in domains:
+                domain_frames.append(domains)
+
+        keywords = pd.concat(keyword_frames, ignore_index=True) if keyword_frames else pd.DataFrame()
+        self.keywords = self._prepare_keywords(keywords)
+        self.history = self._prepare_history(keywords)
+        self.ranks = self._prepare_ranks(keywords)
+        self.domains = self._prepare_domains(domain_frames)
+        self._loaded = True
+
+    @staticmethod
+    def _prepare_keywords(frame):
+        """
+        キーワードごとの指標（同じキーワードが複数行ある場合は最新の日付の行から、最大のボリューム・最良の順位）
+        """
+        columns = ['search_volume', 'current_rank', 'difficulty']
+        if frame.empty:
+            return pd.DataFrame(columns=columns)
+        frame = frame.reindex(columns=['keyword', 'date', *columns])
+        if frame['date'].notna().any():
+            frame = frame[frame['date'].isna() | (frame['date'] == frame.groupby('keyword')['date'].transform('max'))]
+        return frame.groupby('keyword').agg(
+            search_volume=('search_volume', 'max'),
+            current_rank=('current_rank', 'min'),
+            difficulty=('difficulty', 'max')
+        )
+
+    @staticmethod
+    def _prepare_history(frame):
+        """
+        日付列があるエクスポートから、キーワードごとの直近RANK_HISTORY_DAYS日の順位の推移を作成する
+        """
+        if frame.empty or 'date' not in frame or 'current_rank' not in frame:
+            return {}
+        daily = frame.dropna(subset=['date', 'current_rank']).pivot_table(
+            index='keyword', columns='date', values='current_rank', aggfunc='min'
+        )
+        if daily.empty:
+            return {}
+        days = pd.date_range(end=daily.columns.max(), periods=RANK_HISTORY_DAYS, freq='D')
+        # データのない日は前日の順位で補う
+        daily = daily.reindex(columns=days).ffill(axis=1).bfill(axis=1)
+        return {keyword: [int(round(rank)) for rank in row] for keyword, row in zip(daily.index, daily.to_numpy())}
+
+    @staticmethod
+    def _prepare_ranks(frame):
+        """
+        URL列のあるエクスポートから、ドメインとキーワードごとの最良の順位を作成する
+        """
+        if frame.empty or 'url' not in frame or 'current_rank' not in frame:
+            return {}
+        frame = frame.assign(domain=frame['url'].map(lambda url: normalize_domain(url) if isinstance(url, str) else None))
+        best = frame.dropna(subset=['domain', 'current_rank']).groupby(['domain', 'keyword'])['current_rank'].min()
+        return {key: int(rank) for key, rank in best.items()}
+
+    @staticmethod
+    def _prepare_domains(frames):
+        if not frames:
+            return pd.DataFrame(columns=list(DOMAIN_COLUMNS))
+        frame = pd.concat(frames, ignore_index=True)
+        frame['domain'] = frame['domain'].astype(str).map(normalize_domain)
+        for column in DOMAIN_COLUMNS:
+            frame[column] = _numeric(frame[column]) if column in frame else np.nan
+        return frame.groupby('domain')[list(DOMAIN_COLUMNS)].max()
+
+    def _with_fallback(self, keys, known, fallback):
+        """
+        ファイルの指標（NaNは不明）をfallbackの指標に重ねる
+        """
+        result = {}
+        for key, row in zip(keys, known.to_dict(orient='records')):
+            values = dict(fallback.get(key, {}))
+            if values:
+                values['source'] = self.fallback.name
+            found = {column: int(round(value)) for column, value in row.items() if value == value}
+            if found:
+                values.update(found)
+                values['source'] = 'file'
+            if values:
+                result[key] = values
+        return result
+
+    def fetch_keywords(self, keywords):
+        self._load()
+        fallback = self.fallback.fetch_keywords(keywords) if self.fallback else {}
+        result = self._with_fallback(keywords, self.keywords.reindex(keywords), fallback)
+        for keyword, values in result.items():
+            if keyword in self.history:
+                values['rankings'] = self.history[keyword]
+            elif 'rankings' in values and 'current_rank' in values:
+                # ファイルに推移がない場合は、補った推移の最新値を実際の順位に合わせる
+                values['rankings'] = values['rankings'][:-1] + [values['current_rank']]
+        return result
+
+    def fetch_domains(self, domains):
+        self._load()
+        fallback = self.fallback.fetch_domains(domains) if self.fallback else {}
+        return self._with_fallback(domains, self.domains.reindex(domains), fallback)
+
+    def fetch_keyword_ranks(self, domain, keywords):
+        self._load()
+        result = self.fallback.fetch_keyword_ranks(domain, keywords) if self.fallback else {}
+        for keyword in keywords:
+            rank = self.ranks.get((domain, keyword))
+            if rank is not None:
+                result[keyword] = rank
+        return result
+
+
+def _source_signature(source):
+    if isinstance(source, str) and os.path.exists(source):
+        stat = os.stat(source)
+        return [os.path.abspath(source), stat.st_mtime, stat.st_size]
+    return str(source)
+
+
+def normalize_domain(value):
+    """
+    URL・ドメインからwww.を除いたホスト名を取り出す
+    """
+    value = str(value).strip().lower()
+    if '://' in value:
+        value = value.split('://', 1)[1]
+    value = value.split('/', 1)[0].split(':', 1)[0]
+    return value[4:] if value.startswith('www.') else value
+
+
+def create_provider(sources=(), cache_dir=DEFAULT_CACHE_DIR, ttl=DEFAULT_CACHE_TTL, seed=0):
+    """
+    エクスポートファイルの有無に応じてプロバイダーを作成する関数
+    sources: エクスポート（CSV/JSON）のパス・URL（空の場合はスタブのみ）
+    キャッシュの接続を開くため、with文で使うか使い終わったらclose()すること
+    """
+    stub = StubProvider(seed=seed)
+    sources = [source for source in sources if source]
+    if not sources:
+        return stub
+    cache = MetricsCache(cache_dir, ttl) if cache_dir else None
+    return FileProvider(sources, fallback=stub, cache=cache)
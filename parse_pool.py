@@ -0,0 +1,74 @@
+"""
+HTML解析のプロセスプール
+取得側のワーカースレッドが受信した本文（バイト列）を別プロセスでデコード・解析し、
+ページデータと転置インデックスの登録内容を返す（GILに縛られずに複数コアで解析する）。
+子プロセスは起動を速くするため、この軽いモジュールと解析に必要なモジュールだけを読み込む
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from extractor import extract_page
+from search_index import build_index_entry
+
+# 解析待ちの上限（プロセス数に対する倍数）
+BACKLOG_PER_WORKER = 4
+
+
+def decode_body(body, encoding):
+    """
+    本文をデコードする（response.textと同じく、デコードできないバイトは置換文字にする）
+    """
+    return str(body, encoding or 'utf-8', errors='replace')
+
+
+def parse_page(body, encoding, page_url, base_domain):
+    """
+    1ページ分のデコード・特徴抽出・インデックス作成（子プロセスで実行）
+    戻り値: (ページデータ, build_index_entryの結果, 解析秒数)
+    """
+    started = time.perf_counter()
+    page_data = extract_page(decode_body(body, encoding), page_url, base_domain)
+    index_entry = build_index_entry(page_data)
+    return page_data, index_entry, time.perf_counter() - started
+
+
+class ParsePool:
+    """
+    解析用のプロセスプール
+    workers: プロセス数（省略時はCPUコア数）
+    backlog: 解析中・解析待ちのページ数の上限（full()がTrueの間、取得側は新しいリクエストを止める）
+    """
+
+    def __init__(self, workers=None, backlog=None):
+        self.workers = max(1, int(workers or os.cpu_count() or 1))
+        self.backlog = backlog or self.workers * BACKLOG_PER_WORKER
+        # 取得スレッドが動いているプロセスをforkしないよう、spawnで起動する
+        self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                             mp_context=multiprocessing.get_context('spawn'))
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    def full(self):
+        with self._lock:
+            return self._in_flight >= self.backlog
+
+    def submit(self, body, encoding, page_url, base_domain):
+        """
+        解析を依頼する
+        戻り値: parse_pageの結果を返すFuture
+        """
+        with self._lock:
+            self._in_flight += 1
+        future = self._executor.submit(parse_page, body, encoding, page_url, base_domain)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future):
+        with self._lock:
+            self._in_flight -= 1
+
+    def shutdown(self, cancel_futures=False):
+        self._executor.shutdown(wait=True, cancel_futures=cancel_futures)
@@ -0,0 +1,83 @@
+"""
+ホスト単位のレート制限
+クローラーのホストごとの送信間隔・同時接続数と、外部指標のプロバイダーへの問い合わせ間隔で共通に使う
+"""
+import threading
+import time
+
+
+class HostRateLimiter:
+    """
+    ホスト単位のレート制限を行うクラス
+    requests_per_second: ホストごとの最大リクエスト数/秒
+    max_concurrency: ホストごとの最大同時接続数
+    """
+
+    def __init__(self, requests_per_second=10.0, max_concurrency=8):
+        self.min_interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self.max_concurrency = max(1, int(max_concurrency))
+        self._cond = threading.Condition()
+        self._hosts = {}
+
+    def _state(self, host):
+        state = self._hosts.get(host)
+        if state is None:
+            state = {'active': 0, 'next_allowed': 0.0, 'min_interval': self.min_interval}
+            self._hosts[host] = state
+        return state
+
+    def acquire(self, host):
+        """
+        同時接続数と送信間隔の条件を満たすまで待機し、接続枠を確保する
+        """
+        with self._cond:
+            state = self._state(host)
+            while True:
+                now = time.monotonic()
+                if state['active'] < self.max_concurrency and now >= state['next_allowed']:
+                    state['active'] += 1
+                    state['next_allowed'] = now + state['min_interval']
+                    return
+                if state['active'] >= self.max_concurrency:
+                    self._cond.wait()
+                else:
+                    self._cond.wait(state['next_allowed'] - now)
+
+    def try_acquire(self, host):
+        """
+        待たずに接続枠の確保を試みる
+        戻り値: 確保できた場合は0、送信間隔が空くまで待つ必要がある場合はその秒数、同時接続数が上限の場合はNone
+        """
+        with self._cond:
+            state = self._state(host)
+            if state['active'] >= self.max_concurrency:
+                return None
+            now = time.monotonic()
+            if now < state['next_allowed']:
+                return state['next_allowed'] - now
+            state['active'] += 1
+            state['next_allowed'] = now + state['min_interval']
+            return 0
+
+    def release(self, host):
+        with self._cond:
+            state = self._state(host)
+            state['active'] = max(0, state['active'] - 1)
+            self._cond.notify_all()
+
+    def set_min_interval(self, host, seconds):
+        """
+        ホストへの送信間隔を広げる（robots.txtのCrawl-delayなど、全体の設定より短くはしない）
+        """
+        with self._cond:
+            state = self._state(host)
+            state['min_interval'] = max(self.min_interval, seconds)
+
+    def backoff(self, host, seconds):
+        """
+        Retry-After等で指定された秒数だけホストへの送信を停止する
+        """
+        with self._cond:
+            state = self._state(host)
+            state['next_allowed'] = max(state['next_allowed'], time.monotonic() + seconds)
+            self._cond.notify_all()
@@ -0,0 +1,166 @@
+"""
+分析結果の表示用の表・グラフ
+Streamlitに依存せず、分析結果から表示用のDataFrameとPlotlyのグラフを作成する。
+アプリは分析結果のハッシュ（analysis_key）をキーにしてキャッシュし、再実行のたびに作り直さない。
+ページ数が多い場合も、ブラウザに送るデータ量がページ数に比例しないようにする
+（表はページ送り、ヒストグラムは集計済みの値、散布図は間引きとWebGL描画）
+"""
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+# 描画ライブラリ（plotly）は起動を速くするため、グラフを作成する関数の中でインポートする
+
+# 表の1ページあたりの行数
+TABLE_PAGE_SIZE = 100
+# ヒストグラムの区間数
+HISTOGRAM_BINS = 40
+# 散布図に描く最大の点数（超えた分は間引く）
+MAX_SCATTER_POINTS = 20000
+# 散布図をWebGL（scattergl）で描く点数の下限
+WEBGL_POINTS = 1000
+
+
+def analysis_key(results):
+    """
+    分析結果のハッシュ（表・グラフのキャッシュのキー）
+    ページデータ・リンク指標・取得結果・検出結果が同じなら同じ値になる
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for frame in (results['page_frame'], results['link_metrics'], results['instrumentation'].fetch_frame()):
+        digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    digest.update(json.dumps([
+        results['page_issues'], results['duplicates'], results['coverage'], list(results['keyword_analysis']),
+        results['instrumentation'].summary()
+    ], ensure_ascii=False, default=str, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def filter_frame(frame, query):
+    """
+    文字列の列のいずれかにqueryを含む行だけを残す（大文字・小文字を区別しない）
+    """
+    query = (query or '').strip()
+    if not query:
+        return frame
+    mask = np.zeros(len(frame), dtype=bool)
+    for column in frame.columns:
+        if frame[column].dtype == object:
+            mask |= frame[column].astype(str).str.contains(query, case=False, regex=False).to_numpy()
+    return frame.loc[mask]
+
+
+def depth_figure(link_metrics):
+    """
+    クリック深度の分布（棒グラフ）
+    """
+    import plotly.express as px
+
+    depth_counts = link_metrics['click_depth'].value_counts().sort_index()
+    depth_labels = ["到達不可" if depth < 0 else f"{depth}クリック" for depth in depth_counts.index]
+    return px.bar(x=depth_labels, y=depth_counts.to_numpy(), labels={'x': 'トップページからのクリック数', 'y': 'ページ数'})
+
+
+def pagerank_table(link_metrics, count=20):
+    """
+    内部PageRankの上位ページ
+    """
+    ranking = link_metrics.nlargest(count, 'pagerank')
+    return pd.DataFrame({
+        'URL': ranking['url'],
+        # 平均的なページを1.0とした相対値
+        '内部PageRank': (ranking['pagerank'] * len(link_metrics)).round(2),
+        '被リンク数': ranking['inlinks'],
+        '発リンク数': ranking['outlinks'],
+        'クリック深度': ranking['click_depth']
+    })
+
+
+def url_table(urls):
+    return pd.DataFrame({'URL': list(urls)})
+
+
+def issue_tables(page_issues):
+    """
+    ページ別の問題一覧
+    戻り値: (項目ごとの該当ページ数, URLごとの問題（読点区切り）)
+    """
+    summary = pd.DataFrame([
+        {'項目': finding['label'], '該当ページ数': finding['count']} for finding in page_issues
+    ], columns=['項目', '該当ページ数'])
+    urls = [url for finding in page_issues for url in finding['urls']]
+    labels = np.repeat([finding['label'] for finding in page_issues],
+                       [len(finding['urls']) for finding in page_issues])
+    per_url = pd.DataFrame({'URL': urls, '問題': labels}).groupby('URL')['問題'].agg('、'.join)
+    return summary, per_url.reset_index()
+
+
+def histogram_figure(values, label, bins=HISTOGRAM_BINS):
+    """
+    ヒストグラム（区間ごとの件数を集計してから描くため、点数によらずデータ量が一定）
+    """
+    import plotly.express as px
+
+    counts, edges = np.histogram(np.asarray(values, dtype=np.float64), bins=bins)
+    centers = (edges[:-1] + edges[1:]) / 2
+    figure = px.bar(x=centers, y=counts, labels={'x': label, 'y': '件数'})
+    figure.update_traces(width=float(edges[1] - edges[0]) if len(edges) > 1 else None)
+    figure.update_layout(bargap=0)
+    return figure
+
+
+def sample_points(frame, column, max_points=MAX_SCATTER_POINTS):
+    """
+    散布図用に行を間引く（columnの値が大きい上位の行は残し、残りは等間隔に選ぶ）
+    """
+    if len(frame) <= max_points:
+        return frame
+    top = frame.nlargest(max_points // 10, column)
+    rest = frame.drop(top.index)
+    step = max(1, -(-len(rest) // (max_points - len(top))))
+    return pd.concat([top, rest.iloc[::step]])
+
+
+def fetch_views(instrumentation):
+    """
+    診断タブの取得結果の表・グラフ
+    戻り値: {'latency'（取得時間のヒストグラム）, 'parse'（解析時間のヒストグラム、解析したページがなければNone）,
+            'scatter'（取得時間とサイズの散布図）, 'slowest'（取得に時間がかかったURL）, 'sampled'（散布図の点数）}
+    """
+    import plotly.express as px
+
+    fetches = instrumentation.fetch_frame()
+    fetches['latency_ms'] = fetches['latency'] * 1000
+    parsed = fetches.loc[fetches['parse_time'] > 0, 'parse_time'] * 1000
+
+    points = sample_points(fetches, 'latency_ms')
+    scatter = px.scatter(points, x='bytes', y='latency_ms', color=points['status'].astype(str), hover_data=['url'],
+                         labels={'bytes': 'バイト数', 'latency_ms': '取得時間（ms）', 'color': 'ステータス'},
+                         render_mode='webgl' if len(points) > WEBGL_POINTS else 'svg')
+
+    slowest = fetches.nlargest(20, 'latency')
+    return {
+        'latency': histogram_figure(fetches['latency_ms'], '取得時間（ms）'),
+        'parse': histogram_figure(parsed, '解析時間（ms）') if len(parsed) else None,
+        'scatter': scatter,
+        'sampled': len(points),
+        'slowest': pd.DataFrame({
+            'URL': slowest['url'],
+            'ステータス': slowest['status'],
+            '取得時間(ms)': (slowest['latency'] * 1000).round(1),
+            '応答待ち(ms)': (slowest['wait'] * 1000).round(1),
+            'ダウンロード(ms)': (slowest['download'] * 1000).round(1),
+            'バイト数': slowest['bytes'],
+            '解析時間(ms)': (slowest['parse_time'] * 1000).round(2)
+        })
+    }
+
+
+def metrics_exports(instrumentation):
+    """
+    計測結果の書き出し用の文字列
+    戻り値: (JSON, Prometheusのテキスト形式)
+    """
+    return json.dumps(instrumentation.to_json(), ensure_ascii=False), instrumentation.to_prometheus()
@@ -0,0 +1,131 @@
+"""
+robots.txtの取得と解析
+クロール対象ホストのrobots.txtを取得して、URLごとのクロール可否（Allow/Disallow、ワイルドカード対応）、
+Crawl-delay、Sitemap行を返す
+"""
+import re
+from urllib.parse import urlparse
+
+# robots.txtのグループを選ぶときのUser-Agent（*のグループに従う）
+ROBOTS_USER_AGENT = '*'
+
+
+def _compile_pattern(path):
+    """
+    Allow/Disallowのパスをマッチング用の正規表現に変換する（*は任意の文字列、末尾の$は終端）
+    """
+    anchored = path.endswith('$')
+    if anchored:
+        path = path[:-1]
+    pattern = '.*'.join(re.escape(part) for part in path.split('*'))
+    return re.compile(pattern + ('$' if anchored else ''))
+
+
+class RobotsRules:
+    """
+    1ホスト分のrobots.txtのルール
+    found: robots.txtが存在したか
+    """
+
+    def __init__(self, rules=(), crawl_delay=None, sitemaps=(), found=False, disallow_all=False):
+        # (パスの長さ, 許可するか, 正規表現) を長い順に保持する
+        self.rules = sorted(
+            ((len(path), allow, _compile_pattern(path)) for allow, path in rules),
+            key=lambda rule: (-rule[0], not rule[1])
+        )
+        self.crawl_delay = crawl_delay
+        self.sitemaps = list(sitemaps)
+        self.found = found
+        self.disallow_all = disallow_all
+
+    def allowed(self, url):
+        """
+        URLをクロールしてよいか（最も長く一致したルールを優先し、同じ長さではAllowを優先）
+        """
+        if self.disallow_all:
+            return False
+        parsed = urlparse(url)
+        path = parsed.path or '/'
+        if parsed.query:
+            path += '?' + parsed.query
+        for _, allow, pattern in self.rules:
+            if pattern.match(path):
+                return allow
+        return True
+
+
+def parse_robots(text, user_agent=ROBOTS_USER_AGENT):
+    """
+    robots.txtを解析し、指定したUser-Agentに適用されるルールを返す
+    （名前が一致するグループがなければ*のグループを使う）
+    """
+    agent_token = user_agent.split('/')[0].lower()
+    groups = []
+    sitemaps = []
+    current = None
+    in_agent_lines = False
+
+    for line in text.splitlines():
+        line = line.split('#', 1)[0].strip()
+        if ':' not in line:
+            continue
+        field, value = line.split(':', 1)
+        field = field.strip().lower()
+        value = value.strip()
+
+        if field == 'user-agent':
+            # 連続したUser-agent行は同じグループに属する
+            if not in_agent_lines:
+                current = {'agents': [], 'rules': [], 'crawl_delay': None}
+                groups.append(current)
+            current['agents'].append(value.lower())
+            in_agent_lines = True
+            continue
+
+        if field == 'sitemap':
+            if value:
+                sitemaps.append(value)
+            continue
+
+        in_agent_lines = False
+        if current is None:
+            continue
+        if field in ('allow', 'disallow') and value:
+            current['rules'].append((field == 'allow', value))
+        elif field == 'crawl-delay':
+            try:
+                current['crawl_delay'] = float(value)
+            except ValueError:
+                pass
+
+    matched = [group for group in groups
+               if agent_token != '*' and any(agent != '*' and agent in agent_token for agent in group['agents'])]
+    if not matched:
+        matched = [group for group in groups if '*' in group['agents']]
+
+    rules = [rule for group in matched for rule in group['rules']]
+    delays = [group['crawl_delay'] for group in matched if group['crawl_delay'] is not None]
+    return RobotsRules(rules, crawl_delay=max(delays) if delays else None, sitemaps=sitemaps, found=True)
+
+
+def robots_url(url):
+    parsed = urlparse(url)
+    return f'{parsed.scheme}://{parsed.netloc}/robots.txt'
+
+
+def fetch_robots(client, url, timeout=10, user_agent=ROBOTS_USER_AGENT):
+    """
+    URLのホストのrobots.txtを取得して解析する（HttpClientの条件付きGETキャッシュを利用）
+    404などの4xxはすべて許可、5xxや接続エラーはすべて禁止として扱う（RFC 9309）
+    """
+    try:
+        response = client.get(robots_url(url), timeout=timeout)
+    except Exception as e:
+        print(f"Error fetching robots.txt for {url}: {e}")
+        return RobotsRules(disallow_all=True)
+
+    if response.status_code == 200:
+        return parse_robots(response.text, user_agent)
+    if 400 <= response.status_code < 500:
+        return RobotsRules()
+    return RobotsRules(disallow_all=True)
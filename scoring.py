@@ -0,0 +1,190 @@
+"""
+SEOスコア計算（列指向・ベクトル化）
+ページデータを列指向のDataFrameに変換し、コンテンツ・内部・外部・総合スコアを
+ページごとのループではなく列演算でまとめて計算する
+"""
+import numpy as np
+import pandas as pd
+
+# ページテーブルの列（internal_linksのようなリスト列は含めない）
+PAGE_COLUMNS = [
+    'url', 'title', 'h1', 'meta_description', 'meta_keywords', 'word_count',
+    'image_count', 'images_with_alt', 'h2_count', 'h3_count', 'internal_links_count', 'canonical'
+]
+TEXT_COLUMNS = ['url', 'title', 'h1', 'meta_description', 'meta_keywords', 'canonical']
+
+# スコアの重み
+CONTENT_WEIGHT = 0.4
+INTERNAL_WEIGHT = 0.3
+EXTERNAL_WEIGHT = 0.3
+
+
+def build_page_frame(pages_data, columns=PAGE_COLUMNS):
+    """
+    ページデータ（リストまたはStoredPages）を列指向のDataFrameに変換する関数
+    レコードを1件ずつ読み込み、必要な列だけを保持する
+    """
+    if isinstance(pages_data, pd.DataFrame):
+        return pages_data
+
+    values = {column: [] for column in columns}
+    for page in pages_data:
+        for column in columns:
+            values[column].append(page.get(column))
+
+    frame = pd.DataFrame(values, columns=columns)
+    for column in columns:
+        if column in TEXT_COLUMNS:
+            frame[column] = frame[column].fillna('').astype(str)
+        else:
+            frame[column] = frame[column].fillna(0).astype(np.int64)
+    return frame
+
+
+def url_paths(urls):
+    """
+    URL列からパス部分を取り出す（urllib.parse.urlparse(url).pathと同じ結果）
+    """
+    paths = urls.str.replace(r'^[A-Za-z][A-Za-z0-9+.\-]*://[^/?#]*', '', regex=True)
+    paths = paths.str.replace(r'[?#].*$', '', regex=True)
+    # 最後のセグメントの;パラメータはurlparseと同様にパスから除く
+    return paths.str.replace(r';[^/]*$', '', regex=True)
+
+
+def simple_url_mask(urls):
+    """
+    シンプルで読みやすいURLかどうか（階層が浅く、10桁以上の数字を含まない）
+    """
+    paths = url_paths(urls)
+    return (paths.str.count('/') <= 2) & ~paths.str.contains(r'\d{10,}', regex=True)
+
+
+def calculate_page_speed_scores(word_count, image_count, jitter):
+    """
+    シンプルなページスピードスコア計算（実際のツールではPageSpeed Insights APIを使用）
+    jitter: ページごとのばらつき（-5〜5）
+    """
+    word_count = np.asarray(word_count, dtype=np.int64)
+    image_count = np.asarray(image_count, dtype=np.int64)
+
+    score = np.full(len(word_count), 100, dtype=np.int64)
+    # 文字数が多すぎる場合は減点
+    score -= np.where(word_count > 3000, np.minimum(20, (word_count - 3000) // 500), 0)
+    # 画像が多すぎる場合は減点
+    score -= np.where(image_count > 10, np.minimum(15, (image_count - 10) * 2), 0)
+    score += np.asarray(jitter, dtype=np.int64)
+    return np.clip(score, 0, 100)
+
+
+def draw_random_components(n, random_state=None):
+    """
+    スコア計算のランダム要素（ページスピードのばらつき、外部SEOスコアのモック）を生成する
+    random_state: シード値またはnp.random.RandomState（Noneの場合はnp.randomのグローバル状態）
+    """
+    if random_state is None:
+        randint = np.random.randint
+    elif isinstance(random_state, np.random.RandomState):
+        randint = random_state.randint
+    else:
+        randint = np.random.RandomState(random_state).randint
+
+    # 従来のページごとのループと同じ順序（ページスピード・外部SEOスコアを交互）で乱数を引くため、
+    # 範囲を列ごとに指定して(n, 2)の配列を1回で生成する（同じシード値なら従来と同じ結果になる）
+    draws = randint([-5, 60], [6, 90], size=(n, 2))
+    return draws[:, 0], draws[:, 1]
+
+
+def score_frame(frame, speed_jitter, external_scores, link_metrics=None):
+    """
+    ページテーブルからスコア列を計算する関数
+    link_metrics: LinkGraph.page_metricsの結果（ページテーブルと同じ順序）
+                  指定した場合、内部リンクは発リンク数・被リンク数・クリック深度で評価する
+    戻り値: content / internal / external / total列を持つDataFrame
+    """
+    title_len = frame['title'].str.len()
+    meta_len = frame['meta_description'].str.len()
+    word_count = frame['word_count'].to_numpy()
+    image_count = frame['image_count'].to_numpy()
+    images_with_alt = frame['images_with_alt'].to_numpy()
+    h2_count = frame['h2_count'].to_numpy()
+    h3_count = frame['h3_count'].to_numpy()
+    links = frame['internal_links_count'].to_numpy()
+
+    # コンテンツスコア計算
+    content = np.zeros(len(frame), dtype=np.int64)
+
+    # タイトルの評価
+    content += np.select([(title_len > 10) & (title_len < 70), title_len > 0], [20, 10], 0)
+
+    # メタディスクリプションの評価
+    content += np.select([(meta_len >= 70) & (meta_len <= 160), meta_len > 0], [20, 10], 0)
+
+    # H1タグの評価
+    content += np.where((frame['h1'].str.len() > 0) & (frame['h1'] != "No H1"), 15, 0)
+
+    # コンテンツ量の評価
+    content += np.select([word_count >= 1500, word_count >= 800, word_count >= 400], [20, 15, 10], 5)
+
+    # 見出し構造の評価
+    content += np.select([(h2_count > 0) & (h3_count > 0), h2_count > 0], [15, 10], 0)
+
+    # 画像のalt属性評価
+    alt_ratio = np.divide(images_with_alt, image_count, out=np.zeros(len(frame)), where=image_count > 0)
+    content += np.select([(image_count > 0) & (alt_ratio >= 0.8), (image_count > 0) & (images_with_alt > 0)], [10, 5], 0)
+
+    # 内部SEOスコア計算
+    internal = np.zeros(len(frame), dtype=np.int64)
+
+    # 内部リンク数の評価
+    if link_metrics is None:
+        internal += np.select([links >= 10, links >= 5, links > 0], [30, 20, 10], 0)
+    else:
+        inlinks = link_metrics['inlinks'].to_numpy()
+        depth = link_metrics['click_depth'].to_numpy()
+        internal += np.select([links >= 10, links >= 5, links > 0], [10, 7, 4], 0)
+        # 被リンク数の評価（孤立ページは0点）
+        internal += np.select([inlinks >= 5, inlinks >= 2, inlinks > 0], [10, 7, 4], 0)
+        # クリック深度の評価（トップページから到達できないページは0点）
+        internal += np.select([(depth >= 0) & (depth <= 1), (depth >= 0) & (depth <= 3), depth >= 0], [10, 7, 4], 0)
+
+    # ページスピードの評価（モック）
+    page_speed = calculate_page_speed_scores(word_count, image_count, speed_jitter)
+    internal += np.select([page_speed >= 90, page_speed >= 70, page_speed >= 50], [30, 20, 10], 0)
+
+    # URLの評価（シンプルで読みやすいか）
+    internal += np.where(simple_url_mask(frame['url']), 20, 10)
+
+    # SSL対応評価
+    internal += np.where(frame['url'].str.startswith('https://'), 20, 0)
+
+    # 外部SEOスコア（APIがないためモックデータ）
+    external = np.asarray(external_scores, dtype=np.int64)
+
+    # 総合スコアの計算
+    total = (content * CONTENT_WEIGHT + internal * INTERNAL_WEIGHT + external * EXTERNAL_WEIGHT).astype(np.int64)
+
+    return pd.DataFrame({
+        'content': content,
+        'internal': internal,
+        'external': external,
+        'total': total
+    }, index=frame.index)
+
+
+def calculate_seo_scores(pages_data, random_state=None, link_metrics=None):
+    """
+    各ページのSEOスコアを計算する関数
+    pages_data: ページデータ（リスト・StoredPages・build_page_frameのDataFrame）
+    random_state: シード値を指定するとランダム要素を含めて結果を再現できる
+    link_metrics: LinkGraph.page_metricsの結果（内部リンク構造をスコアに反映する）
+    """
+    frame = build_page_frame(pages_data)
+    speed_jitter, external_scores = draw_random_components(len(frame), random_state)
+    scores = score_frame(frame, speed_jitter, external_scores, link_metrics)
+
+    return {
+        "content": scores['content'].tolist(),
+        "internal": scores['internal'].tolist(),
+        "external": scores['external'].tolist(),
+        "total": scores['total'].tolist()
+    }
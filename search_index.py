@@ -0,0 +1,263 @@
+"""
+転置インデックスとBM25関連度
+クロール中にページごとの語の出現回数（タイトル・見出し・本文）をクロールストアに保存し、
+「キーワードXに最も関連するページ」「ページYがカバーするキーワード」をインデックス参照で求める
+"""
+import math
+import re
+import sqlite3
+from collections import Counter
+
+from keyword_matcher import CJK_CHARS, normalize_text
+
+# 日本語は連続部分を文字bigramに分割し、それ以外は単語単位で索引する
+TERM_PATTERN = re.compile(f'[{CJK_CHARS}]+|[^\\W{CJK_CHARS}]+')
+CJK_RUN_PATTERN = re.compile(f'[{CJK_CHARS}]+')
+
+# フィールドごとの重み（BM25F）
+FIELD_BOOSTS = {
+    'title': 3.0,
+    'headings': 2.0,
+    'body_text': 1.0
+}
+INDEX_FIELDS = tuple(FIELD_BOOSTS)
+
+# BM25のパラメータ
+K1 = 1.2
+B = 0.75
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS index_docs (
+    crawl_id TEXT,
+    seq INTEGER,
+    url TEXT,
+    title TEXT,
+    title_len INTEGER,
+    headings_len INTEGER,
+    body_text_len INTEGER,
+    PRIMARY KEY (crawl_id, seq)
+);
+CREATE TABLE IF NOT EXISTS postings (
+    crawl_id TEXT,
+    term TEXT,
+    seq INTEGER,
+    title_tf INTEGER,
+    headings_tf INTEGER,
+    body_text_tf INTEGER,
+    PRIMARY KEY (crawl_id, term, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS index_docs_url ON index_docs (crawl_id, url);
+"""
+
+
+def tokenize(text):
+    """
+    テキストを索引語に分割する（日本語は文字bigram、英数字は単語）
+    """
+    terms = []
+    for run in TERM_PATTERN.findall(normalize_text(text)):
+        if CJK_RUN_PATTERN.fullmatch(run):
+            if len(run) == 1:
+                terms.append(run)
+            else:
+                terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            terms.append(run)
+    return terms
+
+
+def build_index_entry(page_data):
+    """
+    ページデータからインデックスに登録する内容を作成する
+    戻り値: {'url', 'title', 'lengths': {フィールド: 語数}, 'postings': {語: (title_tf, headings_tf, body_text_tf)}}
+    """
+    lengths = {}
+    field_counts = {}
+    for field in INDEX_FIELDS:
+        text = page_data.get(field) or ""
+        if field == 'title' and text == "No Title":
+            text = ""
+        terms = tokenize(text)
+        lengths[field] = len(terms)
+        field_counts[field] = Counter(terms)
+
+    postings = {}
+    for field_index, field in enumerate(INDEX_FIELDS):
+        for term, tf in field_counts[field].items():
+            entry = postings.setdefault(term, [0] * len(INDEX_FIELDS))
+            entry[field_index] = tf
+
+    return {
+        'url': page_data['url'],
+        'title': page_data.get('title', ''),
+        'lengths': lengths,
+        'postings': {term: tuple(tfs) for term, tfs in postings.items()}
+    }
+
+
+def write_index_entry(conn, crawl_id, seq, entry):
+    """
+    インデックス内容を書き込む（呼び出し側のトランザクション内で実行する）
+    """
+    lengths = entry['lengths']
+    conn.execute(
+        "INSERT OR REPLACE INTO index_docs VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (crawl_id, seq, entry['url'], entry['title'],
+         lengths['title'], lengths['headings'], lengths['body_text'])
+    )
+    conn.executemany(
+        "INSERT OR REPLACE INTO postings VALUES (?, ?, ?, ?, ?, ?)",
+        [(crawl_id, term, seq, *tfs) for term, tfs in entry['postings'].items()]
+    )
+
+
+class SearchIndex:
+    """
+    クロールストアに保存された転置インデックスを検索するクラス
+    """
+
+    def __init__(self, path, crawl_id):
+        self.path = path
+        self.crawl_id = crawl_id
+        self._conn = sqlite3.connect(path, timeout=30)
+        self._conn.executescript(INDEX_SCHEMA)
+        self._stats = None
+        self._dfs = {}
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def stats(self):
+        """
+        文書数と各フィールドの平均語数
+        """
+        if self._stats is None:
+            row = self._conn.execute(
+                "SELECT COUNT(*), AVG(title_len), AVG(headings_len), AVG(body_text_len) "
+                "FROM index_docs WHERE crawl_id = ?",
+                (self.crawl_id,)
+            ).fetchone()
+            self._stats = {
+                'doc_count': row[0],
+                'avg_lengths': dict(zip(INDEX_FIELDS, (value or 0.0 for value in row[1:])))
+            }
+        return self._stats
+
+    def document_frequencies(self, terms):
+        """
+        語ごとの文書頻度（読み込んだ語はインスタンスに保持し、同じ語は再び数えない）
+        戻り値: {語: 文書数}
+        """
+        missing = [term for term in set(terms) if term not in self._dfs]
+        if missing:
+            # 語ごとの件数は主キーの範囲のCOUNT(*)で数える（GROUP BYで集計するより速い）
+            self._dfs.update(self._conn.execute(
+                "SELECT t.column1, (SELECT COUNT(*) FROM postings p WHERE p.crawl_id = ? AND p.term = t.column1) "
+                f"FROM (VALUES {', '.join(['(?)'] * len(missing))}) t",
+                (self.crawl_id, *missing)
+            ).fetchall())
+        return {term: self._dfs[term] for term in terms}
+
+    def _term_postings(self, terms):
+        """
+        複数の語の転置リストを1回のSQLでまとめて読み込む
+        戻り値: [(語, 発見順, URL, タイトル, フィールドごとのtf（3つ）, フィールドごとの語数（3つ）), ...]
+        """
+        terms = list(terms)
+        if not terms:
+            return []
+        return self._conn.execute(
+            "SELECT p.term, p.seq, d.url, d.title, p.title_tf, p.headings_tf, p.body_text_tf, "
+            "d.title_len, d.headings_len, d.body_text_len "
+            "FROM postings p JOIN index_docs d ON d.crawl_id = p.crawl_id AND d.seq = p.seq "
+            f"WHERE p.crawl_id = ? AND p.term IN ({', '.join('?' * len(terms))})",
+            (self.crawl_id, *terms)
+        ).fetchall()
+
+    def _term_weight(self, tfs, lengths, avg_lengths):
+        """
+        BM25Fの語の重み（フィールドごとに長さで正規化したtfを重み付きで合算）
+        """
+        weighted_tf = 0.0
+        for field, tf, length in zip(INDEX_FIELDS, tfs, lengths):
+            if not tf:
+                continue
+            avg_length = avg_lengths[field] or 1.0
+            weighted_tf += FIELD_BOOSTS[field] * tf / (1 - B + B * length / avg_length)
+        return weighted_tf / (K1 + weighted_tf)
+
+    def search(self, query, limit=10):
+        """
+        クエリに関連するページをBM25のスコア順に返す
+        戻り値: [{'url', 'title', 'score', 'matched_terms'}, ...]
+        """
+        stats = self.stats()
+        doc_count = stats['doc_count']
+        if doc_count == 0:
+            return []
+
+        postings = {}
+        for term, *posting in self._term_postings(set(tokenize(query))):
+            postings.setdefault(term, []).append(posting)
+
+        scores = {}
+        for term_postings in postings.values():
+            df = len(term_postings)
+            idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+            for seq, url, title, *values in term_postings:
+                tfs, lengths = values[:3], values[3:]
+                result = scores.setdefault(seq, {'url': url, 'title': title, 'score': 0.0, 'matched_terms': 0})
+                result['score'] += idf * self._term_weight(tfs, lengths, stats['avg_lengths'])
+                result['matched_terms'] += 1
+
+        ranked = sorted(scores.values(), key=lambda result: result['score'], reverse=True)[:limit]
+        for result in ranked:
+            result['score'] = round(result['score'], 3)
+        return ranked
+
+    def keywords_for_page(self, url, keywords):
+        """
+        指定したページがカバーしているキーワードを関連度順に返す
+        戻り値: [(キーワード, スコア), ...]（スコアが0のキーワードは含まない）
+        """
+        row = self._conn.execute(
+            "SELECT seq, title_len, headings_len, body_text_len FROM index_docs WHERE crawl_id = ? AND url = ?",
+            (self.crawl_id, url)
+        ).fetchone()
+        if row is None:
+            return []
+        seq, lengths = row[0], row[1:]
+
+        # 全キーワードの語の文書頻度と、このページでのtfをそれぞれ1回のSQLでまとめて求める
+        keyword_terms = {keyword: set(tokenize(keyword)) for keyword in keywords}
+        terms = sorted(set().union(*keyword_terms.values())) if keyword_terms else []
+        if not terms:
+            return []
+        placeholders = ', '.join('?' * len(terms))
+        postings = self._conn.execute(
+            "SELECT term, title_tf, headings_tf, body_text_tf FROM postings "
+            f"WHERE crawl_id = ? AND seq = ? AND term IN ({placeholders})",
+            (self.crawl_id, seq, *terms)
+        ).fetchall()
+        dfs = self.document_frequencies([posting[0] for posting in postings])
+
+        stats = self.stats()
+        weights = {}
+        for term, *tfs in postings:
+            df = dfs[term]
+            idf = math.log(1 + (stats['doc_count'] - df + 0.5) / (df + 0.5))
+            weights[term] = idf * self._term_weight(tfs, lengths, stats['avg_lengths'])
+
+        covered = []
+        for keyword, terms in keyword_terms.items():
+            score = sum(weights.get(term, 0.0) for term in terms)
+            if score > 0:
+                covered.append((keyword, round(score, 3)))
+
+        return sorted(covered, key=lambda item: item[1], reverse=True)
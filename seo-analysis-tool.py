@@ -1,33 +1,21 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import requests
-from bs4 import BeautifulSoup
-import re
-import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
-import json
-import time
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
-from urllib.parse import urlparse, urljoin
 import ssl
+import time
+from contextlib import contextmanager
+
+from crawl_store import StoredPages, DEFAULT_STORE_PATH
+from instrumentation import Instrumentation
+from metrics_provider import create_provider
+import report_views
+import seo_pipeline
+
+# 描画ライブラリ（plotly等）は起動を速くするため、使用するタブの中でインポートする
 
 # SSL証明書の検証をバイパス（安全でないサイトもクロールできるように）
 ssl._create_default_https_context = ssl._create_unverified_context
 
-# NLTKのデータをダウンロード
-try:
-    nltk.data.find('tokenizers/punkt')
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('punkt')
-    nltk.download('stopwords')
-
 # Streamlitの設定
 st.set_page_config(
     page_title="SEO分析・改善自動化ツール",
@@ -52,419 +40,106 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# キャッシュを利用したWebページのクローリング機能
-@st.cache_data(ttl=3600)
-def crawl_website(url, max_pages=10):
+# 完了したクロール結果を再利用する期間（秒）
+CRAWL_REUSE_SECONDS = 3600
+
+# キャッシュする表・グラフの数（分析結果のハッシュと名前ごと）
+VIEW_CACHE_ENTRIES = 64
+
+@st.cache_data(max_entries=VIEW_CACHE_ENTRIES, show_spinner=False)
+def cached_view(analysis_key, name, _build, _args=()):
     """
-    指定されたURLからページをクロールし、メタデータを収集する関数
-    max_pages: クロールする最大ページ数
+    表・グラフを分析結果のハッシュと名前ごとにキャッシュする（ウィジェットの操作で再実行されても作り直さない）
+    _build, _args: 作成する関数と引数（キャッシュのキーには含めない）
     """
-    try:
-        if not url.startswith(('http://', 'https://')):
-            url = 'https://' + url
-            
-        visited_urls = set()
-        to_visit = [url]
-        pages_data = []
-        
-        # User-Agent設定
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        base_domain = urlparse(url).netloc
-        
-        while to_visit and len(visited_urls) < max_pages:
-            current_url = to_visit.pop(0)
-            
-            if current_url in visited_urls:
-                continue
-                
-            try:
-                response = requests.get(current_url, headers=headers, timeout=10)
-                visited_urls.add(current_url)
-                
-                if response.status_code != 200:
-                    continue
-                    
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # ページデータ収集
-                title = soup.title.string.strip() if soup.title else "No Title"
-                
-                # H1タグ
-                h1_tag = soup.find('h1')
-                h1_text = h1_tag.get_text().strip() if h1_tag else "No H1"
-                
-                # メタディスクリプション
-                meta_desc_tag = soup.find('meta', attrs={'name': 'description'})
-                meta_desc = meta_desc_tag['content'].strip() if meta_desc_tag and 'content' in meta_desc_tag.attrs else "No Meta Description"
-                
-                # キーワード
-                meta_keywords_tag = soup.find('meta', attrs={'name': 'keywords'})
-                meta_keywords = meta_keywords_tag['content'].strip() if meta_keywords_tag and 'content' in meta_keywords_tag.attrs else ""
-                
-                # コンテンツテキスト
-                body_text = soup.body.get_text(" ", strip=True) if soup.body else ""
-                word_count = len(body_text.split())
-                
-                # 画像数とalt属性
-                images = soup.find_all('img')
-                img_count = len(images)
-                img_with_alt = sum(1 for img in images if img.get('alt'))
-                
-                # H2, H3タグの数
-                h2_count = len(soup.find_all('h2'))
-                h3_count = len(soup.find_all('h3'))
-                
-                # 内部リンク収集
-                internal_links = []
-                for link in soup.find_all('a', href=True):
-                    href = link['href']
-                    # 相対URLを絶対URLに変換
-                    if not href.startswith(('http://', 'https://')):
-                        href = urljoin(current_url, href)
-                    
-                    # 同じドメイン内のリンクのみ追加
-                    if urlparse(href).netloc == base_domain:
-                        internal_links.append(href)
-                        if href not in visited_urls and href not in to_visit:
-                            to_visit.append(href)
-                
-                # ページデータを保存
-                page_data = {
-                    'url': current_url,
-                    'title': title,
-                    'h1': h1_text,
-                    'meta_description': meta_desc,
-                    'meta_keywords': meta_keywords,
-                    'word_count': word_count,
-                    'image_count': img_count,
-                    'images_with_alt': img_with_alt,
-                    'h2_count': h2_count,
-                    'h3_count': h3_count,
-                    'internal_links_count': len(set(internal_links)),
-                    'internal_links': list(set(internal_links))
-                }
-                
-                pages_data.append(page_data)
-                
-                # スクレイピングの速度制限（サーバーに負荷をかけないため）
-                time.sleep(1)
-                
-            except Exception as e:
-                print(f"Error crawling {current_url}: {e}")
-                continue
-        
-        return pages_data
-    
-    except Exception as e:
-        print(f"Error in crawl_website: {e}")
-        return []
+    return _build(*_args)
 
-# ページスピード計算関数
-def calculate_page_speed_score(word_count, img_count):
+def page_selector(total, key, page_size=report_views.TABLE_PAGE_SIZE):
     """
-    シンプルなページスピードスコア計算（実際のツールではPageSpeed Insights APIを使用）
+    ページ送りの入力欄（1ページに収まる場合は表示しない）
+    戻り値: 表示する範囲（開始, 終了）
     """
-    base_score = 100
-    
-    # 文字数が多すぎる場合は減点
-    if word_count > 3000:
-        base_score -= min(20, (word_count - 3000) // 500)
-        
-    # 画像が多すぎる場合は減点
-    if img_count > 10:
-        base_score -= min(15, (img_count - 10) * 2)
-    
-    # ランダム要素を加える（実際のAPIと同様にバラつきを持たせる）
-    base_score += np.random.randint(-5, 6)
-    
-    return max(0, min(100, base_score))
+    if total <= page_size:
+        return 0, total
+    page_count = -(-total // page_size)
+    page = st.number_input(f"ページ（全{page_count}ページ）", min_value=1, value=1, step=1, key=key)
+    start = (min(int(page), page_count) - 1) * page_size
+    stop = min(start + page_size, total)
+    st.caption(f"{total}件中 {start + 1}〜{stop}件を表示")
+    return start, stop
 
-# SEOスコア計算関数
-def calculate_seo_scores(pages_data):
+def paged_table(frame, key, page_size=report_views.TABLE_PAGE_SIZE):
     """
-    各ページのSEOスコアを計算する関数
+    絞り込みとページ送りのある表（表示する1ページ分だけをブラウザに送る）
     """
-    seo_scores = {
-        "content": [],
-        "internal": [],
-        "external": [],
-        "total": []
-    }
-    
-    for page in pages_data:
-        # コンテンツスコア計算
-        content_score = 0
-        
-        # タイトルの評価
-        if page['title'] and len(page['title']) > 10 and len(page['title']) < 70:
-            content_score += 20
-        elif page['title']:
-            content_score += 10
-            
-        # メタディスクリプションの評価
-        if page['meta_description'] and 70 <= len(page['meta_description']) <= 160:
-            content_score += 20
-        elif page['meta_description']:
-            content_score += 10
-            
-        # H1タグの評価
-        if page['h1'] and page['h1'] != "No H1":
-            content_score += 15
-            
-        # コンテンツ量の評価
-        if page['word_count'] >= 1500:
-            content_score += 20
-        elif page['word_count'] >= 800:
-            content_score += 15
-        elif page['word_count'] >= 400:
-            content_score += 10
-        else:
-            content_score += 5
-            
-        # 見出し構造の評価
-        if page['h2_count'] > 0 and page['h3_count'] > 0:
-            content_score += 15
-        elif page['h2_count'] > 0:
-            content_score += 10
-            
-        # 画像のalt属性評価
-        if page['image_count'] > 0 and page['images_with_alt'] / page['image_count'] >= 0.8:
-            content_score += 10
-        elif page['image_count'] > 0 and page['images_with_alt'] > 0:
-            content_score += 5
-        
-        # 内部SEOスコア計算
-        internal_score = 0
-        
-        # 内部リンク数の評価
-        if page['internal_links_count'] >= 10:
-            internal_score += 30
-        elif page['internal_links_count'] >= 5:
-            internal_score += 20
-        elif page['internal_links_count'] > 0:
-            internal_score += 10
-            
-        # ページスピードの評価（モック）
-        page_speed = calculate_page_speed_score(page['word_count'], page['image_count'])
-        if page_speed >= 90:
-            internal_score += 30
-        elif page_speed >= 70:
-            internal_score += 20
-        elif page_speed >= 50:
-            internal_score += 10
-        
-        # URLの評価（シンプルで読みやすいか）
-        url_path = urlparse(page['url']).path
-        if len(url_path.split('/')) <= 3 and not re.search(r'\d{10,}', url_path):
-            internal_score += 20
-        else:
-            internal_score += 10
-            
-        # SSL対応評価
-        if page['url'].startswith('https://'):
-            internal_score += 20
-            
-        # 外部SEOスコア（APIがないためモックデータ）
-        external_score = np.random.randint(60, 90)
-        
-        # 総合スコアの計算
-        total_score = int(content_score * 0.4 + internal_score * 0.3 + external_score * 0.3)
-        
-        # スコアを保存
-        seo_scores["content"].append(content_score)
-        seo_scores["internal"].append(internal_score)
-        seo_scores["external"].append(external_score)
-        seo_scores["total"].append(total_score)
-    
-    return seo_scores
+    if len(frame) > page_size:
+        query = st.text_input("絞り込み", key=f"{key}_query", placeholder="URLなどの一部を入力")
+        frame = report_views.filter_frame(frame, query)
+    start, stop = page_selector(len(frame), f"{key}_page", page_size)
+    st.dataframe(frame.iloc[start:stop], hide_index=True)
 
-# キーワード分析関数
-def analyze_keywords(pages_data, keywords):
+def lazy_tabs(labels):
     """
-    キーワードの出現頻度と関連性を分析する関数
+    選択中のタブの内容だけを実行するタブ（タブを切り替えると再実行する。未対応のStreamlitではすべてのタブを描画する）
     """
-    keyword_analysis = {}
-    
-    for keyword in keywords:
-        keyword_lower = keyword.lower()
-        matches = []
-        
-        for page in pages_data:
-            content = f"{page['title']} {page['meta_description']} {page['h1']}".lower()
-            
-            # キーワードの出現回数
-            count = content.count(keyword_lower)
-            
-            # より詳細なコンテンツ分析（実際にはもっと複雑なアルゴリズム）
-            if count > 0:
-                matches.append({
-                    'url': page['url'],
-                    'title': page['title'],
-                    'count': count,
-                    'density': round(count / max(1, len(content.split())) * 100, 2)
-                })
-        
-        # 検索順位と検索ボリュームのモックデータ
-        search_volume = np.random.randint(100, 10000)
-        current_rank = np.random.randint(1, 100)
-        
-        # 30日間の推移データを生成
-        dates = [(datetime.now() - timedelta(days=i)).strftime('%Y-%m-%d') for i in range(30, 0, -1)]
-        base_rank = current_rank + np.random.randint(0, 20)  # 最初の順位は現在より少し悪い
-        rankings = []
-        
-        for i in range(len(dates)):
-            # 徐々に改善していく傾向（ランダム要素あり）
-            improvement = (i / len(dates)) * np.random.randint(5, 20)
-            rank = max(1, int(base_rank - improvement + np.random.randint(-3, 4)))
-            rankings.append(rank)
-        
-        # 最新の順位が現在の順位と一致するように調整
-        rankings[-1] = current_rank
-        
-        keyword_analysis[keyword] = {
-            'matches': matches,
-            'search_volume': search_volume,
-            'current_rank': current_rank,
-            'rankings': rankings,
-            'dates': dates,
-            'difficulty': np.random.randint(20, 80)
-        }
-    
-    return keyword_analysis
+    try:
+        return st.tabs(labels, key="active_tab", on_change="rerun")
+    except TypeError:
+        return st.tabs(labels)
 
-# 改善提案生成関数
-def generate_improvements(pages_data, keyword_analysis):
+def tab_open(tab):
     """
-    分析結果に基づいて改善提案を生成する関数
+    タブを描画するか（選択状態がわからない場合は描画する）
     """
-    improvements = {
-        "content": [],
-        "internal": [],
-        "external": [],
-        "technical": []
-    }
-    
-    # コンテンツ改善提案
-    content_issues = []
-    
-    # メタディスクリプションの問題チェック
-    meta_desc_issues = [page for page in pages_data if not page['meta_description'] or 
-                        page['meta_description'] == "No Meta Description" or 
-                        len(page['meta_description']) < 70 or 
-                        len(page['meta_description']) > 160]
-    
-    if meta_desc_issues:
-        if len(meta_desc_issues) > 1:
-            improvements["content"].append(f"{len(meta_desc_issues)}ページでメタディスクリプションに問題があります。適切な長さ（70〜160文字）に調整してください。")
-        else:
-            improvements["content"].append(f"「{meta_desc_issues[0]['title']}」ページのメタディスクリプションに問題があります。適切な長さ（70〜160文字）に調整してください。")
-    
-    # H1タグの問題チェック
-    h1_issues = [page for page in pages_data if not page['h1'] or page['h1'] == "No H1"]
-    if h1_issues:
-        if len(h1_issues) > 1:
-            improvements["content"].append(f"{len(h1_issues)}ページでH1タグが適切に設定されていません。各ページに固有のH1タグを設定してください。")
-        else:
-            improvements["content"].append(f"「{h1_issues[0]['title']}」ページにH1タグが設定されていません。適切なH1タグを設定してください。")
-    
-    # コンテンツ量の問題チェック
-    low_content_pages = [page for page in pages_data if page['word_count'] < 600]
-    if low_content_pages:
-        if len(low_content_pages) > 1:
-            improvements["content"].append(f"{len(low_content_pages)}ページでコンテンツ量が不足しています。主要ページでは最低1,000文字以上を目指しましょう。")
-        else:
-            improvements["content"].append(f"「{low_content_pages[0]['title']}」ページのコンテンツ量が不足しています。もっと詳細なコンテンツを追加してください。")
-    
-    # 見出し構造の問題チェック
-    heading_issues = [page for page in pages_data if page['h2_count'] == 0]
-    if heading_issues:
-        if len(heading_issues) > 1:
-            improvements["content"].append(f"{len(heading_issues)}ページで見出し構造（H2タグ）が使用されていません。コンテンツを整理し、適切な見出し構造を作成してください。")
-        else:
-            improvements["content"].append(f"「{heading_issues[0]['title']}」ページで見出し構造（H2タグ）が使用されていません。コンテンツを整理し、適切な見出し構造を作成してください。")
-    
-    # 画像のalt属性の問題チェック
-    alt_issues = [page for page in pages_data if page['image_count'] > 0 and page['images_with_alt'] / page['image_count'] < 0.8]
-    if alt_issues:
-        improvements["content"].append("複数の画像にalt属性が設定されていません。すべての画像に適切な代替テキストを設定してください。")
-    
-    # キーワード活用の提案
-    if keyword_analysis:
-        keyword_pages = sum([len(data['matches']) for data in keyword_analysis.values()])
-        if keyword_pages < len(pages_data) * len(keyword_analysis) * 0.5:
-            improvements["content"].append("ターゲットキーワードの活用が不十分です。より多くのページでキーワードを自然に取り入れてください。")
-    
-    # 内部SEO改善提案
-    
-    # 内部リンクの問題チェック
-    low_link_pages = [page for page in pages_data if page['internal_links_count'] < 5]
-    if low_link_pages:
-        if len(low_link_pages) > 1:
-            improvements["internal"].append(f"{len(low_link_pages)}ページで内部リンクが不足しています。関連コンテンツへのリンクを増やしてください。")
-        else:
-            improvements["internal"].append(f"「{low_link_pages[0]['title']}」ページの内部リンクが不足しています。関連コンテンツへのリンクを増やしてください。")
-    
-    # URLの最適化
-    complex_urls = [page for page in pages_data if len(urlparse(page['url']).path.split('/')) > 3 or re.search(r'\d{10,}', urlparse(page['url']).path)]
-    if complex_urls:
-        improvements["internal"].append("複雑なURL構造が検出されました。URLはシンプルで、キーワードを含む構造にしてください。")
-    
-    # HTTPSのチェック
-    non_https = [page for page in pages_data if not page['url'].startswith('https://')]
-    if non_https:
-        improvements["internal"].append("HTTPSが導入されていないページが検出されました。セキュリティとSEOのためにすべてのページをHTTPSに移行してください。")
-    
-    # モバイル対応の提案（実際には詳細な分析が必要）
-    improvements["internal"].append("モバイルフレンドリーなデザインを確認してください。Googleのモバイルファーストインデックスに最適化することが重要です。")
-    
-    # ページ速度の最適化提案
-    improvements["internal"].append("ページ読み込み速度の最適化を行ってください。画像の圧縮、JavaScriptの遅延読み込み、不要なプラグインの削除などが効果的です。")
-    
-    # 外部SEO改善提案（実際にはより詳細な分析が必要）
-    improvements["external"].append("高品質なドメインからのバックリンクを獲得するために、業界関連の信頼性の高いサイトとの関係構築を行ってください。")
-    improvements["external"].append("バックリンクのアンカーテキストの多様性を確保してください。同じアンカーテキストの過剰な使用は避けるべきです。")
-    improvements["external"].append("ソーシャルメディアでの存在感を高め、コンテンツのシェアを促進してください。インフォグラフィックなど共有されやすいコンテンツの作成が効果的です。")
-    
-    # 技術的SEO改善提案
-    improvements["technical"].append("XMLサイトマップを最新の状態に保ち、Google Search Consoleに定期的に送信してください。")
-    improvements["technical"].append("robots.txtファイルを最適化し、クローラーが適切にサイトをインデックスできるようにしてください。")
-    improvements["technical"].append("重複コンテンツの問題を確認し、canonical URLを適切に設定してください。")
-    improvements["technical"].append("構造化データ（Schema.org）を実装して、検索結果での表示を改善してください。")
-    improvements["technical"].append("404エラーページを確認し、リダイレクトまたはコンテンツの復元を検討してください。")
-    
-    return improvements
+    return getattr(tab, 'open', None) is not False
 
-# 競合分析関数
-def analyze_competitors(competitor_urls, keywords):
+def request_cancel():
     """
-    競合サイトの基本的な分析を行う関数（実際には詳細なAPIが必要）
+    キャンセルボタンのコールバック（次の実行で取得済みのページだけを分析する）
     """
-    competitor_data = {}
-    
-    for url in competitor_urls:
-        # 競合サイトの基本情報（実際のAPIを使用）
-        competitor_data[url] = {
-            "seo_score": np.random.randint(40, 95),
-            "backlinks": np.random.randint(30, 1000),
-            "keywords_ranking": np.random.randint(10, 500),
-            "content_score": np.random.randint(50, 95),
-            "technical_score": np.random.randint(40, 95),
-            "page_speed": np.random.randint(50, 95),
-            "domain_authority": np.random.randint(20, 80),
-        }
-        
-        # キーワード分析
-        keyword_ranks = {}
-        for keyword in keywords:
-            keyword_ranks[keyword] = np.random.randint(1, 100)
-        
-        competitor_data[url]["keyword_ranks"] = keyword_ranks
-    
-    return competitor_data
+    st.session_state.cancel_requested = True
+
+def render_live_metrics(placeholder, metrics):
+    """
+    クロール中の暫定スコアとキーワード出現数を表示する関数
+    """
+    with placeholder.container():
+        st.markdown('<div class="section-header">クロール中の暫定結果</div>', unsafe_allow_html=True)
+        scores = metrics['scores']
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("取得ページ数", metrics['pages'])
+        col2.metric("総合スコア（暫定）", f"{scores['total']:.1f}")
+        col3.metric("コンテンツスコア（暫定）", f"{scores['content']:.1f}")
+        col4.metric("内部SEOスコア（暫定）", f"{scores['internal']:.1f}")
+        if metrics['keyword_hits']:
+            st.dataframe(pd.DataFrame([
+                {'キーワード': keyword, '出現ページ数': hits['pages'], '出現回数': hits['count']}
+                for keyword, hits in metrics['keyword_hits'].items()
+            ]), hide_index=True)
+
+def complete_analysis(pages_data, message, instrumentation=None, competitor_pages=None):
+    """
+    取得したページでスコア計算・キーワード分析・改善提案・競合分析を行い、セッションステートに保存する関数
+    instrumentation: クロール時の計測結果（診断タブに表示する）
+    competitor_pages: 同時にクロールした競合サイトのページ（{URL: StoredPages}）
+    """
+    if not pages_data:
+        st.error("サイトのクロールに失敗しました。URLが正しいことを確認してください。")
+        return
+
+    # プロバイダーはキャッシュの接続を持つため、分析が終わったら閉じる（再実行のたびに接続が残らないように）
+    with create_provider(metrics_sources) as provider:
+        results = seo_pipeline.analyze_pages(pages_data, keyword_list, competitor_urls,
+                                             instrumentation=instrumentation, provider=provider,
+                                             competitor_pages=competitor_pages)
+
+    # セッションステートにデータを保存
+    for key, value in results.items():
+        st.session_state[key] = value
+    st.session_state.analysis_key = report_views.analysis_key(results)
+    st.session_state.analyzed = True
+
+    st.success(message.format(count=len(pages_data)))
 
 # サイドバー（入力部分）
 st.sidebar.markdown('<div style="text-align: center;"><h2>SEO分析ツール設定</h2></div>', unsafe_allow_html=True)
@@ -479,6 +154,8 @@ if show_report_urls:
     ga4_url = st.sidebar.text_input("Google Analytics 4 URL", "")
     ahrefs_url = st.sidebar.text_input("Ahrefs URL", "")
     semrush_url = st.sidebar.text_input("SEMrush URL", "")
+# 検索ボリューム・順位・被リンクはGSC・Ahrefs・SEMrushのエクスポート（CSV/JSON）から読み込む（未設定の指標は推定値）
+metrics_sources = [gsc_url, ahrefs_url, semrush_url] if show_report_urls else []
 
 # 3. ニーズ（複数選択可）
 st.sidebar.markdown("### 分析ニーズ（複数選択可）")
@@ -499,10 +176,22 @@ competitor_urls = []
 if show_competitors:
     competitors = st.sidebar.text_area("競合サイトURL（1行に1つ）", "https://competitor1.com\nhttps://competitor2.com")
     competitor_urls = [url.strip() for url in competitors.split("\n") if url.strip()]
+    # 競合サイトは主サイトと同時にクロールする（同時接続数・リクエスト数/秒はサイトごとに適用）
+    crawl_time_budget = st.sidebar.number_input("クロールの制限時間（秒、0は無制限）", min_value=0, value=0, step=10)
+else:
+    crawl_time_budget = 0
 
 # クロールするページ数の設定
 max_pages = st.sidebar.slider("クロールするページ数", min_value=3, max_value=50, value=10)
 
+# クロール速度の設定（ホストごとの同時接続数とリクエスト間隔）
+max_workers = st.sidebar.slider("同時接続数", min_value=1, max_value=16, value=8)
+requests_per_second = st.sidebar.slider("リクエスト数/秒（ホスト毎）", min_value=1, max_value=20, value=10)
+
+# robots.txtとサイトマップの利用
+respect_robots = st.sidebar.checkbox("robots.txtに従う", value=True)
+use_sitemaps = st.sidebar.checkbox("サイトマップのURLもクロールする", value=True)
+
 # 実行ボタン
 analyze_button = st.sidebar.button("分析を実行", type="primary")
 
@@ -510,48 +199,86 @@ analyze_button = st.sidebar.button("分析を実行", type="primary")
 st.markdown('<div class="main-header">SEO分析・改善自動化ツール</div>', unsafe_allow_html=True)
 st.markdown("Webサイトのコンテンツ分析、内部対策、外部対策、キーワード戦略を評価し、改善レポートを生成します。")
 
-# タブの設定
-tabs = st.tabs(["ダッシュボード", "コンテンツ分析", "内部SEO分析", "外部SEO分析", "キーワード分析", "改善提案"])
-dashboard_tab, content_tab, internal_tab, external_tab, keyword_tab, recommendations_tab = tabs
+# クロールの進捗表示
+status_area = st.container()
+
+# タブの設定（選択中のタブだけを描画する）
+tabs = lazy_tabs(["ダッシュボード", "コンテンツ分析", "内部SEO分析", "外部SEO分析", "キーワード分析", "改善提案", "診断"])
+dashboard_tab, content_tab, internal_tab, external_tab, keyword_tab, recommendations_tab, diagnostics_tab = tabs
+
+# この表示でのタブごとの描画時間（診断タブに表示する）
+render_times = {}
+
+
+@contextmanager
+def render_timer(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        render_times[name] = time.perf_counter() - start
 
-# 分析実行時の処理
+# 分析実行時の処理（クロールしながら進捗と暫定結果を表示する）
 if analyze_button:
     if website_url == "" or website_url == "https://example.com":
         st.error("有効なWebサイトURLを入力してください。")
     else:
-        with st.spinner('サイトをクロールして分析しています...'):
-            # サイトのクロール
+        st.session_state.cancel_requested = False
+        # キャンセルで再実行された後も計測結果を引き継ぐため、セッションステートに保持する
+        instrumentation = st.session_state.running_instrumentation = Instrumentation()
+        with status_area:
+            progress_bar = st.progress(0.0, text="サイトのクロールを開始しています...")
+            st.button("キャンセル（取得済みのページで分析）", on_click=request_cancel)
+        with dashboard_tab:
+            live_metrics = st.empty()
+
+        try:
+            stream = seo_pipeline.stream_crawl(website_url, keyword_list, max_pages=max_pages,
+                                               max_workers=max_workers, requests_per_second=requests_per_second,
+                                               max_age=CRAWL_REUSE_SECONDS, respect_robots=respect_robots,
+                                               use_sitemaps=use_sitemaps, instrumentation=instrumentation,
+                                               competitor_urls=competitor_urls,
+                                               time_budget=crawl_time_budget or None)
             try:
-                pages_data = crawl_website(website_url, max_pages=max_pages)
-                
-                if not pages_data:
-                    st.error("サイトのクロールに失敗しました。URLが正しいことを確認してください。")
-                else:
-                    # SEOスコアの計算
-                    seo_scores = calculate_seo_scores(pages_data)
-                    
-                    # キーワード分析
-                    keyword_analysis = analyze_keywords(pages_data, keyword_list)
-                    
-                    # 改善提案の生成
-                    improvements = generate_improvements(pages_data, keyword_analysis)
-                    
-                    # 競合分析（設定されている場合）
-                    competitor_data = {}
-                    if competitor_urls:
-                        competitor_data = analyze_competitors(competitor_urls, keyword_list)
-                    
-                    # セッションステートにデータを保存
-                    st.session_state.pages_data = pages_data
-                    st.session_state.seo_scores = seo_scores
-                    st.session_state.keyword_analysis = keyword_analysis
-                    st.session_state.improvements = improvements
-                    st.session_state.competitor_data = competitor_data
-                    st.session_state.analyzed = True
-                    
-                    st.success(f'{len(pages_data)}ページの分析が完了しました！各タブで詳細を確認できます。')
-            except Exception as e:
-                st.error(f"分析中にエラーが発生しました: {str(e)}")
+                # キャンセルボタンで再実行された場合も、取得済みのページはストアに残る
+                for progress in stream:
+                    st.session_state.running_crawl = progress['crawl_id']
+                    st.session_state.running_competitors = progress['competitor_crawls']
+                    competitor_text = f"（競合サイト {progress['competitor_visited']}ページ）" if competitor_urls else ""
+                    progress_bar.progress(
+                        min(1.0, progress['visited'] / max_pages),
+                        text=f"クロール中: {progress['visited']}/{max_pages}ページ{competitor_text} {progress['last_url'] or ''}"
+                    )
+                    render_live_metrics(live_metrics, progress['metrics'])
+            finally:
+                stream.close()
+
+            st.session_state.running_crawl = None
+            progress_bar.empty()
+            live_metrics.empty()
+            with st.spinner('取得したページを分析しています...'):
+                complete_analysis(progress['pages_data'], '{count}ページの分析が完了しました！各タブで詳細を確認できます。',
+                                  instrumentation, progress['competitor_pages'])
+        except Exception as e:
+            st.session_state.running_crawl = None
+            st.error(f"分析中にエラーが発生しました: {str(e)}")
+
+# キャンセルされた場合は、それまでに取得したページで分析する
+elif st.session_state.get('cancel_requested') and st.session_state.get('running_crawl'):
+    crawl_id = st.session_state.running_crawl
+    st.session_state.running_crawl = None
+    st.session_state.cancel_requested = False
+    try:
+        with st.spinner('取得済みのページを分析しています...'):
+            complete_analysis(
+                StoredPages(DEFAULT_STORE_PATH, crawl_id),
+                'クロールをキャンセルしました。取得済みの{count}ページで分析しました（再実行すると続きからクロールします）。',
+                st.session_state.get('running_instrumentation'),
+                {url: StoredPages(DEFAULT_STORE_PATH, competitor_id)
+                 for url, competitor_id in (st.session_state.get('running_competitors') or {}).items()}
+            )
+    except Exception as e:
+        st.error(f"分析中にエラーが発生しました: {str(e)}")
 
 # 分析済みでない場合のメッセージ表示
 if not hasattr(st.session_state, 'analyzed'):
@@ -561,18 +288,288 @@ if not hasattr(st.session_state, 'analyzed'):
 # 分析済みの場合の各タブの表示
 if hasattr(st.session_state, 'analyzed') and st.session_state.analyzed:
     pages_data = st.session_state.pages_data
+    page_frame = st.session_state.page_frame
     seo_scores = st.session_state.seo_scores
     keyword_analysis = st.session_state.keyword_analysis
     improvements = st.session_state.improvements
+    page_issues = st.session_state.page_issues
     competitor_data = st.session_state.competitor_data
+    link_metrics = st.session_state.link_metrics
+    link_summary = st.session_state.link_summary
+    site_summary = st.session_state.site_summary
+    coverage = st.session_state.coverage
+    duplicates = st.session_state.duplicates
+    instrumentation = st.session_state.instrumentation
+    # 表・グラフのキャッシュのキー
+    if 'analysis_key' not in st.session_state:
+        st.session_state.analysis_key = report_views.analysis_key(st.session_state)
+    analysis_key = st.session_state.analysis_key
     
     # 1. ダッシュボードタブ
-    with dashboard_tab:
-        st.markdown('<div class="sub-header">SEO総合評価</div>', unsafe_allow_html=True)
+    with dashboard_tab, render_timer('ダッシュボード'):
+        if tab_open(dashboard_tab):
+            st.markdown('<div class="sub-header">SEO総合評価</div>', unsafe_allow_html=True)
         
-        # 全体スコアの計算と表示
-        overall_score = np.mean(seo_scores["total"])
+            # 全体スコアの計算と表示
+            overall_score = np.mean(seo_scores["total"])
         
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.metric
\ No newline at end of file
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric
+
+    # 2. コンテンツ分析タブ
+    with content_tab, render_timer('コンテンツ分析'):
+        if tab_open(content_tab):
+            st.markdown('<div class="sub-header">重複・類似コンテンツ</div>', unsafe_allow_html=True)
+
+            if not duplicates:
+                st.success("内容が重複・類似するページは見つかりませんでした。")
+            else:
+                inconsistent = [cluster for cluster in duplicates if not cluster['consistent']]
+                col1, col2, col3 = st.columns(3)
+                col1.metric("類似ページのグループ", len(duplicates))
+                col2.metric("該当ページ数", sum(len(cluster['urls']) for cluster in duplicates))
+                col3.metric("canonicalに問題のあるグループ", len(inconsistent))
+
+                start, stop = page_selector(len(duplicates), "duplicates_page", page_size=20)
+                for number, cluster in enumerate(duplicates[start:stop], start + 1):
+                    status = "canonical設定済み" if cluster['consistent'] else "要確認"
+                    with st.expander(f"グループ{number}: {len(cluster['urls'])}ページ（{status}）"):
+                        if cluster['canonical']:
+                            st.write(f"正規URL: {cluster['canonical']}")
+                        problems = {url: "canonical未設定" for url in cluster['canonical_missing']}
+                        problems.update({url: "指定先が不一致" for url in cluster['canonical_inconsistent']})
+                        st.dataframe(pd.DataFrame({
+                            'URL': cluster['urls'],
+                            'canonical': [canonical or "（未設定）" for canonical in cluster['canonicals']],
+                            '問題': [problems.get(url, "") for url in cluster['urls']]
+                        }), hide_index=True)
+
+    # 3. 内部SEO分析タブ
+    with internal_tab, render_timer('内部SEO分析'):
+        if tab_open(internal_tab):
+            st.markdown('<div class="sub-header">内部SEO分析</div>', unsafe_allow_html=True)
+
+            col1, col2, col3, col4, col5 = st.columns(5)
+            col1.metric("クロールページ数", link_summary['pages'])
+            col2.metric("内部リンク数", link_summary['links'])
+            col3.metric("平均クリック深度", f"{link_summary['avg_depth']:.1f}")
+            col4.metric("孤立ページ", link_summary['orphans'])
+            col5.metric("行き止まりページ", link_summary['dead_ends'])
+
+            # クリック深度の分布
+            st.markdown('<div class="section-header">クリック深度の分布</div>', unsafe_allow_html=True)
+            st.plotly_chart(cached_view(analysis_key, 'depth', report_views.depth_figure, (link_metrics,)))
+            if link_summary['unreachable']:
+                st.warning(f"{link_summary['unreachable']}ページはトップページから内部リンクでたどれません。")
+
+            # 内部PageRankの上位ページ
+            st.markdown('<div class="section-header">内部PageRank上位ページ</div>', unsafe_allow_html=True)
+            st.dataframe(cached_view(analysis_key, 'pagerank', report_views.pagerank_table, (link_metrics,)),
+                         hide_index=True)
+
+            # 孤立ページ・行き止まりページ
+            for column, label, message in [
+                ('orphan', '孤立ページ', "他のページからリンクされていません。関連ページやナビゲーションからリンクを追加してください。"),
+                ('dead_end', '行き止まりページ', "他のページへの内部リンクがありません。関連コンテンツへのリンクを追加してください。")
+            ]:
+                affected = cached_view(analysis_key, column, report_views.url_table,
+                                       (link_metrics.loc[link_metrics[column], 'url'],))
+                if len(affected):
+                    st.markdown(f'<div class="section-header">{label}（{len(affected)}件）</div>', unsafe_allow_html=True)
+                    st.write(message)
+                    paged_table(affected, column)
+
+            # サイトマップ・robots.txtとクロール結果の差分
+            if coverage is not None:
+                st.markdown('<div class="section-header">サイトマップとrobots.txt</div>', unsafe_allow_html=True)
+                col1, col2, col3 = st.columns(3)
+                col1.metric("robots.txt", "あり" if coverage['robots_found'] else "なし")
+                col2.metric("Crawl-delay", f"{coverage['crawl_delay']}秒" if coverage['crawl_delay'] else "指定なし")
+                col3.metric("サイトマップのURL数", coverage['sitemap_urls'])
+                if coverage['sitemaps']:
+                    st.write("参照したサイトマップ: " + "、".join(coverage['sitemaps']))
+
+                for key, label in [
+                    ('pages_not_in_sitemap', 'サイトマップに含まれていないページ'),
+                    ('sitemap_not_linked', 'サイトマップにあるが、クロールしたページからリンクされていないURL'),
+                    ('sitemap_blocked', 'サイトマップにあるが、robots.txtで禁止されているURL')
+                ]:
+                    if coverage[key]:
+                        with st.expander(f"{label}（{len(coverage[key])}件）"):
+                            paged_table(cached_view(analysis_key, key, report_views.url_table, (coverage[key],)), key)
+
+    # 4. 外部SEO分析タブ（競合サイトとの比較）
+    with external_tab, render_timer('外部SEO分析'):
+        if tab_open(external_tab):
+            st.markdown('<div class="sub-header">競合サイトとの比較</div>', unsafe_allow_html=True)
+
+            if not competitor_data:
+                st.info("サイドバーで競合サイトを設定すると、同じ条件でクロールしたスコアを比較できます。")
+            else:
+                # 競合サイトの集計はクロール結果ごとにストアへ保存されるため、再表示時は再計算しない
+                rows = [dict(site_summary, サイト=website_url)]
+                rows += [dict(data, サイト=url) for url, data in competitor_data.items()]
+                comparison = pd.DataFrame([{
+                    'サイト': row['サイト'],
+                    'ページ数': row.get('pages'),
+                    'SEOスコア': row.get('seo_score'),
+                    'コンテンツ': row.get('content_score'),
+                    '内部SEO': row.get('technical_score'),
+                    '平均語数': row.get('avg_word_count'),
+                    '平均クリック深度': row.get('avg_depth'),
+                    '重複ページ': row.get('duplicate_pages'),
+                    '被リンク数': row.get('backlinks'),
+                    'ドメインオーソリティ': row.get('domain_authority'),
+                    'クロール': '済' if row.get('crawled', True) else '未取得（推定値）'
+                } for row in rows])
+                st.dataframe(comparison, hide_index=True)
+
+                # キーワードごとの出現ページ数と検索順位
+                st.markdown('<div class="section-header">キーワード別の比較</div>', unsafe_allow_html=True)
+                keyword_rows = []
+                for keyword in keyword_list:
+                    keyword_row = {'キーワード': keyword,
+                                   f'{website_url}（出現ページ）': site_summary['keyword_pages'].get(keyword)}
+                    for url, data in competitor_data.items():
+                        keyword_row[f'{url}（出現ページ）'] = data.get('keyword_pages', {}).get(keyword)
+                        keyword_row[f'{url}（順位）'] = data['keyword_ranks'].get(keyword)
+                    keyword_rows.append(keyword_row)
+                if keyword_rows:
+                    st.dataframe(pd.DataFrame(keyword_rows), hide_index=True)
+
+    # 5. キーワード分析タブ
+    with keyword_tab, render_timer('キーワード分析'):
+        if tab_open(keyword_tab):
+            st.markdown('<div class="sub-header">キーワード分析</div>', unsafe_allow_html=True)
+        
+            if not keyword_analysis:
+                st.info("サイドバーで調査キーワードを入力してください。")
+            else:
+                keyword_summary = pd.DataFrame([
+                    {
+                        'キーワード': keyword,
+                        '検索ボリューム': data['search_volume'],
+                        '現在の順位': data['current_rank'],
+                        '難易度': data['difficulty'],
+                        '出現ページ数': len(data['matches']),
+                        'データ元': 'エクスポート' if data['source'] == 'file' else '推定値'
+                    }
+                    for keyword, data in keyword_analysis.items()
+                ])
+                st.dataframe(keyword_summary, hide_index=True)
+            
+                # キーワードごとの関連ページ（BM25スコア順）
+                st.markdown('<div class="section-header">キーワード別の関連ページ</div>', unsafe_allow_html=True)
+                for keyword, data in keyword_analysis.items():
+                    with st.expander(f"{keyword}（関連ページ {len(data['top_pages'])}件）"):
+                        if data['top_pages']:
+                            top_pages = pd.DataFrame(data['top_pages'])[['title', 'url', 'score']]
+                            top_pages.columns = ['タイトル', 'URL', '関連度（BM25）']
+                            st.dataframe(top_pages, hide_index=True)
+                        else:
+                            st.write("このキーワードに関連するページは見つかりませんでした。")
+
+                # ページごとのカバーキーワード（転置インデックスから求める）
+                if isinstance(pages_data, StoredPages):
+                    st.markdown('<div class="section-header">ページ別のカバーキーワード</div>', unsafe_allow_html=True)
+                    page_url = st.text_input("ページのURL", value=link_metrics['url'].iloc[0] if len(link_metrics) else "",
+                                             key="keyword_page_url").strip()
+                    if page_url:
+                        covered = cached_view(analysis_key, f'page_keywords:{page_url}', seo_pipeline.page_keywords,
+                                              (pages_data, page_url, list(keyword_analysis)))
+                        if covered:
+                            st.dataframe(pd.DataFrame(covered, columns=['キーワード', '関連度（BM25）']), hide_index=True)
+                        else:
+                            st.write("このページがカバーしている調査キーワードは見つかりませんでした（URLはクロールしたページと同じ表記で入力してください）。")
+    
+    # 6. 改善提案タブ
+    with recommendations_tab, render_timer('改善提案'):
+        if tab_open(recommendations_tab):
+            st.markdown('<div class="sub-header">改善提案</div>', unsafe_allow_html=True)
+
+            category_labels = {
+                "content": "コンテンツ改善",
+                "internal": "内部SEO改善",
+                "external": "外部SEO改善",
+                "technical": "技術的SEO改善"
+            }
+            for category, label in category_labels.items():
+                st.markdown(f'<div class="section-header">{label}</div>', unsafe_allow_html=True)
+                for suggestion in improvements[category]:
+                    st.markdown(f'<div class="recommendation">{suggestion}</div>', unsafe_allow_html=True)
+
+            # URLごとの問題一覧
+            if page_issues:
+                st.markdown('<div class="section-header">ページ別の問題一覧</div>', unsafe_allow_html=True)
+                summary, per_url = cached_view(analysis_key, 'issues', report_views.issue_tables, (page_issues,))
+                st.dataframe(summary, hide_index=True)
+                paged_table(per_url, 'issues')
+
+    # 7. 診断タブ（取得時間・解析時間・処理段階ごとの所要時間）
+    with diagnostics_tab:
+        if tab_open(diagnostics_tab):
+            st.markdown('<div class="sub-header">診断</div>', unsafe_allow_html=True)
+            import plotly.express as px
+
+            diagnostics = cached_view(analysis_key, 'diagnostics', instrumentation.summary)
+            counters = diagnostics['counters']
+            col1, col2, col3, col4, col5 = st.columns(5)
+            col1.metric("取得したURL", diagnostics['fetches'])
+            col2.metric("受信データ", f"{diagnostics['bytes'] / 1024 / 1024:.1f} MB")
+            col3.metric("取得時間（中央値）", f"{diagnostics['latency']['p50'] * 1000:.0f} ms")
+            col4.metric("取得時間（90%）", f"{diagnostics['latency']['p90'] * 1000:.0f} ms")
+            col5.metric("解析時間（平均）", f"{diagnostics['parse']['mean'] * 1000:.1f} ms")
+
+            col1, col2, col3, col4, col5, col6 = st.columns(6)
+            col1.metric("リトライ", counters['retries'])
+            col2.metric("robots.txtでスキップ", counters['skipped'])
+            col3.metric("HTML以外でスキップ", counters['non_html'])
+            col4.metric("サイズ上限で切り詰め", counters['truncated'])
+            col5.metric("エラー", counters['errors'])
+            col6.metric("キャッシュ（304）", counters['cache_hits'])
+
+            # 処理段階ごとの所要時間（描画時間は直前のタブの表示にかかった時間）
+            stage_rows = [{'段階': name, '秒': seconds} for name, seconds in diagnostics['stages'].items()]
+            stage_rows += [{'段階': f'描画: {name}', '秒': seconds} for name, seconds in render_times.items()]
+            if stage_rows:
+                st.markdown('<div class="section-header">処理段階ごとの所要時間</div>', unsafe_allow_html=True)
+                fig = px.bar(pd.DataFrame(stage_rows), x='秒', y='段階', orientation='h')
+                st.plotly_chart(fig)
+
+            if diagnostics['fetches'] == 0:
+                st.info("今回の分析ではページを取得していません（保存済みのクロール結果を再利用しました）。")
+            else:
+                # ヒストグラムは集計済みの値、散布図は間引いた点（多い場合はWebGL）で描く
+                views = cached_view(analysis_key, 'fetches', report_views.fetch_views, (instrumentation,))
+
+                st.markdown('<div class="section-header">取得時間の分布</div>', unsafe_allow_html=True)
+                st.plotly_chart(views['latency'])
+
+                if views['parse'] is not None:
+                    st.markdown('<div class="section-header">解析時間の分布</div>', unsafe_allow_html=True)
+                    st.plotly_chart(views['parse'])
+
+                st.markdown('<div class="section-header">取得時間とサイズ</div>', unsafe_allow_html=True)
+                st.plotly_chart(views['scatter'])
+                if views['sampled'] < diagnostics['fetches']:
+                    st.caption(f"{diagnostics['fetches']}件のうち、遅い順の上位と等間隔に選んだ{views['sampled']}件を表示しています。")
+
+                st.markdown('<div class="section-header">取得に時間がかかったURL</div>', unsafe_allow_html=True)
+                st.dataframe(views['slowest'], hide_index=True)
+
+                st.write("ステータスコード別の件数: " + "、".join(
+                    f"{code}: {count}件" for code, count in diagnostics['status_counts'].items()
+                ))
+
+            if diagnostics['errors']:
+                with st.expander(f"エラー（{counters['errors']}件）"):
+                    st.dataframe(pd.DataFrame(diagnostics['errors']), hide_index=True)
+
+            # 計測結果の書き出し（JSONとPrometheusのテキスト形式）
+            metrics_json, metrics_prometheus = cached_view(analysis_key, 'exports', report_views.metrics_exports,
+                                                           (instrumentation,))
+            col1, col2 = st.columns(2)
+            col1.download_button("計測結果（JSON）", metrics_json, file_name="seo_metrics.json", mime="application/json")
+            col2.download_button("計測結果（Prometheus）", metrics_prometheus,
+                                 file_name="seo_metrics.prom", mime="text/plain")
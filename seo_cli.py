@@ -0,0 +1,256 @@
+"""
+SEO分析のバッチ実行（Streamlitを使わないCLI）
+サイトURLの一覧ファイルとキーワードを受け取り、プロセスプールで複数サイトを並列に分析して
+結果をJSON（またはParquet）で出力する
+
+使い方:
+    python seo_cli.py sites.txt --keywords "SEO対策, 内部リンク最適化" --output results/
+    python seo_cli.py sites.txt --keywords-file keywords.txt --processes 8 --format parquet
+    python seo_cli.py sites.txt --keywords "SEO対策" --metrics-file gsc.csv --metrics-file ahrefs.csv
+    python seo_cli.py sites.txt --keywords "SEO対策" --competitor https://competitor1.com --time-budget 300
+    python seo_cli.py sites.txt --keywords "SEO対策" --crawl-workers 8
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from crawl_store import DEFAULT_STORE_PATH, StoredPages
+from distributed_crawl import crawl_distributed
+from http_client import DEFAULT_CACHE_DIR
+from metrics_provider import DEFAULT_CACHE_TTL, create_provider
+from seo_pipeline import analyze_pages, crawl_competitors, run_analysis
+
+
+def read_lines(path):
+    """
+    1行に1項目のファイルを読み込む（空行と#で始まる行は無視）
+    """
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
+
+
+def parse_keywords(text):
+    return [kw.strip() for kw in re.split(r'[,、\n]', text) if kw.strip()]
+
+
+def site_slug(url):
+    """
+    出力ファイル名に使えるサイト名を作成する
+    """
+    slug = re.sub(r'^https?://', '', url).strip('/')
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', slug) or 'site'
+
+
+def to_json_value(value):
+    """
+    json.dumpsで扱えないnumpyの値を変換する
+    """
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def analyze_site(url, keywords, options):
+    """
+    1サイト分の分析を実行し、結果ファイルを書き出す（ワーカープロセスで実行）
+    戻り値: サイトの概要
+    """
+    started = time.time()
+    # プロバイダーはSQLiteの接続を持つため、ワーカープロセスごとに作成し、分析が終わったら閉じる
+    with create_provider(options['metrics_files'], options['cache_dir'], options['metrics_ttl']) as provider:
+        crawl_ids = options.get('crawl_ids')
+        if crawl_ids:
+            # 分散クロールで取得済みのページを分析する
+            pages_data = StoredPages(options['store_path'], crawl_ids[url])
+            competitor_pages = {competitor: StoredPages(options['store_path'], crawl_ids[competitor])
+                                for competitor in options['competitors']}
+            results = analyze_pages(pages_data, keywords, options['competitors'], provider=provider,
+                                    competitor_pages=competitor_pages) if pages_data else None
+        else:
+            # 競合サイトは親プロセスでクロール済みのページを使い、ここでは主サイトだけをクロールする
+            competitor_pages = {competitor: StoredPages(options['store_path'], crawl_id)
+                                for competitor, crawl_id in options.get('competitor_crawl_ids', {}).items()}
+            results = run_analysis(
+                url, keywords,
+                competitor_urls=options['competitors'],
+                competitor_pages=competitor_pages,
+                competitor_max_pages=options['competitor_max_pages'],
+                time_budget=options['time_budget'],
+                max_pages=options['max_pages'],
+                max_workers=options['max_workers'],
+                requests_per_second=options['requests_per_second'],
+                store_path=options['store_path'],
+                cache_dir=options['cache_dir'],
+                respect_robots=options['respect_robots'],
+                use_sitemaps=options['use_sitemaps'],
+                parse_workers=options['parse_workers'],
+                provider=provider
+            )
+    if results is None:
+        return {'url': url, 'status': 'failed', 'elapsed': round(time.time() - started, 2)}
+
+    # ページごとのデータとスコアを1つの表にまとめる
+    page_table = results['page_frame'].copy()
+    for column in results['link_metrics'].columns.drop('url'):
+        page_table[column] = results['link_metrics'][column].to_numpy()
+    for column, values in results['seo_scores'].items():
+        page_table[f'{column}_score'] = values
+
+    slug = site_slug(url)
+    output_dir = options['output_dir']
+    if options['format'] == 'parquet':
+        pages_path = os.path.join(output_dir, f'{slug}_pages.parquet')
+        page_table.to_parquet(pages_path, index=False)
+    else:
+        pages_path = os.path.join(output_dir, f'{slug}_pages.json')
+        page_table.to_json(pages_path, orient='records', force_ascii=False, indent=2)
+
+    summary = {
+        'url': url,
+        'status': 'ok',
+        'crawl_id': getattr(results['pages_data'], 'crawl_id', None),
+        'page_count': len(page_table),
+        'overall_score': round(float(np.mean(results['seo_scores']['total'])), 1),
+        'content_score': round(float(np.mean(results['seo_scores']['content'])), 1),
+        'internal_score': round(float(np.mean(results['seo_scores']['internal'])), 1),
+        'external_score': round(float(np.mean(results['seo_scores']['external'])), 1),
+        'pages_file': pages_path,
+        'elapsed': round(time.time() - started, 2)
+    }
+
+    report = dict(summary)
+    report['link_summary'] = results['link_summary']
+    report['coverage'] = results['coverage']
+    report['duplicates'] = results['duplicates']
+    report['keyword_analysis'] = results['keyword_analysis']
+    report['improvements'] = results['improvements']
+    report['page_issues'] = results['page_issues']
+    report['site_summary'] = results['site_summary']
+    report['competitors'] = results['competitor_data']
+    report['diagnostics'] = results['instrumentation'].summary()
+
+    report_path = os.path.join(output_dir, f'{slug}_report.json')
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, default=to_json_value)
+
+    # URLごとの取得結果（JSON）と、監視用のPrometheusテキスト形式の計測結果
+    metrics_path = os.path.join(output_dir, f'{slug}_metrics.json')
+    with open(metrics_path, 'w', encoding='utf-8') as f:
+        json.dump(results['instrumentation'].to_json(), f, ensure_ascii=False, indent=2, default=to_json_value)
+    prometheus_path = os.path.join(output_dir, f'{slug}_metrics.prom')
+    with open(prometheus_path, 'w', encoding='utf-8') as f:
+        f.write(results['instrumentation'].to_prometheus())
+
+    summary['report_file'] = report_path
+    summary['metrics_file'] = metrics_path
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='SEO分析のバッチ実行')
+    parser.add_argument('sites', help='分析するサイトURLの一覧ファイル（1行に1URL）')
+    parser.add_argument('--keywords', default='', help='調査キーワード（カンマ区切り）')
+    parser.add_argument('--keywords-file', help='調査キーワードの一覧ファイル（1行に1キーワード）')
+    parser.add_argument('--output', default='seo_results', help='結果の出力先ディレクトリ')
+    parser.add_argument('--format', choices=['json', 'parquet'], default='json', help='ページデータの出力形式')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help='並列に分析するサイト数')
+    parser.add_argument('--max-pages', type=int, default=50, help='サイトごとのクロール最大ページ数')
+    parser.add_argument('--max-workers', type=int, default=8, help='サイトごとの同時接続数')
+    parser.add_argument('--parse-processes', type=int, default=0,
+                        help='サイトごとのHTML解析プロセス数（0は取得スレッドで解析する）')
+    parser.add_argument('--crawl-workers', type=int, default=0,
+                        help='分散クロールのワーカープロセス数（0は各サイトの分析プロセスでクロールする）')
+    parser.add_argument('--partition-by', choices=['host', 'url'], default='host',
+                        help='分散クロールでURLをワーカーに分ける単位（urlは1つの大規模サイトを全ワーカーで取得する）')
+    parser.add_argument('--rps', type=float, default=10.0, help='ホストごとの最大リクエスト数/秒')
+    parser.add_argument('--store', default=DEFAULT_STORE_PATH, help='クロールストアのパス')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='HTTPキャッシュのディレクトリ')
+    parser.add_argument('--ignore-robots', action='store_true', help='robots.txtのDisallowとCrawl-delayを無視する')
+    parser.add_argument('--no-sitemaps', action='store_true', help='サイトマップのURLをクロール対象に登録しない')
+    parser.add_argument('--competitor', action='append', default=[],
+                        help='各サイトと比較する競合サイトのURL（全サイト分をまとめて1回クロールする、複数指定可）')
+    parser.add_argument('--competitor-pages', type=int, help='競合サイトごとのクロール最大ページ数（省略時は--max-pages）')
+    parser.add_argument('--time-budget', type=float, help='サイトごとのクロールの制限時間（秒、競合サイトは全サイト分をまとめて1回クロールする）')
+    parser.add_argument('--metrics-file', action='append', default=[],
+                        help='検索ボリューム・順位・被リンクのエクスポート（GSC・Ahrefs・SEMrushのCSV/JSON、複数指定可）')
+    parser.add_argument('--metrics-ttl', type=float, default=DEFAULT_CACHE_TTL, help='指標のキャッシュの有効期間（秒）')
+    args = parser.parse_args(argv)
+
+    sites = list(dict.fromkeys(read_lines(args.sites)))
+    keywords = parse_keywords(args.keywords)
+    if args.keywords_file:
+        keywords += read_lines(args.keywords_file)
+
+    os.makedirs(args.output, exist_ok=True)
+    options = {
+        'max_pages': args.max_pages,
+        'max_workers': args.max_workers,
+        'parse_workers': args.parse_processes,
+        'requests_per_second': args.rps,
+        'store_path': args.store,
+        'cache_dir': args.cache_dir,
+        'respect_robots': not args.ignore_robots,
+        'use_sitemaps': not args.no_sitemaps,
+        'competitors': args.competitor,
+        'competitor_max_pages': args.competitor_pages,
+        'time_budget': args.time_budget,
+        'metrics_files': args.metrics_file,
+        'metrics_ttl': args.metrics_ttl,
+        'output_dir': args.output,
+        'format': args.format
+    }
+
+    if args.crawl_workers:
+        # 全サイトと競合サイトを先にワーカープロセスでクロールし、分析ではストアのページを使う
+        crawls, workers = crawl_distributed(
+            list(dict.fromkeys(sites + args.competitor)), max_pages=args.max_pages, workers=args.crawl_workers,
+            max_workers=args.max_workers, requests_per_second=args.rps, store_path=args.store,
+            cache_dir=args.cache_dir, respect_robots=not args.ignore_robots, use_sitemaps=not args.no_sitemaps,
+            partition_by=args.partition_by, time_budget=args.time_budget, parse_workers=args.parse_processes,
+            site_max_pages=dict.fromkeys(args.competitor, args.competitor_pages) if args.competitor_pages else None
+        )
+        options['crawl_ids'] = {url: pages.crawl_id for url, pages in crawls.items()}
+        print(f"分散クロール: {sum(worker['visited'] for worker in workers)}ページ（ワーカー {len(workers)}）",
+              file=sys.stderr)
+    elif args.competitor:
+        # 競合サイトはサイトごとの分析プロセスで重複して取得しないよう、先に1回だけクロールする
+        competitor_crawls = crawl_competitors(
+            args.competitor, max_pages=args.competitor_pages or args.max_pages, max_workers=args.max_workers,
+            requests_per_second=args.rps, store_path=args.store, cache_dir=args.cache_dir,
+            respect_robots=not args.ignore_robots, use_sitemaps=not args.no_sitemaps,
+            time_budget=args.time_budget, parse_workers=args.parse_processes
+        )
+        options['competitor_crawl_ids'] = {url: pages.crawl_id for url, pages in competitor_crawls.items()}
+
+    summaries = []
+    with ProcessPoolExecutor(max_workers=max(1, min(args.processes, len(sites) or 1))) as executor:
+        futures = {executor.submit(analyze_site, url, keywords, options): url for url in sites}
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                summary = future.result()
+            except Exception as e:
+                summary = {'url': url, 'status': 'error', 'error': str(e)}
+            summaries.append(summary)
+            print(f"[{len(summaries)}/{len(sites)}] {url}: {summary['status']}", file=sys.stderr)
+
+    summary_path = os.path.join(args.output, 'summary.json')
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump(sorted(summaries, key=lambda item: item['url']), f, ensure_ascii=False, indent=2)
+    print(summary_path)
+
+    return 0 if all(summary['status'] == 'ok' for summary in summaries) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
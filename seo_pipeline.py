@@ -0,0 +1,557 @@
+"""
+SEO分析パイプライン（Streamlitに依存しないコア処理）
+クロール・スコア計算・キーワード分析・改善提案・競合分析をまとめて実行する。
+Streamlitアプリ（seo-analysis-tool.py）とバッチ処理（seo_cli.py）の両方から利用する
+"""
+import json
+import time
+from datetime import datetime, timedelta
+
+from crawl_store import CrawlStore, StoredPages, DEFAULT_STORE_PATH
+from crawler import CrawlScheduler, crawl_site, prepare_start_url, resolve_crawl_id
+from duplicates import DUPLICATE_COLUMNS, find_duplicates
+from http_client import DEFAULT_CACHE_DIR
+from improvements import find_page_issues, generate_improvements
+from instrumentation import Instrumentation, measure_stage
+from keyword_matcher import KeywordMatcher, TOTAL_FIELDS, match_keywords
+from metrics_provider import DOMAIN_COLUMNS, RANK_HISTORY_DAYS, StubProvider
+from link_graph import build_link_graph
+from scoring import build_page_frame, calculate_seo_scores, draw_random_components, score_frame
+from search_index import SearchIndex
+from sitemaps import coverage_report
+
+SCORE_COLUMNS = ('content', 'internal', 'external', 'total')
+
+
+def crawl_website(url, max_pages=10, max_workers=8, requests_per_second=10.0,
+                  store_path=DEFAULT_STORE_PATH, cache_dir=DEFAULT_CACHE_DIR, respect_robots=True,
+                  use_sitemaps=True, instrumentation=None, parse_workers=0):
+    """
+    指定されたURLからページをクロールし、メタデータを収集する関数
+    max_pages: クロールする最大ページ数
+    max_workers: 同時接続数
+    requests_per_second: ホストごとの最大リクエスト数/秒
+    respect_robots: robots.txtのDisallowとCrawl-delayに従う
+    use_sitemaps: サイトマップのURLもクロール対象に登録する
+    instrumentation: Instrumentation（URLごとの取得結果・クロールの所要時間・エラーを記録する）
+    parse_workers: HTML解析に使うプロセス数（0の場合は取得したワーカースレッドで解析する）
+    戻り値はストア上のページを遅延読み込みするStoredPages（中断したクロールは再実行時に再開）
+    """
+    try:
+        store = CrawlStore(store_path)
+        try:
+            # 条件付きGETキャッシュにより、再クロール時は変更されたページのみダウンロードする
+            with measure_stage(instrumentation, 'crawl'):
+                return crawl_site(url, max_pages=max_pages, max_workers=max_workers,
+                                  requests_per_second=requests_per_second, cache_dir=cache_dir,
+                                  store=store, respect_robots=respect_robots, use_sitemaps=use_sitemaps,
+                                  instrumentation=instrumentation, parse_workers=parse_workers)
+        finally:
+            store.close()
+    except Exception as e:
+        print(f"Error in crawl_website: {e}")
+        if instrumentation is not None:
+            instrumentation.record_error(url, e)
+        return []
+
+
+class IncrementalAnalysis:
+    """
+    クロール中に届いたページから、暫定のスコアとキーワード出現数を逐次集計するクラス
+    （全ページを保持せず、スコアの合計とキーワードごとの件数だけを更新する）
+    """
+
+    def __init__(self, keywords):
+        self.keywords = list(keywords)
+        self.matcher = KeywordMatcher(self.keywords) if self.keywords else None
+        self.page_count = 0
+        self.score_sums = dict.fromkeys(SCORE_COLUMNS, 0)
+        self.keyword_hits = {keyword: {'pages': 0, 'count': 0} for keyword in self.keywords}
+        self._pending = []
+
+    def add_page(self, page_data):
+        self._pending.append(page_data)
+        if self.matcher is None:
+            return
+        field_counts, _ = self.matcher.match_page(page_data)
+        for keyword, fields in zip(self.keywords, field_counts):
+            count = sum(fields[field] for field in TOTAL_FIELDS)
+            if count:
+                self.keyword_hits[keyword]['pages'] += 1
+                self.keyword_hits[keyword]['count'] += count
+
+    def _flush(self):
+        # 前回の集計以降に届いたページのスコアをまとめて計算する
+        if not self._pending:
+            return
+        frame = build_page_frame(self._pending)
+        scores = score_frame(frame, *draw_random_components(len(frame)))
+        for column in SCORE_COLUMNS:
+            self.score_sums[column] += int(scores[column].sum())
+        self.page_count += len(frame)
+        self._pending = []
+
+    def metrics(self):
+        """
+        現時点の集計結果
+        戻り値: {'pages': ページ数, 'scores': {列: 平均スコア}, 'keyword_hits': {キーワード: {'pages', 'count'}}}
+        """
+        self._flush()
+        return {
+            'pages': self.page_count,
+            'scores': {column: total / max(1, self.page_count) for column, total in self.score_sums.items()},
+            'keyword_hits': {keyword: dict(hits) for keyword, hits in self.keyword_hits.items()}
+        }
+
+
+def _open_crawl(store, start_url, max_pages, max_age=None):
+    """
+    保存に使うクロールIDを決める（max_age秒以内に完了した同じ条件のクロールがあれば再利用する）
+    戻り値: (クロールID, 再利用するか)
+    """
+    crawl_id = store.find_recent(start_url, max_pages, max_age) if max_age else None
+    if crawl_id is not None:
+        return crawl_id, True
+    return resolve_crawl_id(store, start_url, max_pages), False
+
+
+def _schedule_competitors(scheduler, store, url, competitor_urls, max_pages, max_age, respect_robots, use_sitemaps):
+    """
+    競合サイトのクロールをスケジューラーに登録する（主サイトと同じサイト・重複するサイトは除く）
+    url: 主サイトのURL（Noneの場合は競合サイトだけを登録する）
+    戻り値: {競合サイトのURL（引数のとおり）: クロールID}
+    """
+    start_urls = {prepare_start_url(url)} if url else set()
+    crawl_ids = {}
+    for competitor in competitor_urls:
+        start_url = prepare_start_url(competitor)
+        if start_url in start_urls:
+            continue
+        start_urls.add(start_url)
+        crawl_id, reused = _open_crawl(store, start_url, max_pages, max_age)
+        crawl_ids[competitor] = crawl_id
+        if not reused:
+            scheduler.add_site(start_url, max_pages=max_pages, store=store, crawl_id=crawl_id,
+                               respect_robots=respect_robots, use_sitemaps=use_sitemaps)
+    return crawl_ids
+
+
+def crawl_with_competitors(url, competitor_urls, max_pages=10, competitor_max_pages=None, max_workers=8,
+                           requests_per_second=10.0, store_path=DEFAULT_STORE_PATH, cache_dir=DEFAULT_CACHE_DIR,
+                           respect_robots=True, use_sitemaps=True, max_age=None, time_budget=None,
+                           instrumentation=None, parse_workers=0):
+    """
+    主サイトと競合サイトを1つのスケジューラーで同時にクロールする関数
+    max_workers: サイトごとの同時接続数（全体ではサイト数倍のワーカーを共有する）
+    competitor_max_pages: 競合サイトごとの最大ページ数（省略時はmax_pages）
+    max_age: この秒数以内に完了した同じ条件のクロールがあれば、再クロールせずにその結果を使う
+    time_budget: 全サイト合計の制限時間（秒）。超えた時点で取得済みのページを使う
+    instrumentation: Instrumentation（主サイトの取得結果とクロールの所要時間を記録する）
+    parse_workers: crawl_websiteと同じ（全サイトで解析プロセスを共有する）
+    戻り値: (主サイトのStoredPages, {競合サイトのURL: StoredPages})（失敗した場合は([], {})）
+    """
+    try:
+        store = CrawlStore(store_path)
+        try:
+            start_url = prepare_start_url(url)
+            scheduler = CrawlScheduler(max_workers=max_workers * (1 + len(competitor_urls)),
+                                       requests_per_second=requests_per_second, cache_dir=cache_dir,
+                                       max_host_workers=max_workers, time_budget=time_budget,
+                                       parse_workers=parse_workers)
+            crawl_id, reused = _open_crawl(store, start_url, max_pages, max_age)
+            if not reused:
+                scheduler.add_site(start_url, max_pages=max_pages, store=store, crawl_id=crawl_id,
+                                   respect_robots=respect_robots, use_sitemaps=use_sitemaps,
+                                   instrumentation=instrumentation)
+            competitor_crawls = _schedule_competitors(scheduler, store, url, competitor_urls,
+                                                      competitor_max_pages or max_pages, max_age,
+                                                      respect_robots, use_sitemaps)
+            with measure_stage(instrumentation, 'crawl'):
+                for _ in scheduler.run():
+                    pass
+        finally:
+            store.close()
+        return StoredPages(store_path, crawl_id), {
+            competitor: StoredPages(store_path, competitor_id) for competitor, competitor_id in competitor_crawls.items()
+        }
+    except Exception as e:
+        print(f"Error in crawl_with_competitors: {e}")
+        if instrumentation is not None:
+            instrumentation.record_error(url, e)
+        return [], {}
+
+
+def crawl_competitors(competitor_urls, max_pages=10, max_workers=8, requests_per_second=10.0,
+                      store_path=DEFAULT_STORE_PATH, cache_dir=DEFAULT_CACHE_DIR, respect_robots=True,
+                      use_sitemaps=True, max_age=None, time_budget=None, parse_workers=0):
+    """
+    競合サイトだけを1つのスケジューラーで同時にクロールする関数
+    複数サイトを別々のプロセスで分析する場合に、競合サイトを先に1回だけ取得するために使う
+    引数はcrawl_with_competitorsと同じ（max_pagesは競合サイトごとの最大ページ数）
+    戻り値: {競合サイトのURL: StoredPages}（失敗した場合は{}）
+    """
+    try:
+        store = CrawlStore(store_path)
+        try:
+            scheduler = CrawlScheduler(max_workers=max_workers * max(1, len(competitor_urls)),
+                                       requests_per_second=requests_per_second, cache_dir=cache_dir,
+                                       max_host_workers=max_workers, time_budget=time_budget,
+                                       parse_workers=parse_workers)
+            competitor_crawls = _schedule_competitors(scheduler, store, None, competitor_urls, max_pages, max_age,
+                                                      respect_robots, use_sitemaps)
+            for _ in scheduler.run():
+                pass
+        finally:
+            store.close()
+        return {competitor: StoredPages(store_path, competitor_id)
+                for competitor, competitor_id in competitor_crawls.items()}
+    except Exception as e:
+        print(f"Error in crawl_competitors: {e}")
+        return {}
+
+
+def stream_crawl(url, keywords=(), max_pages=10, max_workers=8, requests_per_second=10.0,
+                 store_path=DEFAULT_STORE_PATH, cache_dir=DEFAULT_CACHE_DIR, cancel=None,
+                 update_interval=0.5, max_age=None, respect_robots=True, use_sitemaps=True,
+                 instrumentation=None, competitor_urls=(), competitor_max_pages=None, time_budget=None,
+                 parse_workers=0):
+    """
+    クロールしながら進捗と暫定の集計結果を順に返すジェネレータ
+    cancel: threading.Event（セットされると新しいリクエストを止めて終了する）
+    update_interval: 進捗を返す最短間隔（秒）
+    max_age: この秒数以内に完了した同じ条件のクロールがあれば、再クロールせずにその結果を使う
+    respect_robots, use_sitemaps, instrumentation, parse_workers: crawl_websiteと同じ
+    competitor_urls, competitor_max_pages, time_budget: crawl_with_competitorsと同じ（競合サイトも同時にクロールする）
+    戻り値: {'crawl_id', 'competitor_crawls', 'pages_data', 'visited', 'competitor_visited', 'max_pages',
+            'last_url', 'done', 'cancelled', 'metrics'}を順に返す
+            （最後の要素はdone=Trueで、'competitor_pages'（{競合サイトのURL: StoredPages}）を含む。
+            途中でclose()した場合も取得済みのページはストアに残る）
+    """
+    start_url = prepare_start_url(url)
+    competitor_urls = list(competitor_urls)
+    store = CrawlStore(store_path)
+    try:
+        scheduler = CrawlScheduler(max_workers=max_workers * (1 + len(competitor_urls)),
+                                   requests_per_second=requests_per_second, cache_dir=cache_dir,
+                                   max_host_workers=max_workers, time_budget=time_budget, cancel=cancel,
+                                   parse_workers=parse_workers)
+        crawl_id, reused = _open_crawl(store, start_url, max_pages, max_age)
+        if not reused:
+            scheduler.add_site(start_url, max_pages=max_pages, store=store, crawl_id=crawl_id,
+                               respect_robots=respect_robots, use_sitemaps=use_sitemaps,
+                               instrumentation=instrumentation)
+        competitor_crawls = _schedule_competitors(scheduler, store, url, competitor_urls,
+                                                  competitor_max_pages or max_pages, max_age,
+                                                  respect_robots, use_sitemaps)
+
+        # 再開・再利用したクロールの保存済みページも集計に含める
+        incremental = IncrementalAnalysis(keywords)
+        for page_data in StoredPages(store_path, crawl_id):
+            incremental.add_page(page_data)
+
+        progress = {
+            'crawl_id': crawl_id,
+            'competitor_crawls': competitor_crawls,
+            'visited': store.visited_count(crawl_id),
+            'competitor_visited': sum(store.visited_count(competitor_id) for competitor_id in competitor_crawls.values()),
+            'max_pages': max_pages,
+            'last_url': None,
+            'done': False,
+            'cancelled': False
+        }
+
+        if scheduler.sites:
+            site_visited = {}
+            last_update = 0.0
+            crawl_started = time.perf_counter()
+            paused = 0.0
+            try:
+                for event in scheduler.run():
+                    if event['site'] == start_url:
+                        if event['page_data'] is not None:
+                            incremental.add_page(event['page_data'])
+                        progress['visited'] = event['visited']
+                        progress['last_url'] = event['url']
+                    else:
+                        site_visited[event['site']] = event['visited']
+                        progress['competitor_visited'] = sum(site_visited.values())
+                    if time.monotonic() - last_update >= update_interval:
+                        last_update = time.monotonic()
+                        yielded = time.perf_counter()
+                        yield dict(progress, pages_data=StoredPages(store_path, crawl_id),
+                                   metrics=incremental.metrics())
+                        paused += time.perf_counter() - yielded
+            finally:
+                # 呼び出し側で進捗を描画していた時間はクロールの時間に含めない
+                if instrumentation is not None:
+                    instrumentation.add_stage_time('crawl', time.perf_counter() - crawl_started - paused)
+
+        cancelled = cancel is not None and cancel.is_set()
+        yield dict(progress, done=True, cancelled=cancelled,
+                   pages_data=StoredPages(store_path, crawl_id), metrics=incremental.metrics(),
+                   competitor_pages={competitor: StoredPages(store_path, competitor_id)
+                                     for competitor, competitor_id in competitor_crawls.items()})
+    finally:
+        store.close()
+
+
+def analyze_keywords(pages_data, keywords, provider=None):
+    """
+    キーワードの出現頻度と関連性を分析する関数
+    provider: 検索ボリューム・順位・難易度を取得するMetricsProvider（省略時は決定的なスタブ）
+    """
+    if provider is None:
+        provider = StubProvider()
+    keywords = list(dict.fromkeys(keywords))
+    keyword_analysis = {}
+
+    # 全キーワードをタイトル・見出し・本文に対して一括でマッチング
+    keyword_matches = match_keywords(pages_data, keywords)
+
+    # 検索ボリューム・順位・難易度と順位の推移を全キーワード分まとめて取得
+    metrics = provider.keyword_metrics(keywords)
+    today = datetime.now()
+    dates = [(today - timedelta(days=i)).strftime('%Y-%m-%d') for i in range(RANK_HISTORY_DAYS, 0, -1)]
+
+    # クロール時に保存した転置インデックスがあれば、BM25で関連ページを順位付け
+    index = SearchIndex(pages_data.path, pages_data.crawl_id) if isinstance(pages_data, StoredPages) else None
+
+    for keyword, row in zip(keywords, metrics.itertuples(index=False)):
+        rankings = row.rankings if isinstance(row.rankings, list) else []
+        keyword_analysis[keyword] = {
+            'matches': keyword_matches[keyword],
+            'search_volume': _metric_value(row.search_volume),
+            'current_rank': _metric_value(row.current_rank),
+            'rankings': rankings,
+            'dates': dates[len(dates) - len(rankings):],
+            'difficulty': _metric_value(row.difficulty),
+            'source': row.source if isinstance(row.source, str) else None,
+            'top_pages': index.search(keyword, limit=10) if index else []
+        }
+
+    if index:
+        index.close()
+
+    return keyword_analysis
+
+
+def page_keywords(pages_data, url, keywords):
+    """
+    指定したページがカバーしているキーワードを、クロール時に保存した転置インデックスのBM25スコア順に返す関数
+    戻り値: [(キーワード, スコア), ...]（インデックスがない場合・ページが見つからない場合は空のリスト）
+    """
+    if not isinstance(pages_data, StoredPages) or not keywords:
+        return []
+    with SearchIndex(pages_data.path, pages_data.crawl_id) as index:
+        return index.keywords_for_page(url, list(dict.fromkeys(keywords)))
+
+
+def _metric_value(value):
+    """
+    指標をintに変換する（不明な指標はNone）
+    """
+    return None if value is None or value != value else int(value)
+
+
+def summarize_site(page_frame, seo_scores, link_summary, duplicates, keyword_matches):
+    """
+    サイトの分析結果を競合比較用の概要にまとめる関数
+    戻り値: ページ数・平均スコア・リンク構造・重複ページ数・キーワードの出現ページ数の辞書（JSONに変換できる）
+    """
+    pages = len(page_frame)
+
+    def mean(values):
+        return round(float(sum(values)) / pages, 1) if pages else 0.0
+
+    return {
+        'pages': pages,
+        'seo_score': mean(seo_scores['total']),
+        'content_score': mean(seo_scores['content']),
+        'technical_score': mean(seo_scores['internal']),
+        'avg_word_count': mean(page_frame['word_count']),
+        'avg_depth': round(link_summary['avg_depth'], 2),
+        'orphans': link_summary['orphans'],
+        'duplicate_pages': sum(len(cluster['urls']) for cluster in duplicates),
+        'keyword_pages': {keyword: len(matches) for keyword, matches in keyword_matches.items()}
+    }
+
+
+def competitor_snapshot(pages_data, keywords):
+    """
+    競合サイトのクロール結果を主サイトと同じ処理（スコア・リンク構造・重複・キーワード）で集計する関数
+    StoredPagesの場合は集計結果をストアに保存し、同じページ数・キーワードでは保存した結果を返す
+    """
+    key = f"competitor:{len(pages_data)}:{json.dumps(list(keywords), ensure_ascii=False)}"
+    store = CrawlStore(pages_data.path) if isinstance(pages_data, StoredPages) else None
+    try:
+        if store is not None:
+            snapshot = store.load_snapshot(pages_data.crawl_id, key)
+            if snapshot is not None:
+                return snapshot
+
+        page_frame = build_page_frame(pages_data)
+        link_graph = build_link_graph(pages_data)
+        link_metrics = link_graph.page_metrics()
+        # 比較結果が表示のたびに変わらないよう、スコアのランダム要素は固定する
+        seo_scores = calculate_seo_scores(page_frame, random_state=0, link_metrics=link_metrics)
+        duplicates, _ = find_duplicates(pages_data)
+        snapshot = summarize_site(page_frame, seo_scores, link_graph.summary(link_metrics), duplicates,
+                                  match_keywords(pages_data, keywords))
+
+        if store is not None:
+            store.save_snapshot(pages_data.crawl_id, key, snapshot)
+        return snapshot
+    finally:
+        if store is not None:
+            store.close()
+
+
+def analyze_competitors(competitor_urls, keywords, provider=None, competitor_pages=None):
+    """
+    競合サイトの基本的な分析を行う関数
+    provider: ドメインの指標と検索順位を取得するMetricsProvider（省略時は決定的なスタブ）
+    competitor_pages: {競合サイトのURL: クロール結果}（クロールしたサイトはスコアを実際のページから計算する）
+    """
+    if provider is None:
+        provider = StubProvider()
+    competitor_urls = list(dict.fromkeys(competitor_urls))
+    keywords = list(dict.fromkeys(keywords))
+    competitor_pages = competitor_pages or {}
+
+    # 競合サイトの指標とキーワードごとの順位を全サイト分まとめて取得
+    domains = provider.domain_metrics(competitor_urls)
+    ranks = provider.keyword_ranks(competitor_urls, keywords)
+
+    competitor_data = {}
+    for url in competitor_urls:
+        row = domains.loc[url]
+        competitor_data[url] = {column: _metric_value(row[column]) for column in DOMAIN_COLUMNS}
+        competitor_data[url]["source"] = row['source'] if isinstance(row['source'], str) else None
+        competitor_data[url]["keyword_ranks"] = {
+            keyword: _metric_value(rank) for keyword, rank in zip(keywords, ranks.loc[url].to_numpy())
+        }
+
+        # クロールできたサイトは、スコアをクロール結果の集計で置き換える
+        pages_data = competitor_pages.get(url)
+        competitor_data[url]["crawled"] = bool(pages_data)
+        if pages_data:
+            competitor_data[url].update(competitor_snapshot(pages_data, keywords))
+
+    return competitor_data
+
+
+def crawl_coverage(pages_data, link_graph, link_metrics):
+    """
+    クロール時に取得したrobots.txt・サイトマップとクロール結果の差分を集計する関数
+    戻り値: sitemaps.coverage_reportの結果（ストアに取得結果がない場合はNone）
+    """
+    if not isinstance(pages_data, StoredPages):
+        return None
+    store = CrawlStore(pages_data.path)
+    try:
+        info = store.load_info(pages_data.crawl_id)
+        sitemap_entries = store.sitemap_entries(pages_data.crawl_id)
+    finally:
+        store.close()
+    if not info:
+        return None
+    return coverage_report(info, sitemap_entries, link_metrics['url'], link_graph.linked_urls())
+
+
+def analyze_pages(pages_data, keywords, competitor_urls=(), instrumentation=None, provider=None,
+                  competitor_pages=None):
+    """
+    クロール結果に対してスコア計算・キーワード分析・改善提案・競合分析を実行する関数
+    provider: 検索ボリューム・順位・被リンクなどの指標を取得するMetricsProvider（省略時は決定的なスタブ）
+    competitor_pages: {競合サイトのURL: クロール結果}（analyze_competitorsと同じ）
+    instrumentation: Instrumentation（クロール時の計測結果に、各処理段階の所要時間を加える。省略時は新規作成）
+    戻り値: 各分析結果をまとめた辞書
+    """
+    if instrumentation is None:
+        instrumentation = Instrumentation()
+    if provider is None:
+        provider = StubProvider()
+    stage = instrumentation.stage
+
+    # 列指向のページテーブルと内部リンクグラフを作成し、SEOスコアをまとめて計算
+    with stage('page_frame'):
+        page_frame = build_page_frame(pages_data)
+    with stage('link_graph'):
+        link_graph = build_link_graph(pages_data)
+        link_metrics = link_graph.page_metrics()
+    with stage('scoring'):
+        seo_scores = calculate_seo_scores(page_frame, link_metrics=link_metrics)
+    with stage('coverage'):
+        coverage = crawl_coverage(pages_data, link_graph, link_metrics)
+
+    # 重複・類似コンテンツのクラスタを検出し、canonicalの判定結果をページテーブルに加える
+    with stage('duplicates'):
+        duplicates, duplicate_frame = find_duplicates(pages_data)
+        for column in DUPLICATE_COLUMNS:
+            page_frame[column] = duplicate_frame[column].to_numpy()
+
+    # キーワード分析
+    with stage('keywords'):
+        keyword_analysis = analyze_keywords(pages_data, keywords, provider)
+
+    # 改善ルールの評価と改善提案の生成
+    with stage('improvements'):
+        page_issues = find_page_issues(page_frame)
+        improvements = generate_improvements(page_frame, keyword_analysis, page_issues, coverage, duplicates)
+
+    # 競合分析（設定されている場合）
+    competitor_data = {}
+    if competitor_urls:
+        with stage('competitors'):
+            competitor_data = analyze_competitors(competitor_urls, keywords, provider, competitor_pages)
+
+    link_summary = link_graph.summary(link_metrics)
+    return {
+        'pages_data': pages_data,
+        'page_frame': page_frame,
+        'seo_scores': seo_scores,
+        'link_metrics': link_metrics,
+        'link_summary': link_summary,
+        'site_summary': summarize_site(page_frame, seo_scores, link_summary, duplicates,
+                                       {keyword: data['matches'] for keyword, data in keyword_analysis.items()}),
+        'coverage': coverage,
+        'duplicates': duplicates,
+        'keyword_analysis': keyword_analysis,
+        'improvements': improvements,
+        'page_issues': page_issues,
+        'competitor_data': competitor_data,
+        'instrumentation': instrumentation
+    }
+
+
+def run_analysis(url, keywords, competitor_urls=(), max_pages=10, max_workers=8, requests_per_second=10.0,
+                 store_path=DEFAULT_STORE_PATH, cache_dir=DEFAULT_CACHE_DIR, respect_robots=True,
+                 use_sitemaps=True, provider=None, competitor_max_pages=None, time_budget=None, parse_workers=0,
+                 competitor_pages=None):
+    """
+    サイトのクロールから改善提案までを一括で実行する関数
+    provider: 検索ボリューム・順位・被リンクなどの指標を取得するMetricsProvider（省略時は決定的なスタブ）
+    competitor_urls: 競合サイト（主サイトと同時にクロールして比較する）
+    competitor_pages: {競合サイトのURL: クロール結果}（crawl_competitorsで取得済みの場合に指定し、主サイトだけをクロールする）
+    competitor_max_pages, time_budget: crawl_with_competitorsと同じ
+    parse_workers: crawl_websiteと同じ
+    戻り値: analyze_pagesの結果（クロールに失敗した場合はNone）
+    """
+    instrumentation = Instrumentation()
+    if competitor_urls and competitor_pages is None:
+        pages_data, competitor_pages = crawl_with_competitors(
+            url, competitor_urls, max_pages=max_pages, competitor_max_pages=competitor_max_pages,
+            max_workers=max_workers, requests_per_second=requests_per_second, store_path=store_path,
+            cache_dir=cache_dir, respect_robots=respect_robots, use_sitemaps=use_sitemaps,
+            time_budget=time_budget, instrumentation=instrumentation, parse_workers=parse_workers
+        )
+    else:
+        pages_data = crawl_website(url, max_pages=max_pages, max_workers=max_workers,
+                                   requests_per_second=requests_per_second,
+                                   store_path=store_path, cache_dir=cache_dir,
+                                   respect_robots=respect_robots, use_sitemaps=use_sitemaps,
+                                   instrumentation=instrumentation, parse_workers=parse_workers)
+    if not pages_data:
+        return None
+    return analyze_pages(pages_data, keywords, competitor_urls, instrumentation=instrumentation, provider=provider,
+                         competitor_pages=competitor_pages)
@@ -0,0 +1,152 @@
+"""
+XMLサイトマップのストリーミング解析
+サイトマップインデックスとgzip圧縮されたサイトマップをiterparseで逐次解析し、
+ファイル全体をメモリに読み込まずにURL・優先度・最終更新日を取り出す
+"""
+import gzip
+import io
+from collections import deque
+from xml.etree import ElementTree
+from urllib.parse import urlparse
+
+from crawl_store import STATE_BLOCKED
+from frontier import clean_url, normalize_url, url_host
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+# 1回のクロールで読み込むサイトマップファイル数の上限
+MAX_SITEMAP_FILES = 1000
+
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def default_sitemap_url(url):
+    parsed = urlparse(url)
+    return f'{parsed.scheme}://{parsed.netloc}/sitemap.xml'
+
+
+def _parse_priority(value):
+    try:
+        return min(1.0, max(0.0, float(value)))
+    except (TypeError, ValueError):
+        return 0.5
+
+
+def parse_sitemap(stream):
+    """
+    サイトマップ（またはサイトマップインデックス）を逐次解析するジェネレータ
+    stream: バイナリのファイルオブジェクト
+    戻り値: ('url', URL, 優先度, 最終更新日) または ('sitemap', サイトマップURL, None, None) を順に返す
+    """
+    context = ElementTree.iterparse(stream, events=('start', 'end'))
+    _, root = next(context)
+
+    for event, elem in context:
+        if event != 'end':
+            continue
+        name = _local_name(elem.tag)
+        if name not in ('url', 'sitemap'):
+            continue
+
+        fields = {_local_name(child.tag): (child.text or '').strip() for child in elem}
+        loc = fields.get('loc')
+        if loc:
+            if name == 'url':
+                yield 'url', loc, _parse_priority(fields.get('priority')), fields.get('lastmod') or None
+            else:
+                yield 'sitemap', loc, None, None
+
+        # 処理済みの要素を破棄してメモリ使用量を一定に保つ
+        root.clear()
+
+
+def open_sitemap(response):
+    """
+    ストリーミングのレスポンスから読み込み用のストリームを作成する（gzipは自動で展開）
+    """
+    response.raw.decode_content = True
+    # 読み終えた時点でurllib3がストリームを閉じないようにする（BufferedReaderの先読みのため）
+    response.raw.auto_close = False
+    stream = io.BufferedReader(response.raw)
+    if stream.peek(2)[:2] == GZIP_MAGIC:
+        return gzip.GzipFile(fileobj=stream)
+    return stream
+
+
+def iter_sitemap_urls(client, sitemap_urls, base_domain, limiter=None, timeout=10, max_urls=50000):
+    """
+    サイトマップ（インデックスを含む）をたどり、クロール対象ホストのURLを順に返すジェネレータ
+    sitemap_urls: 起点のサイトマップURL（robots.txtのSitemap行など）
+    limiter: HostRateLimiter（指定するとサイトマップの取得にもレート制限を適用する）
+    max_urls: 返すURL数の上限
+    戻り値: (URL（clean_url）, 優先度, 最終更新日) を順に返す
+    """
+    queue = deque(dict.fromkeys(sitemap_urls))
+    fetched = set()
+    count = 0
+
+    while queue and count < max_urls and len(fetched) < MAX_SITEMAP_FILES:
+        sitemap_url = queue.popleft()
+        if sitemap_url in fetched:
+            continue
+        fetched.add(sitemap_url)
+
+        host = url_host(sitemap_url)
+        if limiter is not None:
+            limiter.acquire(host)
+        try:
+            response = client.stream(sitemap_url, timeout=timeout)
+        except Exception as e:
+            print(f"Error fetching sitemap {sitemap_url}: {e}")
+            continue
+        finally:
+            if limiter is not None:
+                limiter.release(host)
+
+        try:
+            if response.status_code != 200:
+                continue
+            for kind, loc, priority, lastmod in parse_sitemap(open_sitemap(response)):
+                if kind == 'sitemap':
+                    queue.append(loc)
+                    continue
+                url = clean_url(loc)
+                if url_host(url) != base_domain:
+                    continue
+                yield url, priority, lastmod
+                count += 1
+                if count >= max_urls:
+                    break
+        except (ElementTree.ParseError, OSError, EOFError) as e:
+            print(f"Error parsing sitemap {sitemap_url}: {e}")
+        finally:
+            response.close()
+
+
+def coverage_report(info, sitemap_entries, page_urls, linked_urls):
+    """
+    サイトマップとクロール結果の差分（カバレッジの欠落）を集計する関数
+    info: クロール時のrobots.txt・サイトマップの情報（CrawlStore.load_info）
+    sitemap_entries: [(URL, 優先度, 最終更新日, フロンティアの状態), ...]
+    page_urls: 取得できたページのURL
+    linked_urls: 取得したページから内部リンクされているURL
+    """
+    # 表記ゆれ（末尾スラッシュなど）は正規化したURLで同じURLとして比較する
+    sitemap_urls = {normalize_url(entry[0]): entry[0] for entry in sitemap_entries}
+    page_urls = list(page_urls)
+    linked_urls = {normalize_url(url) for url in linked_urls}
+
+    return {
+        'robots_found': bool(info.get('robots_found')),
+        'crawl_delay': info.get('crawl_delay'),
+        'sitemaps': info.get('sitemaps', []),
+        'sitemap_urls': len(sitemap_urls),
+        # サイトマップにあるが、robots.txtでクロールが禁止されているURL
+        'sitemap_blocked': sorted(url for url, _, _, state in sitemap_entries if state == STATE_BLOCKED),
+        # サイトマップにあるが、どのページからも内部リンクされていないURL
+        'sitemap_not_linked': sorted(url for key, url in sitemap_urls.items() if key not in linked_urls),
+        # 取得できたが、サイトマップに含まれていないページ
+        'pages_not_in_sitemap': [url for url in page_urls if normalize_url(url) not in sitemap_urls] if sitemap_urls else []
+    }
@@ -0,0 +1,7 @@
+"""
+テストからリポジトリ直下のモジュール（scoring.pyなど）をインポートできるようにする
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,144 @@
+"""
+SimHashによる重複・類似ページのクラスタリングとcanonicalの判定
+"""
+import numpy as np
+
+from duplicates import HAMMING_THRESHOLD, cluster_fingerprints, find_duplicates, hamming_distance, simhash
+
+
+def article(seed, words=400):
+    """
+    シードごとに異なる本文（語彙2000語からランダムに並べる）
+    """
+    rng = np.random.RandomState(seed)
+    return ' '.join(f'word{i}' for i in rng.randint(0, 2000, words))
+
+
+def page(url, body_text, canonical=''):
+    return {'url': url, 'body_text': body_text, 'canonical': canonical}
+
+
+def test_simhash_is_deterministic_and_none_for_empty_text():
+    text = article(1)
+    assert simhash(text) == simhash(text)
+    assert 0 <= simhash(text) < 2 ** 64
+    assert simhash('') is None
+
+
+def test_near_identical_text_is_close_and_distinct_text_is_far():
+    base = article(1)
+    edited = base.replace(base.split()[200], 'changed', 1)
+    with_footer = base + ' copyright footer 2024'
+
+    assert hamming_distance(simhash(base), simhash(edited)) <= HAMMING_THRESHOLD
+    assert hamming_distance(simhash(base), simhash(with_footer)) <= HAMMING_THRESHOLD
+    assert hamming_distance(simhash(base), simhash(article(2))) > HAMMING_THRESHOLD * 4
+
+
+def test_find_duplicates_clusters_near_identical_pages_only():
+    base = article(1)
+    pages = [
+        page('https://example.com/a', base),
+        page('https://example.com/other', article(2)),
+        page('https://example.com/a-copy', base.replace(base.split()[100], 'changed', 1)),
+        page('https://example.com/a-print', base + ' print version'),
+        page('https://example.com/third', article(3)),
+        page('https://example.com/empty', ''),
+        page('https://example.com/empty-2', ''),
+    ]
+
+    clusters, frame = find_duplicates(pages)
+
+    assert [cluster['urls'] for cluster in clusters] == [
+        ['https://example.com/a', 'https://example.com/a-copy', 'https://example.com/a-print']
+    ]
+    # 本文が空のページは重複として扱わない
+    assert frame['duplicate_cluster'].tolist() == [0, -1, 0, 0, -1, -1, -1]
+
+
+def test_exact_duplicates_form_one_cluster():
+    text = article(5)
+    clusters, _ = find_duplicates([page(f'https://example.com/{i}', text) for i in range(4)])
+    assert len(clusters) == 1
+    assert len(clusters[0]['urls']) == 4
+
+
+def test_consistent_canonical_is_not_reported():
+    text = article(1)
+    pages = [
+        page('https://example.com/a/', text),
+        page('https://example.com/a?utm_source=mail', text, canonical='https://example.com/a'),
+        page('https://example.com/a-copy', text, canonical='https://example.com/a/'),
+    ]
+
+    clusters, frame = find_duplicates(pages)
+
+    # 末尾スラッシュなどの表記ゆれは同じ正規URLとみなす
+    assert clusters[0]['consistent']
+    assert clusters[0]['canonical'] == 'https://example.com/a'
+    assert not frame['canonical_missing'].any()
+    assert not frame['canonical_inconsistent'].any()
+
+
+def test_missing_and_inconsistent_canonicals_are_reported():
+    text = article(1)
+    pages = [
+        page('https://example.com/a', text),
+        page('https://example.com/b', text, canonical='https://example.com/a'),
+        page('https://example.com/c', text, canonical='https://example.com/a'),
+        page('https://example.com/d', text),
+        page('https://example.com/e', text, canonical='https://example.com/e'),
+    ]
+
+    clusters, frame = find_duplicates(pages)
+
+    cluster = clusters[0]
+    assert not cluster['consistent']
+    assert cluster['canonical'] == 'https://example.com/a'
+    # 正規URLのページ自身はcanonicalがなくても問題としない
+    assert cluster['canonical_missing'] == ['https://example.com/d']
+    assert cluster['canonical_inconsistent'] == ['https://example.com/e']
+    assert frame['canonical_missing'].tolist() == [False, False, False, True, False]
+    assert frame['canonical_inconsistent'].tolist() == [False, False, False, False, True]
+
+
+def brute_force_clusters(fingerprints, threshold):
+    """
+    全ペアを比較して、距離がthreshold以下のページを推移的にまとめる（LSHの結果と比較する基準）
+    """
+    parent = list(range(len(fingerprints)))
+
+    def find(item):
+        while parent[item] != item:
+            item = parent[item]
+        return item
+
+    for a in range(len(fingerprints)):
+        for b in range(a + 1, len(fingerprints)):
+            if hamming_distance(fingerprints[a], fingerprints[b]) <= threshold:
+                parent[max(find(a), find(b))] = min(find(a), find(b))
+    clusters = {}
+    for index in range(len(fingerprints)):
+        clusters.setdefault(find(index), []).append(index)
+    result = [members for members in clusters.values() if len(members) > 1]
+    return sorted(result, key=lambda members: (-len(members), members[0]))
+
+
+def test_lsh_finds_every_pair_within_the_threshold():
+    rng = np.random.RandomState(0)
+    fingerprints = []
+    for _ in range(300):
+        fingerprint = int(rng.randint(0, 2 ** 63, dtype=np.int64)) << 1 | int(rng.randint(0, 2))
+        fingerprints.append(fingerprint)
+        # 距離1〜HAMMING_THRESHOLDの近いページと、距離が閾値を超えるページを加える
+        for flips in (int(rng.randint(1, HAMMING_THRESHOLD + 1)), HAMMING_THRESHOLD + 1):
+            near = fingerprint
+            for bit in rng.choice(64, size=flips, replace=False):
+                near ^= 1 << int(bit)
+            fingerprints.append(near)
+
+    assert cluster_fingerprints(fingerprints) == brute_force_clusters(fingerprints, HAMMING_THRESHOLD)
+
+
+def test_cluster_fingerprints_skips_missing_fingerprints():
+    assert cluster_fingerprints([None, 5, None, 5, 7 << 40]) == [[1, 3]]
@@ -0,0 +1,118 @@
+"""
+URLの正規化（訪問済み判定のキー）・取得用URL・フロンティアの重複判定
+"""
+import pytest
+
+from frontier import URLFrontier, SeenSet, clean_url, normalize_url, url_host
+
+
+@pytest.mark.parametrize('url, expected', [
+    # 末尾スラッシュ（ルートは'/'のまま）
+    ('https://example.com/a/', 'https://example.com/a'),
+    ('https://example.com/a', 'https://example.com/a'),
+    ('https://example.com', 'https://example.com/'),
+    ('https://example.com/', 'https://example.com/'),
+    # フラグメント
+    ('https://example.com/a#section', 'https://example.com/a'),
+    ('https://example.com/a/#', 'https://example.com/a'),
+    # スキーム・ホストは小文字にし、パスの大文字小文字は区別する
+    ('HTTPS://Example.COM/A/B', 'https://example.com/A/B'),
+    # デフォルトポートは除き、それ以外のポートは残す
+    ('http://example.com:80/a', 'http://example.com/a'),
+    ('https://example.com:443/a', 'https://example.com/a'),
+    ('https://example.com:80/a', 'https://example.com:80/a'),
+    ('http://example.com:8080/a/', 'http://example.com:8080/a'),
+    # クエリはソートし、トラッキングパラメータを除く（空の値は残す）
+    ('https://example.com/a?b=2&a=1', 'https://example.com/a?a=1&b=2'),
+    ('https://example.com/a?utm_source=x&b=2&gclid=1&a=1', 'https://example.com/a?a=1&b=2'),
+    ('https://example.com/a?UTM_Medium=x', 'https://example.com/a'),
+    ('https://example.com/a?x=&y=1', 'https://example.com/a?x=&y=1'),
+    # ユーザー情報とIPv6の角括弧は残す
+    ('https://user:pw@Example.com/a', 'https://user:pw@example.com/a'),
+    ('http://[::1]:8080/x/', 'http://[::1]:8080/x'),
+    ('http://[::1]:80/x', 'http://[::1]/x'),
+    # 前後の空白
+    ('  https://example.com/a  ', 'https://example.com/a'),
+])
+def test_normalize_url(url, expected):
+    assert normalize_url(url) == expected
+
+
+@pytest.mark.parametrize('url, expected', [
+    # 取得用のURLはフラグメントだけを除き、末尾スラッシュ・ポート・クエリの順序はそのまま
+    ('https://example.com/a/#top', 'https://example.com/a/'),
+    ('https://example.com/a', 'https://example.com/a'),
+    ('HTTPS://Example.com:443/a?b=2&a=1&utm_source=x', 'https://Example.com:443/a?b=2&a=1&utm_source=x'),
+    ('https://example.com', 'https://example.com/'),
+    ('https://example.com?q=1', 'https://example.com/?q=1'),
+    (' https://example.com/a ', 'https://example.com/a'),
+])
+def test_clean_url(url, expected):
+    assert clean_url(url) == expected
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('https://Example.com/a', 'example.com'),
+    ('https://example.com:443/a', 'example.com'),
+    ('https://example.com:8443/a', 'example.com:8443'),
+    ('https://user:pw@example.com:8443/a', 'example.com:8443'),
+    ('http://[2001:db8::1]:8080/', '[2001:db8::1]:8080'),
+])
+def test_url_host(url, expected):
+    assert url_host(url) == expected
+
+
+def test_normalize_url_is_idempotent():
+    for url in ('https://Example.com:443/a/b/?z=1&a=&utm_campaign=c#f', 'http://[::1]:8080/', 'https://example.com'):
+        assert normalize_url(normalize_url(url)) == normalize_url(url)
+
+
+def test_frontier_merges_spellings_and_keeps_the_discovered_url():
+    frontier = URLFrontier()
+
+    assert frontier.push('https://example.com/a/') == 0
+    assert frontier.push('https://example.com/a') is None
+    assert frontier.push('https://EXAMPLE.com:443/a/#x') is None
+    assert frontier.push('https://example.com/a?utm_source=news') is None
+
+    # 取得には最初に発見した綴り（末尾スラッシュ付き）を使う
+    assert frontier.pop() == ('https://example.com/a/', 0, 0)
+    assert not frontier
+
+
+def test_frontier_orders_by_depth_priority_and_discovery():
+    frontier = URLFrontier()
+    frontier.push('https://example.com/deep', depth=2, priority=1.0)
+    frontier.push('https://example.com/low', depth=1, priority=0.1)
+    frontier.push('https://example.com/high', depth=1, priority=0.9)
+    frontier.push('https://example.com/same', depth=1, priority=0.9)
+
+    order = [frontier.pop()[0] for _ in range(len(frontier))]
+
+    assert order == ['https://example.com/high', 'https://example.com/same',
+                     'https://example.com/low', 'https://example.com/deep']
+
+
+def test_frontier_skip_and_restore_register_the_normalized_key():
+    frontier = URLFrontier()
+    assert frontier.skip('https://example.com/private/') == 0
+    assert frontier.push('https://example.com/private') is None
+
+    frontier.restore('https://example.com/done/', seq=5, queued=False)
+    frontier.restore('https://example.com/todo/', seq=3, depth=1)
+    assert frontier.push('https://example.com/done') is None
+    assert frontier.push('https://example.com/todo') is None
+    assert frontier.push('https://example.com/new') == 6
+    assert frontier.pop() == ('https://example.com/new', 0, 6)
+    assert frontier.pop() == ('https://example.com/todo/', 1, 3)
+
+
+def test_seen_set_keeps_members_after_switching_to_bloom():
+    seen = SeenSet(bloom_threshold=100)
+    urls = [f'https://example.com/page/{i}' for i in range(500)]
+    for url in urls:
+        seen.add(url)
+
+    assert seen.is_bloom
+    assert all(url in seen for url in urls)
+    assert len(seen) == len(urls)
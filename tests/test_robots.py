@@ -0,0 +1,149 @@
+"""
+robots.txtの解析（RFC 9309の最長一致・ワイルドカード）と、取得結果のステータスごとの扱い
+"""
+import pytest
+
+from robots import RobotsRules, fetch_robots, parse_robots, robots_url
+
+ROBOTS_TXT = """
+# コメントは無視する
+User-agent: *
+Disallow: /private
+Allow: /private/public
+Disallow: /*.pdf$
+Disallow: /search?
+Disallow: /*/admin
+Allow: /*/admin/help
+Crawl-delay: 2
+
+Sitemap: https://example.com/sitemap.xml
+"""
+
+
+@pytest.mark.parametrize('path, allowed', [
+    ('/', True),
+    ('/about', True),
+    # 長いAllowが短いDisallowより優先される
+    ('/private', False),
+    ('/private/x', False),
+    ('/private/public', True),
+    ('/private/public/a', True),
+    # 末尾の$はパスの終端、*は任意の文字列
+    ('/docs/a.pdf', False),
+    ('/docs/a.pdf?download=1', True),
+    ('/docs/a.pdfx', True),
+    ('/x/admin', False),
+    ('/x/y/admin/users', False),
+    ('/x/admin/help', True),
+    # クエリも照合に含める
+    ('/search?q=seo', False),
+    ('/search', True),
+])
+def test_longest_match_with_wildcards(path, allowed):
+    rules = parse_robots(ROBOTS_TXT)
+    assert rules.allowed(f'https://example.com{path}') is allowed
+
+
+def test_allow_wins_over_disallow_of_equal_length():
+    rules = parse_robots("User-agent: *\nDisallow: /page\nAllow: /page\n")
+    assert rules.allowed('https://example.com/page')
+
+
+def test_longest_rule_wins_regardless_of_order():
+    rules = parse_robots("User-agent: *\nAllow: /p\nDisallow: /\n")
+    assert rules.allowed('https://example.com/page')
+    assert not rules.allowed('https://example.com/other')
+
+
+def test_crawl_delay_and_sitemaps():
+    rules = parse_robots(ROBOTS_TXT)
+    assert rules.crawl_delay == 2.0
+    assert rules.sitemaps == ['https://example.com/sitemap.xml']
+    assert rules.found
+
+
+def test_specific_group_replaces_the_wildcard_group():
+    text = (
+        "User-agent: *\nDisallow: /\n\n"
+        "User-agent: seobot\nUser-agent: otherbot\nDisallow: /tmp\nCrawl-delay: 5\n"
+    )
+
+    generic = parse_robots(text)
+    assert not generic.allowed('https://example.com/page')
+
+    specific = parse_robots(text, user_agent='SEOBot/1.0')
+    assert specific.allowed('https://example.com/page')
+    assert not specific.allowed('https://example.com/tmp/x')
+    assert specific.crawl_delay == 5.0
+
+
+def test_empty_disallow_allows_everything():
+    rules = parse_robots("User-agent: *\nDisallow:\n")
+    assert rules.allowed('https://example.com/anything')
+
+
+def test_robots_url():
+    assert robots_url('https://example.com:8443/a/b?c=1') == 'https://example.com:8443/robots.txt'
+
+
+class FakeResponse:
+    def __init__(self, status_code, text=''):
+        self.status_code = status_code
+        self.text = text
+
+
+class FakeClient:
+    """
+    HttpClient.getの代わりに決まったレスポンス（または例外）を返す
+    """
+
+    def __init__(self, response=None, error=None):
+        self.response = response
+        self.error = error
+        self.urls = []
+
+    def get(self, url, timeout=10):
+        self.urls.append(url)
+        if self.error is not None:
+            raise self.error
+        return self.response
+
+
+def test_fetch_robots_parses_200():
+    client = FakeClient(FakeResponse(200, "User-agent: *\nDisallow: /private\n"))
+
+    rules = fetch_robots(client, 'https://example.com/page')
+
+    assert client.urls == ['https://example.com/robots.txt']
+    assert rules.found
+    assert not rules.allowed('https://example.com/private')
+    assert rules.allowed('https://example.com/page')
+
+
+@pytest.mark.parametrize('status', [400, 401, 403, 404, 410, 429])
+def test_fetch_robots_4xx_allows_everything(status):
+    rules = fetch_robots(FakeClient(FakeResponse(status)), 'https://example.com/')
+
+    assert not rules.found
+    assert not rules.disallow_all
+    assert rules.allowed('https://example.com/private')
+
+
+@pytest.mark.parametrize('status', [500, 502, 503, 504])
+def test_fetch_robots_5xx_disallows_everything(status):
+    rules = fetch_robots(FakeClient(FakeResponse(status)), 'https://example.com/')
+
+    assert rules.disallow_all
+    assert not rules.allowed('https://example.com/')
+
+
+def test_fetch_robots_connection_error_disallows_everything(capsys):
+    rules = fetch_robots(FakeClient(error=ConnectionError('refused')), 'https://example.com/')
+
+    assert rules.disallow_all
+    assert not rules.allowed('https://example.com/')
+    assert 'Error fetching robots.txt' in capsys.readouterr().out
+
+
+def test_default_rules_allow_everything():
+    assert RobotsRules().allowed('https://example.com/any/path')
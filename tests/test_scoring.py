@@ -0,0 +1,170 @@
+"""
+ベクトル化したスコア計算が、従来のページごとのループと同じ結果になることを確認する
+"""
+import re
+from urllib.parse import urlparse
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scoring import build_page_frame, calculate_seo_scores, draw_random_components, url_paths
+
+
+def legacy_page_speed(word_count, img_count):
+    """
+    従来のcalculate_page_speed_score（np.randomのグローバル状態から乱数を引く）
+    """
+    base_score = 100
+    if word_count > 3000:
+        base_score -= min(20, (word_count - 3000) // 500)
+    if img_count > 10:
+        base_score -= min(15, (img_count - 10) * 2)
+    base_score += np.random.randint(-5, 6)
+    return max(0, min(100, base_score))
+
+
+def legacy_scores(pages_data):
+    """
+    従来のcalculate_seo_scores（ページごとのループ）
+    """
+    seo_scores = {"content": [], "internal": [], "external": [], "total": []}
+    for page in pages_data:
+        content_score = 0
+        if page['title'] and len(page['title']) > 10 and len(page['title']) < 70:
+            content_score += 20
+        elif page['title']:
+            content_score += 10
+        if page['meta_description'] and 70 <= len(page['meta_description']) <= 160:
+            content_score += 20
+        elif page['meta_description']:
+            content_score += 10
+        if page['h1'] and page['h1'] != "No H1":
+            content_score += 15
+        if page['word_count'] >= 1500:
+            content_score += 20
+        elif page['word_count'] >= 800:
+            content_score += 15
+        elif page['word_count'] >= 400:
+            content_score += 10
+        else:
+            content_score += 5
+        if page['h2_count'] > 0 and page['h3_count'] > 0:
+            content_score += 15
+        elif page['h2_count'] > 0:
+            content_score += 10
+        if page['image_count'] > 0 and page['images_with_alt'] / page['image_count'] >= 0.8:
+            content_score += 10
+        elif page['image_count'] > 0 and page['images_with_alt'] > 0:
+            content_score += 5
+
+        internal_score = 0
+        if page['internal_links_count'] >= 10:
+            internal_score += 30
+        elif page['internal_links_count'] >= 5:
+            internal_score += 20
+        elif page['internal_links_count'] > 0:
+            internal_score += 10
+        page_speed = legacy_page_speed(page['word_count'], page['image_count'])
+        if page_speed >= 90:
+            internal_score += 30
+        elif page_speed >= 70:
+            internal_score += 20
+        elif page_speed >= 50:
+            internal_score += 10
+        url_path = urlparse(page['url']).path
+        if len(url_path.split('/')) <= 3 and not re.search(r'\d{10,}', url_path):
+            internal_score += 20
+        else:
+            internal_score += 10
+        if page['url'].startswith('https://'):
+            internal_score += 20
+
+        external_score = np.random.randint(60, 90)
+        total_score = int(content_score * 0.4 + internal_score * 0.3 + external_score * 0.3)
+
+        seo_scores["content"].append(content_score)
+        seo_scores["internal"].append(internal_score)
+        seo_scores["external"].append(external_score)
+        seo_scores["total"].append(total_score)
+    return seo_scores
+
+
+URLS = [
+    'https://example.com/',
+    'http://example.com/',
+    'https://example.com',
+    'https://example.com/a/b',
+    'https://example.com/a/b/c',
+    'https://example.com/a/b/',
+    'https://example.com/item/1234567890',
+    'https://example.com/item/123456789',
+    'https://example.com/a?q=1/2/3',
+    'https://example.com/a#x/y/z',
+    'https://example.com/a/b;p=1/c',
+    'https://example.com/a;p=1',
+    'https://user:pw@example.com:8443/a/b/c/d'
+]
+
+
+def make_pages(count, seed=0):
+    """
+    各ルールの境界値（タイトル10/11/69/70文字、ディスクリプション69/70/160/161文字など）を含むページを生成する
+    """
+    rng = np.random.RandomState(seed)
+    pages = []
+    for i in range(count):
+        image_count = int(rng.choice([0, 1, 5, 10, 11, 20]))
+        pages.append({
+            'url': URLS[i % len(URLS)],
+            'title': 'あ' * int(rng.choice([0, 5, 10, 11, 69, 70, 100])),
+            'h1': str(rng.choice(['', 'No H1', '見出し'])),
+            'meta_description': 'x' * int(rng.choice([0, 30, 69, 70, 160, 161])),
+            'meta_keywords': '',
+            'word_count': int(rng.choice([0, 399, 400, 799, 800, 1499, 1500, 3000, 3499, 3500, 20000])),
+            'image_count': image_count,
+            'images_with_alt': int(rng.randint(0, image_count + 1)),
+            'h2_count': int(rng.choice([0, 1, 3])),
+            'h3_count': int(rng.choice([0, 2])),
+            'internal_links_count': int(rng.choice([0, 1, 4, 5, 9, 10, 50])),
+            'canonical': ''
+        })
+    return pages
+
+
+@pytest.mark.parametrize('seed', [0, 7, 12345])
+def test_scores_match_legacy_loop_under_global_seed(seed):
+    pages = make_pages(500, seed)
+
+    np.random.seed(seed)
+    expected = legacy_scores(pages)
+    np.random.seed(seed)
+    actual = calculate_seo_scores(pages)
+
+    assert actual == expected
+
+
+def test_random_state_matches_global_seed():
+    pages = make_pages(200)
+    np.random.seed(3)
+    expected = calculate_seo_scores(pages)
+
+    assert calculate_seo_scores(pages, random_state=3) == expected
+    assert calculate_seo_scores(build_page_frame(pages), random_state=np.random.RandomState(3)) == expected
+
+
+def test_random_components_follow_legacy_draw_order():
+    np.random.seed(11)
+    expected = [(np.random.randint(-5, 6), np.random.randint(60, 90)) for _ in range(100)]
+
+    jitter, external = draw_random_components(100, random_state=11)
+
+    assert list(zip(jitter.tolist(), external.tolist())) == expected
+
+
+def test_url_paths_match_urlparse():
+    assert url_paths(pd.Series(URLS)).tolist() == [urlparse(url).path for url in URLS]
+
+
+def test_empty_pages():
+    assert calculate_seo_scores([], random_state=0) == {'content': [], 'internal': [], 'external': [], 'total': []}